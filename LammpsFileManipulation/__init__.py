@@ -1,4 +1,89 @@
-from LammpsFileManipulation.dump_file_manipulation import dumpFile
-from LammpsFileManipulation.dump_file_manipulation import group_translate
-from LammpsFileManipulation.dump_file_manipulation import multiple_timestep_singular_file_dumps
-from LammpsFileManipulation.dump_file_manipulation import batch_import_files
+"""
+the public names are imported on first use so importing the package does not
+import pandas(or any submodule) until it is needed
+"""
+
+
+#default imports
+import importlib
+
+#public name:module it is defined in(None for submodules)
+_exports = {
+    "dumpFile":"dump_file_manipulation",
+    "group_translate":"dump_file_manipulation",
+    "multiple_timestep_singular_file_dumps":"dump_file_manipulation",
+    "batch_import_files":"dump_file_manipulation",
+    "prefetchReader":"dump_file_manipulation",
+    "lazyDumpFile":"dump_file_manipulation",
+    "dumpFrame":"dump_frame",
+    "read_frames":"dump_frame",
+    "dumpCatalog":"dump_file_catalog",
+    "frame_offsets":"dump_file_concatenate",
+    "concatenate_dumps":"dump_file_concatenate",
+    "split_dump":"dump_file_concatenate",
+    "atomFilter":"dump_file_manipulation",
+    "instrumentation":None,
+    "kernels":None,
+    "fieldBinner":"dump_file_binning",
+    "field_bin":"dump_file_binning",
+    "wrap_atoms":"dump_file_periodic",
+    "unwrap_atoms":"dump_file_periodic",
+    "boundary_crossings":"dump_file_periodic",
+    "track_image_flags":"dump_file_periodic",
+    "dump_to_arrow":"dump_file_arrow",
+    "frames_to_arrow":"dump_file_arrow",
+    "arrow_to_dumps":"dump_file_arrow",
+    "write_parquet_dataset":"dump_file_arrow",
+    "read_parquet_dataset":"dump_file_arrow",
+    "write_hdf5_trajectory":"dump_file_hdf5",
+    "hdf5Trajectory":"dump_file_hdf5",
+    "write_compressed_trajectory":"dump_file_codec",
+    "compressedTrajectory":"dump_file_codec",
+    "group_track":"dump_file_manipulation",
+    "neighbor_pairs":"dump_file_neighbors",
+    "neighbor_list":"dump_file_neighbors",
+    "nearest_neighbors":"dump_file_neighbors",
+    "cluster_atoms":"dump_file_cluster",
+    "cluster_trajectory":"dump_file_cluster",
+    "centrosymmetry":"dump_file_structure",
+    "adaptive_cna":"dump_file_structure",
+    "structure_trajectory":"dump_file_structure",
+    "curve_keys":"dump_file_ordering",
+    "spatial_sort":"dump_file_ordering",
+    "restore_order":"dump_file_ordering",
+    "spatial_sort_trajectory":"dump_file_ordering",
+    "replicate_atoms":"dump_file_replicate",
+    "write_replicated":"dump_file_replicate",
+    "rank_and_size":"dump_file_mpi",
+    "mpi_frames":"dump_file_mpi",
+    "mpi_read_frame":"dump_file_mpi",
+    "mpi_map":"dump_file_mpi",
+    "mpi_reduce":"dump_file_mpi",
+    "mpi_mean":"dump_file_mpi",
+    "mpi_field_bin":"dump_file_mpi",
+    "sharedTrajectory":"dump_file_shared",
+    "frameCache":"dump_file_cache",
+    "frame_nbytes":"dump_file_cache",
+    "displacement":"dump_file_deformation",
+    "displacement_frames":"dump_file_deformation",
+    "displacement_trajectory":"dump_file_deformation",
+    "logFile":"log_file_manipulation",
+    "read_log":"log_file_manipulation",
+}
+
+__all__ = list(_exports)
+
+def __getattr__(name:str):
+    if name not in _exports:
+        raise AttributeError("module 'LammpsFileManipulation' has no attribute "+repr(name))
+
+    if _exports[name] is None:
+        value = importlib.import_module("LammpsFileManipulation."+name)
+    else:
+        value = getattr(importlib.import_module("LammpsFileManipulation."+_exports[name]),name)
+
+    globals()[name] = value#later lookups skip __getattr__
+    return value
+
+def __dir__():
+    return sorted(set(globals())|set(_exports))
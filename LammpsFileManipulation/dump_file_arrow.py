@@ -0,0 +1,246 @@
+"""
+This is the Apache Arrow / Parquet interchange for dumpFile classes and
+dictionaries of them so trajectories can be handed to columnar tools(Spark,
+DuckDB, ...) without going through per frame pandas exports
+
+requires pyarrow(pip install LammpsFileManipulation[arrow])
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#default imports
+import os
+import json
+
+#non-default imports
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = None
+
+#package imports
+from LammpsFileManipulation.dump_file_manipulation import dumpFile,_make_boxbounds
+
+################################################################################
+#Arrow tables###################################################################
+################################################################################
+
+timestep_column = "timestep"
+partition_column = "timestep_bin"
+box_columns = ["sim_xlo","sim_xhi","sim_ylo","sim_yhi","sim_zlo","sim_zhi"]
+tilt_columns = ["sim_xy","sim_xz","sim_yz"]
+
+def _require_pyarrow():
+    if pa is None:
+        raise Exception("pyarrow is required for Arrow/Parquet interchange (pip install pyarrow)")
+
+def _column_array(values:np.ndarray):
+    """
+    wraps a numeric numpy column in an arrow array sharing its memory
+    """
+    values = np.ascontiguousarray(values)
+    if values.dtype.kind in "iuf":
+        return pa.Array.from_buffers(pa.from_numpy_dtype(values.dtype),len(values),[None,pa.py_buffer(values)])
+    return pa.array(values)
+
+def dump_to_arrow(dump_class:dumpFile):
+    """
+    converts a dumpFile to an arrow table, the numeric atom columns share memory
+    with dump_class.atoms and the timestep and box are added as constant columns
+    (timestep, sim_xlo ... sim_zhi and sim_xy sim_xz sim_yz for triclinic boxes)
+
+    the boundary types and number of atoms are kept in the schema metadata
+    """
+    _require_pyarrow()
+
+    numberofatoms = len(dump_class.atoms)
+    names = [str(column) for column in dump_class.atoms.columns]
+    arrays = [_column_array(dump_class.atoms[column].to_numpy()) for column in dump_class.atoms.columns]
+
+    names.append(timestep_column)
+    arrays.append(_column_array(np.full(numberofatoms,dump_class.sim_timestep,dtype = np.int64)))
+
+    bounds = [dump_class.sim_xlo,dump_class.sim_xhi,dump_class.sim_ylo,dump_class.sim_yhi,dump_class.sim_zlo,dump_class.sim_zhi]
+    columns = list(box_columns)
+    if "tilt" in dump_class.sim_boxbounds.index:
+        bounds += dump_class.sim_boxbounds.loc["tilt",["x","y","z"]].tolist()
+        columns += tilt_columns
+
+    for column,value in zip(columns,bounds):
+        names.append(column)
+        arrays.append(_column_array(np.full(numberofatoms,value,dtype = np.float64)))
+
+    metadata = {"boundingtypes":dump_class.boundingtypes[["x","y","z"]].tolist(),"numberofatoms":{str(dump_class.sim_timestep):dump_class.sim_numberofatoms}}
+
+    return pa.Table.from_arrays(arrays,names = names,metadata = {"lammps":json.dumps(metadata)})
+
+def frames_to_arrow(dump_files:dict):
+    """
+    converts a dictionary {id:dumpFile} to one arrow table, the frames are
+    concatenated as chunks so no atom data is copied
+    """
+    _require_pyarrow()
+
+    tables = [dump_to_arrow(dump_class) for dump_class in dump_files.values()]
+    metadata = _merged_metadata(tables)
+
+    return pa.concat_tables([table.replace_schema_metadata(None) for table in tables]).replace_schema_metadata({"lammps":json.dumps(metadata)})
+
+def _merged_metadata(tables:list)->dict:
+    metadata = {"boundingtypes":None,"numberofatoms":{}}
+    for table in tables:
+        frame = json.loads(table.schema.metadata[b"lammps"])
+        metadata["boundingtypes"] = frame["boundingtypes"]
+        metadata["numberofatoms"].update(frame["numberofatoms"])
+
+    return metadata
+
+def arrow_to_dumps(table,boundingtypes:list = None,numberofatoms:dict = None)->dict:
+    """
+    converts an arrow table made by dump_to_arrow or frames_to_arrow back into a
+    dictionary {timestep:dumpFile}
+
+    boundingtypes and numberofatoms are read from the schema metadata when not given
+    """
+    _require_pyarrow()
+
+    if table.schema.metadata is not None and b"lammps" in table.schema.metadata:
+        metadata = json.loads(table.schema.metadata[b"lammps"])
+        boundingtypes = boundingtypes if boundingtypes is not None else metadata["boundingtypes"]
+        numberofatoms = numberofatoms if numberofatoms is not None else metadata["numberofatoms"]
+
+    boundingtypes = boundingtypes if boundingtypes is not None else ["pp","pp","pp"]
+    numberofatoms = numberofatoms if numberofatoms is not None else {}
+
+    frame = table.to_pandas()
+    dump_files = {}
+
+    for timestep,atoms in frame.groupby(timestep_column,sort = True):
+        timestep = int(timestep)
+        first = atoms.iloc[0]
+        lows = [first[box_columns[0]],first[box_columns[2]],first[box_columns[4]]]
+        highs = [first[box_columns[1]],first[box_columns[3]],first[box_columns[5]]]
+        tilts = [first[column] for column in tilt_columns] if tilt_columns[0] in atoms.columns else None
+
+        drop = [column for column in [timestep_column,partition_column]+box_columns+tilt_columns if column in atoms.columns]
+        atoms = atoms.drop(columns = drop).reset_index(drop = True)
+
+        boxbounds = _make_boxbounds(lows,highs,boundingtypes,tilts)
+        dump_files[timestep] = dumpFile(timestep,int(numberofatoms.get(str(timestep),len(atoms))),boxbounds,atoms)
+
+    return dump_files
+
+################################################################################
+#Parquet datasets###############################################################
+################################################################################
+
+def write_parquet_dataset(dump_files,root:str,timesteps_per_partition:int = 100000,compression:str = "zstd"):
+    """
+    streams a dictionary {id:dumpFile} or any iterable of dumpFile classes(for
+    example a generator over a prefetchReader) into a parquet dataset partitioned
+    by timestep range so the whole trajectory is never held in memory
+
+    root/timestep_bin=<first timestep of the range>/part-<n>.parquet
+
+    every frame is written as its own row group and a partition file is closed
+    as soon as a frame from another range arrives
+    """
+    _require_pyarrow()
+
+    frames = dump_files.values() if isinstance(dump_files,dict) else dump_files
+    writer = None
+    current = None
+    parts = {}
+    boundingtypes = None
+    numberofatoms = {}
+
+    try:
+        for dump_class in frames:
+            table = dump_to_arrow(dump_class)
+            partition = (dump_class.sim_timestep//timesteps_per_partition)*timesteps_per_partition
+            frame_metadata = json.loads(table.schema.metadata[b"lammps"])
+            boundingtypes = frame_metadata["boundingtypes"]
+            numberofatoms.update(frame_metadata["numberofatoms"])
+            table = table.replace_schema_metadata(None)
+
+            if writer is None or partition != current or not table.schema.equals(writer.schema):
+                if writer is not None:
+                    writer.close()
+
+                directory = os.path.join(root,partition_column+"="+str(partition))
+                os.makedirs(directory,exist_ok = True)
+
+                #never overwriting an earlier part of the same range
+                part = parts.get(partition,len([name for name in os.listdir(directory) if name.endswith(".parquet")]))
+                parts[partition] = part+1
+                writer = pq.ParquetWriter(os.path.join(directory,"part-"+str(part)+".parquet"),table.schema,compression = compression)
+                current = partition
+
+            writer.write_table(table)
+
+    finally:
+        if writer is not None:
+            writer.close()
+
+    #the frame metadata is kept next to the data for the loader
+    metadata_path = os.path.join(root,"_lammps_metadata.json")
+    if os.path.exists(metadata_path):
+        with open(metadata_path,"r") as file:
+            numberofatoms = dict(json.load(file)["numberofatoms"],**numberofatoms)
+
+    with open(metadata_path,"w") as file:
+        json.dump({"boundingtypes":boundingtypes,"numberofatoms":numberofatoms},file)
+
+def read_parquet_dataset(root:str,columns:list = None,timesteps:list = None,timestep_range:tuple = None,timesteps_per_partition:int = None)->dict:
+    """
+    reads a dataset written by write_parquet_dataset back into a dictionary
+    {timestep:dumpFile} loading only the requested columns and frames
+
+    columns = atom columns to load **default all
+    timesteps = list of timesteps to load
+    timestep_range = (lo,hi) inclusive range of timesteps to load
+    timesteps_per_partition = partition width used when writing, lets whole
+                              partition directories be skipped for ranges
+    """
+    _require_pyarrow()
+
+    dataset = ds.dataset(root,format = "parquet",partitioning = "hive")
+    condition = None
+
+    if timesteps is not None:
+        condition = ds.field(timestep_column).isin([int(timestep) for timestep in timesteps])
+
+    if timestep_range is not None:
+        in_range = (ds.field(timestep_column) >= timestep_range[0]) & (ds.field(timestep_column) <= timestep_range[1])
+        if timesteps_per_partition is not None:
+            in_range = in_range & (ds.field(partition_column) >= (timestep_range[0]//timesteps_per_partition)*timesteps_per_partition) & (ds.field(partition_column) <= timestep_range[1])
+        condition = in_range if condition is None else condition & in_range
+
+    if columns is not None:
+        names = dataset.schema.names
+        columns = list(columns)+[column for column in [timestep_column]+box_columns+tilt_columns if column in names and column not in columns]
+
+    table = dataset.to_table(columns = columns,filter = condition)
+
+    boundingtypes = None
+    numberofatoms = None
+    metadata_path = os.path.join(root,"_lammps_metadata.json")
+    if os.path.exists(metadata_path):
+        with open(metadata_path,"r") as file:
+            metadata = json.load(file)
+        boundingtypes = metadata["boundingtypes"]
+        numberofatoms = metadata["numberofatoms"]
+
+    return arrow_to_dumps(table,boundingtypes,numberofatoms)
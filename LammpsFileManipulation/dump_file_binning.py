@@ -0,0 +1,309 @@
+"""
+This is a spatial binning engine for dumpFile classes that builds 1-D, 2-D and
+3-D grids of number density, per type concentration and averaged per atom
+columns in one vectorized pass per frame
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#non-default imports
+import numpy as np
+
+#package imports
+from LammpsFileManipulation.dump_file_manipulation import dumpFile
+from LammpsFileManipulation import instrumentation
+from LammpsFileManipulation import kernels
+
+################################################################################
+#Field binning##################################################################
+################################################################################
+
+#mvv2e(mass*velocity^2 to energy) and boltz(boltzmann constant) of lammps units
+unit_constants = {"metal":(1.0364269e-4,8.617343e-5),"real":(48.88821291*48.88821291,0.0019872067),"lj":(1.0,1.0)}
+
+class fieldBinner:
+    """
+    This accumulates binned fields over any number of frames so a whole
+    trajectory can be streamed through it one dumpFile at a time
+
+    proper call:
+    binner = fieldBinner(bins = 10,axes = ["x"],geometry = "cartesian",columns = None,
+                         limits = None,center = None,axis = "z",r_max = None,
+                         temperature = False,masses = None,units = "metal")
+    for dump_class in dump_files.values():
+        binner.add(dump_class)
+    result = binner.result()
+    binner.merge(other_binner) #adds the frames of a binner filled elsewhere
+
+    geometry:
+        "cartesian" = bins along 1-3 of the axes ["x","y","z"], limits =
+                      [(lo,hi),...] per axis **default the box of the first frame
+        "cylindrical" = radial bins around the cylinder axis(axis) and optionally
+                        bins along it when bins = (n_r,n_axial)
+        "spherical" = radial bins around center
+        center = point the radial bins are measured from **default box center
+        r_max = outer radius **default half the smallest box length
+
+    periodic(pp) box axes are wrapped into the box for cartesian and axial bins
+    and use the minimum image distance to center for radial bins, atoms outside the bins
+    are ignored
+
+    columns = per atom columns averaged in every bin(c_pe, c_stress[1], ...)
+    temperature = True bins the kinetic temperature from vx vy vz using the mass
+                  column or masses = {type:mass} in the given lammps units
+
+    result dictionary:
+        edges = bin edges per binned dimension[list of np.ndarray]
+        counts = mean atoms per bin per frame[np.ndarray]
+        density = counts/bin volume[np.ndarray]
+        concentration = {type:fraction of atoms in the bin}[dict]
+        means = {column:mean value in the bin}[dict]
+        temperature = kinetic temperature of the bin[np.ndarray]
+        frames = number of frames accumulated[int]
+    """
+
+    def __init__(self,bins = 10,axes:list = ["x"],geometry:str = "cartesian",columns:list = None,limits:list = None,center:list = None,axis:str = "z",r_max:float = None,temperature:bool = False,masses:dict = None,units:str = "metal"):
+        if geometry not in ["cartesian","cylindrical","spherical"]:
+            raise Exception("geometry must be cartesian, cylindrical or spherical")
+
+        self.bins = tuple(np.atleast_1d(bins).tolist())
+        self.axes = list(axes)
+        self.geometry = geometry
+        self.columns = list(columns) if columns is not None else []
+        self.limits = limits
+        self.center = center
+        self.axis = axis
+        self.r_max = r_max
+        self.temperature = temperature
+        self.masses = masses
+        self.units = units
+
+        if geometry == "cartesian" and len(self.bins) != len(self.axes):
+            if len(self.bins) != 1:
+                raise Exception("give one number of bins per binned axis")
+            self.bins = self.bins*len(self.axes)
+
+        self.edges = None
+        self.volumes = None
+        self.frames = 0
+        self.counts = None
+        self.type_counts = {}
+        self.sums = {}
+        self.kinetic = None
+
+    #setting up the grid########################################################
+    def _setup(self,dump_class:dumpFile):
+        lows = dump_class.sim_boxbounds.loc["low"].astype(float)
+        highs = dump_class.sim_boxbounds.loc["high"].astype(float)
+
+        if self.geometry == "cartesian":
+            limits = self.limits if self.limits is not None else [(lows[axis],highs[axis]) for axis in self.axes]
+            self.edges = [np.linspace(lo,hi,n+1) for (lo,hi),n in zip(limits,self.bins)]
+            widths = [np.diff(edge) for edge in self.edges]
+            self.volumes = widths[0]
+            for width in widths[1:]:
+                self.volumes = np.multiply.outer(self.volumes,width)
+
+            #area of the unbinned directions
+            for axis in ["x","y","z"]:
+                if axis not in self.axes:
+                    self.volumes = self.volumes*(highs[axis]-lows[axis])
+
+        else:
+            if self.center is None:
+                self.center = [(lows[axis]+highs[axis])/2 for axis in ["x","y","z"]]
+
+            radial_axes = ["x","y","z"] if self.geometry == "spherical" else [axis for axis in ["x","y","z"] if axis != self.axis]
+            if self.r_max is None:
+                self.r_max = min((highs[axis]-lows[axis])/2 for axis in radial_axes)
+
+            r_edges = np.linspace(0.0,self.r_max,self.bins[0]+1)
+            self.edges = [r_edges]
+
+            if self.geometry == "spherical":
+                self.volumes = 4.0/3.0*np.pi*np.diff(r_edges**3)
+            else:
+                height = highs[self.axis]-lows[self.axis]
+                area = np.pi*np.diff(r_edges**2)
+                if len(self.bins) > 1:
+                    self.edges.append(np.linspace(lows[self.axis],highs[self.axis],self.bins[1]+1))
+                    self.volumes = np.multiply.outer(area,np.diff(self.edges[1]))
+                else:
+                    self.volumes = area*height
+
+        self.shape = tuple(len(edge)-1 for edge in self.edges)
+        self.counts = np.zeros(int(np.prod(self.shape)))
+        self.kinetic = np.zeros(int(np.prod(self.shape)))
+
+    def _coordinates(self,dump_class:dumpFile)->list:
+        """
+        per atom coordinates in the binned dimensions
+        """
+        lows = dump_class.sim_boxbounds.loc["low"].astype(float)
+        highs = dump_class.sim_boxbounds.loc["high"].astype(float)
+        periodic = dump_class.boundingtypes == "pp"
+
+        if self.geometry == "cartesian":
+            coordinates = []
+            for axis in self.axes:
+                values = dump_class.atoms[axis].to_numpy(dtype = float)
+                if periodic[axis]:
+                    values = lows[axis]+np.mod(values-lows[axis],highs[axis]-lows[axis])
+                coordinates.append(values)
+            return coordinates
+
+        radial_axes = ["x","y","z"] if self.geometry == "spherical" else [axis for axis in ["x","y","z"] if axis != self.axis]
+        squared = 0.0
+        for axis in radial_axes:
+            delta = dump_class.atoms[axis].to_numpy(dtype = float)-self.center[["x","y","z"].index(axis)]
+            if periodic[axis]:
+                length = highs[axis]-lows[axis]
+                delta = delta-length*np.round(delta/length)#minimum image
+            squared = squared+delta**2
+
+        coordinates = [np.sqrt(squared)]
+        if self.geometry == "cylindrical" and len(self.bins) > 1:
+            values = dump_class.atoms[self.axis].to_numpy(dtype = float)
+            if periodic[self.axis]:
+                values = lows[self.axis]+np.mod(values-lows[self.axis],highs[self.axis]-lows[self.axis])
+            coordinates.append(values)
+
+        return coordinates
+
+    def _flat_index(self,coordinates:list)->np.ndarray:
+        """
+        flattened bin index of every atom, -1 for atoms outside the grid
+        """
+        inside = np.ones(len(coordinates[0]),dtype = bool)
+        indexes = []
+
+        for values,edge in zip(coordinates,self.edges):
+            index = np.searchsorted(edge,values,side = "right")-1
+            index[values == edge[-1]] = len(edge)-2#closing the last bin
+            inside &= (index >= 0) & (index < len(edge)-1)
+            indexes.append(index)
+
+        flat = np.full(len(inside),-1)
+        flat[inside] = np.ravel_multi_index([index[inside] for index in indexes],self.shape)
+
+        return flat
+
+    #accumulating###############################################################
+    def add(self,dump_class:dumpFile):
+        """
+        adds one frame to the accumulated fields
+        """
+        with instrumentation.stage("field_bin"):
+            if self.edges is None:
+                self._setup(dump_class)
+
+            flat = self._flat_index(self._coordinates(dump_class))
+            inside = flat >= 0
+            flat = flat[inside]
+            nbins = len(self.counts)
+
+            self.counts += kernels.histogram(flat,nbins)
+
+            #per type counts in one bincount by offsetting each type by nbins
+            types,type_index = np.unique(dump_class.atoms[dumpFile.type].to_numpy()[inside],return_inverse = True)
+            type_counts = kernels.histogram(flat+type_index*nbins,nbins*len(types)).reshape(len(types),nbins)
+            for atom_type,type_count in zip(types.tolist(),type_counts):
+                self.type_counts[atom_type] = self.type_counts.get(atom_type,0)+type_count
+
+            for column in self.columns:
+                weights = dump_class.atoms[column].to_numpy(dtype = float)[inside]
+                self.sums[column] = self.sums.get(column,0)+kernels.histogram(flat,nbins,weights)
+
+            if self.temperature:
+                self.kinetic += kernels.histogram(flat,nbins,self._mvv(dump_class)[inside])
+
+            self.frames += 1
+
+    def add_frames(self,dump_files):
+        """
+        adds every frame of a dictionary {id:dumpFile} or an iterable of dumpFile
+        """
+        frames = dump_files.values() if isinstance(dump_files,dict) else dump_files
+        for dump_class in frames:
+            self.add(dump_class)
+
+    def merge(self,other):
+        """
+        adds the frames accumulated by another fieldBinner with the same options
+        (for example one per process or MPI rank)
+        """
+        if other.frames == 0:
+            return self
+
+        if self.edges is None:
+            #taking the grid of the other binner
+            self.edges,self.volumes,self.shape = other.edges,other.volumes,other.shape
+            self.center,self.r_max = other.center,other.r_max
+            self.counts = np.zeros_like(other.counts)
+            self.kinetic = np.zeros_like(other.kinetic)
+        elif self.shape != other.shape or not all(np.allclose(mine,theirs) for mine,theirs in zip(self.edges,other.edges)):
+            raise Exception("Only fieldBinners with the same bins can be merged")
+
+        self.counts += other.counts
+        self.kinetic += other.kinetic
+        for atom_type,counts in other.type_counts.items():
+            self.type_counts[atom_type] = self.type_counts.get(atom_type,0)+counts
+        for column,sums in other.sums.items():
+            self.sums[column] = self.sums.get(column,0)+sums
+        self.frames += other.frames
+
+        return self
+
+    def _mvv(self,dump_class:dumpFile)->np.ndarray:
+        atoms = dump_class.atoms
+        if "mass" in atoms.columns:
+            mass = atoms["mass"].to_numpy(dtype = float)
+        elif self.masses is not None:
+            mass = atoms[dumpFile.type].map(self.masses).to_numpy(dtype = float)
+        else:
+            raise Exception("temperature binning needs a mass column or masses = {type:mass}")
+
+        return mass*(atoms["vx"].to_numpy(dtype = float)**2+atoms["vy"].to_numpy(dtype = float)**2+atoms["vz"].to_numpy(dtype = float)**2)
+
+    def result(self)->dict:
+        """
+        the averaged fields reshaped to the grid
+        """
+        if self.frames == 0:
+            raise Exception("No frames have been added to the fieldBinner")
+
+        with np.errstate(invalid = "ignore",divide = "ignore"):
+            total = self.counts.reshape(self.shape)
+            result = {"edges":self.edges,"frames":self.frames}
+            result["counts"] = total/self.frames
+            result["density"] = result["counts"]/self.volumes
+            result["concentration"] = {atom_type:counts.reshape(self.shape)/total for atom_type,counts in self.type_counts.items()}
+            result["means"] = {column:sums.reshape(self.shape)/total for column,sums in self.sums.items()}
+
+            if self.temperature:
+                mvv2e,boltz = unit_constants[self.units]
+                result["temperature"] = self.kinetic.reshape(self.shape)*mvv2e/(3.0*boltz*total)
+
+        return result
+
+def field_bin(dump_files,bins = 10,axes:list = ["x"],geometry:str = "cartesian",**options)->dict:
+    """
+    bins a single dumpFile, a dictionary {id:dumpFile} or an iterable of dumpFile
+    classes and returns the fieldBinner result(see fieldBinner for the options)
+    """
+    binner = fieldBinner(bins,axes,geometry,**options)
+
+    if isinstance(dump_files,dumpFile):
+        binner.add(dump_files)
+    else:
+        binner.add_frames(dump_files)
+
+    return binner.result()
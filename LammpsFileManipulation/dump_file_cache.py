@@ -0,0 +1,318 @@
+"""
+This is trajectory access through a least recently used cache of parsed frames
+bounded by bytes instead of a number of frames, frames that are used again are
+not parsed again and the least recently used ones are dropped once the budget
+is reached, sequential scans can read the next frames ahead on a thread
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#default imports
+import threading
+import collections
+import concurrent.futures
+
+#non-default imports
+import numpy as np
+
+#package imports
+from LammpsFileManipulation.dump_file_manipulation import dumpFile
+from LammpsFileManipulation.dump_file_concatenate import frame_offsets,_source_files
+from LammpsFileManipulation import instrumentation
+
+################################################################################
+#Frame cache####################################################################
+################################################################################
+
+def frame_nbytes(dump_class:dumpFile)->int:
+    """
+    bytes held by the atoms of a frame(the part of a frame that matters)
+    """
+    return int(dump_class.atoms.memory_usage(index = True,deep = True).sum())
+
+class frameCache:
+    """
+    This gives access to the frames of a trajectory by position or timestep and
+    keeps the parsed frames that were used last in memory up to max_bytes
+
+    proper call:
+    cache = frameCache(source,max_bytes = 2**30,prefetch = 0,atom_filter = None)
+    dump_class = cache.frame(0) #by position
+    dump_class = cache.frame_at(10000) #by timestep
+    for dump_class in cache:
+        ...
+
+    source = dump file, directory, glob pattern or a list of them(single or
+             multi timestep files, only the headers are read up front) or an
+             open hdf5Trajectory, compressedTrajectory or sharedTrajectory
+    max_bytes = budget of the atoms of the cached frames(see frame_nbytes), a
+                frame larger than the budget is returned but not kept
+    prefetch = frames read ahead on a thread when frames are used in order
+               (forwards or backwards) **default 0 no read ahead, never more
+               than the budget holds(at least one) and a frame read ahead is
+               only kept when it fits in the free budget so it never evicts
+    atom_filter = atomFilter applied while the dump files are parsed
+
+    valid property calls:
+        cache.timesteps = timesteps of the frames[np.ndarray]
+        cache.numberofframes = frames in the trajectory[int]
+        cache.nbytes = bytes of the cached frames[int]
+        cache.cached = positions of the cached frames, least recently used first[list]
+        cache.stats = hits, misses, evictions, prefetched and prefetch_hits[dict]
+
+    cache.evict(position = None) drops one frame(or every frame) and
+    cache.resize(max_bytes) changes the budget, the frames returned are the
+    cached objects so copy them before changing their atoms
+    """
+
+    def __init__(self,source,max_bytes:int = 2**30,prefetch:int = 0,atom_filter = None):
+        if max_bytes < 0 or prefetch < 0:
+            raise Exception("max_bytes and prefetch can not be negative")
+
+        if hasattr(source,"frame") and hasattr(source,"timesteps"):
+            self.reader = source
+            self.offsets = None
+            self.timesteps = np.asarray(source.timesteps,dtype = np.int64)
+        else:
+            self.reader = None
+            self.offsets = [frame for file_path in _source_files(source) for frame in frame_offsets(file_path)]
+            self.timesteps = np.array([frame["timestep"] for frame in self.offsets],dtype = np.int64)
+
+        self.max_bytes = max_bytes
+        self.prefetch = prefetch
+        self.atom_filter = atom_filter
+        self.nbytes = 0
+        self.stats = {"hits":0,"misses":0,"evictions":0,"prefetched":0,"prefetch_hits":0}
+
+        self._frames = collections.OrderedDict()#position:(dumpFile,bytes)
+        self._pending = {}#position:future of frames being read ahead
+        self._lock = threading.RLock()
+        self._reader_lock = threading.Lock()#open readers share one file handle
+        self._pool = None
+        self._last = None
+        self._frame_bytes = 0#bytes of the last frame parsed
+
+    #property defined functions#################################################
+    @property
+    def numberofframes(self):
+        return len(self.timesteps)
+
+    @property
+    def cached(self):
+        with self._lock:
+            return list(self._frames)
+
+    #loading####################################################################
+    def _load(self,position:int)->dumpFile:
+        with instrumentation.stage("cache_load"):
+            if self.reader is not None:
+                with self._reader_lock:
+                    return self.reader.frame(position)
+
+            frame = self.offsets[position]
+            with open(frame["path"],"rb") as file:
+                file.seek(frame["start"])
+                raw_data = file.read(frame["end"]-frame["start"])
+            instrumentation.count("bytes_read",len(raw_data))
+
+            return dumpFile.bytes_to_dumpfile(raw_data,self.atom_filter)
+
+    def _store(self,position:int,dump_class:dumpFile,prefetched:bool = False)->bool:
+        nbytes = frame_nbytes(dump_class)
+
+        with self._lock:
+            self._frame_bytes = nbytes
+            #frames read ahead only take free space, they never evict
+            space = self.max_bytes-self.nbytes if prefetched else self.max_bytes
+            if position in self._frames or nbytes > space:
+                return False
+            self._frames[position] = (dump_class,nbytes)
+            self.nbytes += nbytes
+            self._shrink(self.max_bytes)
+
+        return True
+
+    def _shrink(self,max_bytes:int):
+        #dropping the least recently used frames
+        while self._frames and self.nbytes > max_bytes:
+            position,(dump_class,nbytes) = self._frames.popitem(last = False)
+            self.nbytes -= nbytes
+            self.stats["evictions"] += 1
+
+    def _read_ahead(self,position:int)->dumpFile:
+        try:
+            dump_class = self._load(position)
+        except BaseException:
+            with self._lock:
+                self._pending.pop(position,None)
+            raise
+
+        stored = self._store(position,dump_class,prefetched = True)
+        with self._lock:
+            self.stats["prefetched"] += 1
+            if stored:
+                self._pending.pop(position,None)
+            #otherwise the frame waits on its future until it is used
+
+        return dump_class
+
+    def _schedule(self,position:int):
+        """
+        reads the next frames in the direction of the scan on the thread
+        """
+        direction = position-self._last if self._last is not None else 0
+        self._last = position
+        if self.prefetch == 0 or abs(direction) != 1:
+            return
+
+        if self._pool is None:
+            self._pool = concurrent.futures.ThreadPoolExecutor(max_workers = 1)
+
+        with self._lock:
+            depth = self.prefetch
+            if self._frame_bytes:
+                depth = min(depth,max(self.max_bytes//self._frame_bytes,1))
+            window = [position+direction*step for step in range(1,depth+1)]
+
+            #frames read ahead for an older window that were never used
+            for upcoming in [upcoming for upcoming,future in self._pending.items() if future.done() and upcoming not in window]:
+                del self._pending[upcoming]
+
+            for upcoming in window:
+                if not 0 <= upcoming < self.numberofframes:
+                    break
+                if upcoming not in self._frames and upcoming not in self._pending:
+                    self._pending[upcoming] = self._pool.submit(self._read_ahead,upcoming)
+
+    #Class functional methods###################################################
+    def frame(self,position:int)->dumpFile:
+        """
+        one frame by position from the cache or parsed from the source
+        """
+        if position < 0:
+            position += self.numberofframes
+        if not 0 <= position < self.numberofframes:
+            raise Exception("Frame "+str(position)+" is not in the trajectory")
+
+        with self._lock:
+            cached = self._frames.get(position)
+            future = self._pending.get(position)
+
+            if cached is not None:
+                self._frames.move_to_end(position)
+                self.stats["hits"] += 1
+                instrumentation.count("cache_hits",1)
+
+        dump_class = None
+        if cached is None and future is not None:
+            try:
+                #the frame is used even when it was too large to be kept
+                dump_class = future.result()
+            except Exception:
+                dump_class = None#read again below so the error comes from this call
+            else:
+                with self._lock:
+                    if self._pending.get(position) is future:
+                        del self._pending[position]
+                    if position in self._frames:
+                        self._frames.move_to_end(position)
+                    self.stats["prefetch_hits"] += 1
+                instrumentation.count("cache_hits",1)
+                #used now so it is kept like any other frame(it may evict)
+                self._store(position,dump_class)
+
+        if cached is not None:
+            dump_class = cached[0]
+        elif dump_class is None:
+            with self._lock:
+                self.stats["misses"] += 1
+            instrumentation.count("cache_misses",1)
+            dump_class = self._load(position)
+            self._store(position,dump_class)
+
+        self._schedule(position)
+
+        return dump_class
+
+    def frame_at(self,timestep:int)->dumpFile:
+        """
+        one frame by timestep
+        """
+        matches = np.flatnonzero(self.timesteps == timestep)
+        if len(matches) == 0:
+            raise Exception("Timestep "+str(timestep)+" is not in the trajectory")
+
+        return self.frame(int(matches[0]))
+
+    def evict(self,position:int = None):
+        """
+        drops one cached frame by position or every cached frame
+        """
+        with self._lock:
+            if position is None:
+                self.stats["evictions"] += len(self._frames)
+                self._frames.clear()
+                self.nbytes = 0
+            elif position in self._frames:
+                self.nbytes -= self._frames.pop(position)[1]
+                self.stats["evictions"] += 1
+
+    def resize(self,max_bytes:int):
+        """
+        changes the budget, frames over a smaller budget are evicted
+        """
+        if max_bytes < 0:
+            raise Exception("max_bytes can not be negative")
+
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._shrink(max_bytes)
+
+    def hit_rate(self)->float:
+        """
+        fraction of the requested frames that did not have to be parsed
+        """
+        hits = self.stats["hits"]+self.stats["prefetch_hits"]
+        total = hits+self.stats["misses"]
+
+        return hits/total if total else 0.0
+
+    def close(self):
+        """
+        waits for the frames being read ahead and empties the cache
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait = True,cancel_futures = True)
+            self._pool = None
+        self._pending.clear()
+        self.evict()
+
+    #dubble under functions#####################################################
+    def __iter__(self):
+        for position in range(self.numberofframes):
+            yield self.frame(position)
+
+    def __len__(self):
+        return self.numberofframes
+
+    def __contains__(self,position:int):
+        with self._lock:
+            return position in self._frames
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc_info):
+        self.close()
+        return False
+
+    def __repr__(self):
+        return "{Frames:"+str(self.numberofframes)+"\nCached:"+str(len(self._frames))+"\nBytes:"+str(self.nbytes)+"/"+str(self.max_bytes)+"\nStats:"+str(self.stats)+"}"
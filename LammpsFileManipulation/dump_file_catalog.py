@@ -0,0 +1,234 @@
+"""
+This is a catalog of directories of single timestep lammps dump files that only
+reads the header of every file so frames can be found without parsing atoms
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#default imports
+import os
+import glob
+import json
+import warnings
+
+#non-default imports
+import pandas as pd
+
+#package imports
+from LammpsFileManipulation.dump_file_manipulation import _read_dump_header
+
+################################################################################
+#Cataloging dump directories####################################################
+################################################################################
+
+class dumpCatalog:
+    """
+    This is an index of the headers(timestep, number of atoms, box and columns)
+    of a group of dump files sorted numerically by timestep
+
+    catalog = dumpCatalog.build(source:str,index_path:str = None,save:bool = True)
+
+    source = directory or glob pattern("run/dump.*.txt") of dump files
+    index_path = where the index is kept **default ".dump_catalog.json" next to the files
+
+    the index is updated incrementally so only new or changed files(by size and
+    modification time) have their header read when the catalog is rebuilt,
+    several patterns can share one index(entries of other patterns are kept)
+    and files that are not dump files are remembered so they are not read again
+
+    selecting frames:
+        selected = catalog.select(timestep_range = (lo,hi),stride = 1,numberofatoms = None)
+
+    the catalog iterates over its file paths so it can be passed directly to
+    batch_import_files or prefetchReader
+        dump_files = batch_import_files(catalog.select(timestep_range = (0,50000)))
+
+    valid property calls:
+        catalog.file_paths = paths in timestep order[list]
+        catalog.timesteps = timesteps in order[list]
+        catalog.entries = header summaries[list of dict]
+    """
+
+    index_name = ".dump_catalog.json"
+
+    def __init__(self,entries:list,index_path:str = None):
+        self.entries = sorted(entries,key = lambda entry: entry["timestep"])
+        self.index_path = index_path
+
+    #property defined functions#################################################
+    @property
+    def file_paths(self):
+        return [entry["path"] for entry in self.entries]
+
+    @property
+    def timesteps(self):
+        return [entry["timestep"] for entry in self.entries]
+
+    #Alternative CLass Constructive Methods#####################################
+    @classmethod
+    def build(cls,source:str,index_path:str = None,save:bool = True):
+        """
+        scans a directory or glob pattern reading only the header of each file
+        and reusing the entries of an existing index for unchanged files
+        """
+        if os.path.isdir(source):
+            directory = source
+            file_paths = [os.path.join(source,name) for name in os.listdir(source) if not name.startswith(".")]
+        else:
+            directory = os.path.dirname(source)
+            file_paths = glob.glob(source)
+
+        if index_path is None:
+            index_path = os.path.join(directory,cls.index_name)
+
+        #the index is shared by every pattern built into it, entries of other
+        #patterns are kept and only files that no longer exist are dropped
+        known,skipped = cls._read_index(index_path)
+        removed = [path for path in list(known)+list(skipped) if not os.path.isfile(path)]
+        for path in removed:
+            known.pop(path,None)
+            skipped.pop(path,None)
+
+        entries = []
+        changed = len(removed) > 0
+
+        for file_path in file_paths:
+            if not os.path.isfile(file_path) or os.path.abspath(file_path) == os.path.abspath(index_path):
+                continue
+
+            path = os.path.abspath(file_path)
+            status = os.stat(file_path)
+            entry = known.get(path,skipped.get(path))
+
+            if entry is None or entry["size"] != status.st_size or entry["mtime"] != status.st_mtime:
+                known.pop(path,None)
+                skipped.pop(path,None)
+                entry = cls.read_entry(file_path)
+                changed = True
+
+                if entry is None:
+                    #not a dump file, kept so it is not read again until it changes
+                    skipped[path] = {"path":path,"size":status.st_size,"mtime":status.st_mtime}
+                    continue
+                known[path] = entry
+
+            if path in known:
+                entries.append(known[path])
+
+        catalog = cls(entries,index_path)
+
+        if save and changed:
+            cls._write_index(index_path,list(known.values()),list(skipped.values()))
+
+        return catalog
+
+    @staticmethod
+    def _read_index(index_path:str):
+        """
+        {path:entry} of the dump files and of the other files of an index
+        """
+        if not os.path.exists(index_path):
+            return {},{}
+
+        with open(index_path,"r") as file:
+            index = json.load(file)
+
+        return {entry["path"]:entry for entry in index["entries"]},{entry["path"]:entry for entry in index.get("skipped",[])}
+
+    @staticmethod
+    def _write_index(index_path:str,entries:list,skipped:list = []):
+        with open(index_path,"w") as file:
+            json.dump({"entries":entries,"skipped":skipped},file)
+
+    @classmethod
+    def load(cls,index_path:str):
+        """
+        loads a previously saved index file
+        """
+        with open(index_path,"r") as file:
+            entries = json.load(file)["entries"]
+
+        return cls(entries,index_path)
+
+    @staticmethod
+    def read_entry(file_path:str):
+        """
+        reads the header of a dump file into a catalog entry, files that are not
+        dump files are skipped with a warning
+        """
+        try:
+            with open(file_path,"rb") as file:
+                header = _read_dump_header(file)
+        except Exception:
+            header = None
+
+        if header is None or "timestep" not in header:
+            warnings.warn("Skipping "+str(file_path)+" it does not have a dump file header")
+            return None
+
+        status = os.stat(file_path)
+        header["path"] = os.path.abspath(file_path)
+        header["size"] = status.st_size
+        header["mtime"] = status.st_mtime
+
+        return header
+
+    #Class functional methods###################################################
+    def save(self,index_path:str = None):
+        """
+        writes the index as json so the next build only reads new files
+        """
+        if index_path is not None:
+            self.index_path = index_path
+
+        self._write_index(self.index_path,self.entries)
+
+    def select(self,timestep_range:tuple = None,stride:int = 1,numberofatoms:int = None):
+        """
+        returns a new catalog of the frames inside timestep_range(inclusive lo,hi)
+        with the given number of atoms keeping every stride-th match
+        """
+        entries = self.entries
+
+        if timestep_range is not None:
+            entries = [entry for entry in entries if timestep_range[0] <= entry["timestep"] <= timestep_range[1]]
+
+        if numberofatoms is not None:
+            entries = [entry for entry in entries if entry["numberofatoms"] == numberofatoms]
+
+        return dumpCatalog(entries[::stride],self.index_path)
+
+    def to_dataframe(self)->pd.DataFrame:
+        """
+        summary table of the catalog with one row per frame
+        """
+        rows = []
+        for entry in self.entries:
+            row = {"timestep":entry["timestep"],"numberofatoms":entry["numberofatoms"],"path":entry["path"]}
+            for ind,axis in enumerate(["x","y","z"]):
+                row[axis+"lo"] = entry["lows"][ind]
+                row[axis+"hi"] = entry["highs"][ind]
+            row["columns"] = " ".join(entry["titles"])
+            rows.append(row)
+
+        return pd.DataFrame(rows)
+
+    #dubble under functions#####################################################
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.file_paths)
+
+    def __repr__(self):
+        if self.entries:
+            return "{Frames:"+str(len(self))+"\nTimesteps:"+str(self.entries[0]["timestep"])+"-"+str(self.entries[-1]["timestep"])+"}"
+        return "{Frames:0}"
@@ -0,0 +1,179 @@
+"""
+This is a cutoff cluster analysis for dumpFile classes, atoms closer than the
+cutoff(periodic aware) are joined and the connected components of that graph
+are the clusters, used for voids, precipitates and fragments
+
+scipy is used for the connected components when it is installed otherwise a
+vectorized union-find is used
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#default imports
+import concurrent.futures
+
+#non-default imports
+import pandas as pd
+import numpy as np
+
+try:
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+except ImportError:
+    connected_components = None
+
+#package imports
+from LammpsFileManipulation.dump_file_manipulation import dumpFile
+from LammpsFileManipulation.dump_file_periodic import box_matrix,periodic_axes,fractional_coordinates
+from LammpsFileManipulation.dump_file_neighbors import neighbor_pairs
+from LammpsFileManipulation import instrumentation
+
+################################################################################
+#Connected components###########################################################
+################################################################################
+
+def _union_find(natoms:int,i:np.ndarray,j:np.ndarray)->np.ndarray:
+    """
+    component labels(the smallest row in the component) by repeatedly hooking
+    the larger root of every pair onto the smaller one and pointer jumping
+    """
+    labels = np.arange(natoms)
+
+    while True:
+        roots_i = labels[i]
+        roots_j = labels[j]
+        differ = roots_i != roots_j
+        if not differ.any():
+            return labels
+
+        low = np.minimum(roots_i[differ],roots_j[differ])
+        high = np.maximum(roots_i[differ],roots_j[differ])
+        np.minimum.at(labels,high,low)
+
+        #pointer jumping until every atom points at a root
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped,labels):
+                break
+            labels = jumped
+
+        #only pairs that were not yet joined need another pass
+        i = i[differ]
+        j = j[differ]
+
+def _components(natoms:int,i:np.ndarray,j:np.ndarray)->np.ndarray:
+    if connected_components is not None:
+        graph = coo_matrix((np.ones(len(i),dtype = np.int8),(i,j)),shape = (natoms,natoms))
+        return connected_components(graph,directed = False)[1]
+
+    return _union_find(natoms,i,j)
+
+################################################################################
+#Clusters#######################################################################
+################################################################################
+
+def _centers(dump_class:dumpFile,labels:np.ndarray,nclusters:int,weights:np.ndarray)->np.ndarray:
+    """
+    weighted cluster centers, along periodic axes the atoms are unwrapped
+    around the circular mean of their cluster first so clusters crossing a
+    boundary are handled
+    """
+    origin,matrix = box_matrix(dump_class)
+    fractional = fractional_coordinates(dump_class)
+    periodic = periodic_axes(dump_class)
+    totals = np.bincount(labels,weights = weights,minlength = nclusters)
+
+    centers = np.empty((nclusters,3))
+    for axis in range(3):
+        if periodic[axis]:
+            angle = 2.0*np.pi*fractional[:,axis]
+            cos = np.bincount(labels,weights = weights*np.cos(angle),minlength = nclusters)
+            sin = np.bincount(labels,weights = weights*np.sin(angle),minlength = nclusters)
+            reference = np.arctan2(sin,cos)/(2.0*np.pi)
+
+            delta = fractional[:,axis]-reference[labels]
+            delta -= np.round(delta)
+            centers[:,axis] = np.mod(reference+np.bincount(labels,weights = weights*delta,minlength = nclusters)/totals,1.0)
+        else:
+            centers[:,axis] = np.bincount(labels,weights = weights*fractional[:,axis],minlength = nclusters)/totals
+
+    return origin+centers @ matrix
+
+def _weights(dump_class:dumpFile,masses:dict)->np.ndarray:
+    atoms = dump_class.atoms
+    if "mass" in atoms.columns:
+        return atoms["mass"].to_numpy(dtype = float)
+    if masses is not None:
+        return atoms[dumpFile.type].map(masses).to_numpy(dtype = float)
+    return np.ones(len(atoms))
+
+def cluster_atoms(dump_class:dumpFile,cutoff:float,column:str = "cluster",masses:dict = None,min_size:int = 1):
+    """
+    finds the clusters of atoms joined by distances below cutoff
+
+    proper call:
+    clustered,clusters = cluster_atoms(dump_class,cutoff,column = "cluster",masses = None,min_size = 1)
+
+    clustered = new dumpFile with the cluster id of every atom in column,
+                clusters are numbered from 1 by decreasing size and atoms in
+                clusters smaller than min_size get 0[dumpFile]
+    clusters = DataFrame of cluster, size, mass and the center of mass x y z[pd.DataFrame]
+
+    the center of mass uses the mass column, masses = {type:mass} or equal
+    weights, clusters crossing a periodic boundary are unwrapped so their
+    center lands inside the box
+    """
+    with instrumentation.stage("cluster_atoms"):
+        natoms = len(dump_class.atoms)
+        i,j,distances = neighbor_pairs(dump_class,cutoff)
+        labels = _components(natoms,i,j)
+
+        #renumbering from 1 by decreasing size
+        roots,labels,sizes = np.unique(labels,return_inverse = True,return_counts = True)
+        ranking = np.argsort(-sizes,kind = "stable")
+        rank = np.empty_like(ranking)
+        rank[ranking] = np.arange(len(ranking))
+        labels = rank[labels.ravel()]
+        sizes = sizes[ranking]
+
+        weights = _weights(dump_class,masses)
+        centers = _centers(dump_class,labels,len(sizes),weights)
+        clusters = pd.DataFrame({"cluster":np.arange(1,len(sizes)+1),"size":sizes,"mass":np.bincount(labels,weights = weights,minlength = len(sizes)),"x":centers[:,0],"y":centers[:,1],"z":centers[:,2]})
+
+        kept = sizes >= min_size
+        numbering = np.where(kept,np.arange(1,len(sizes)+1),0)
+        clusters = clusters[kept].reset_index(drop = True)
+
+        atoms = dump_class.atoms.copy()
+        atoms[column] = numbering[labels]
+
+        instrumentation.count("clusters",len(clusters))
+
+    return dumpFile(dump_class.sim_timestep,dump_class.sim_numberofatoms,dump_class.sim_boxbounds,atoms),clusters
+
+def _cluster_frame(arguments):
+    key,dump_class,cutoff,column,masses,min_size = arguments
+    return key,cluster_atoms(dump_class,cutoff,column,masses,min_size)
+
+def cluster_trajectory(dump_files:dict,cutoff:float,column:str = "cluster",masses:dict = None,min_size:int = 1,max_workers:int = None)->dict:
+    """
+    runs cluster_atoms on every frame of a dictionary {id:dumpFile} in a process
+    pool(max_workers = 1 runs in this process)
+
+    returns {id:(clustered dumpFile,clusters DataFrame)}
+    """
+    arguments = [(key,dump_class,cutoff,column,masses,min_size) for key,dump_class in dump_files.items()]
+
+    if max_workers == 1 or len(arguments) < 2:
+        return dict(_cluster_frame(argument) for argument in arguments)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers = max_workers) as executor:
+        return dict(executor.map(_cluster_frame,arguments))
@@ -0,0 +1,389 @@
+"""
+This is a compact lossy trajectory format in the spirit of XTC, coordinates are
+quantized to a chosen precision, every frame is stored as the difference from
+the previous one(atoms sorted by id) and the small integers left are byte
+shuffled and compressed, a keyframe every few frames and an index at the end of
+the file give random access to any frame
+
+integer columns(id, type, image flags) are always stored exactly
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#default imports
+import json
+import lzma
+import struct
+import zlib
+
+#non-default imports
+import pandas as pd
+import numpy as np
+
+#package imports
+from LammpsFileManipulation.dump_file_manipulation import dumpFile,_make_boxbounds
+from LammpsFileManipulation import instrumentation
+
+################################################################################
+#Encoding#######################################################################
+################################################################################
+
+magic = b"LFMZ0001"
+
+#columns quantized with the precision(length units) and the scaled columns
+#quantized with precision/box length
+cartesian_columns = ["x","y","z","xu","yu","zu"]
+scaled_columns = {"xs":0,"ys":1,"zs":2,"xsu":0,"ysu":1,"zsu":2}
+
+_compressors = {"zlib":(lambda data,level: zlib.compress(data,level),zlib.decompress),
+                "lzma":(lambda data,level: lzma.compress(data,preset = level),lzma.decompress)}
+
+_segment = struct.Struct("<BBq")#itemsize of the stored integers, row differences or not, offset added back
+_unsigned = {1:np.uint8,2:np.uint16,4:np.uint32,8:np.uint64}
+
+def _pack(residual:np.ndarray)->bytes:
+    """
+    integers as the smallest unsigned type above their minimum, byte shuffled so
+    the mostly zero high bytes sit together for the compressor
+
+    when the difference between consecutive rows has a smaller spread(atoms with
+    neighboring ids sitting next to each other) the differences are stored
+    """
+    if len(residual) == 0:
+        return _segment.pack(1,0,0)
+
+    differences = np.diff(residual,prepend = 0)
+    rowwise = len(residual) > 1 and int(np.ptp(differences[1:])) < int(np.ptp(residual))
+    if rowwise:
+        residual = differences[1:]
+        first = int(differences[0])
+    else:
+        first = 0
+
+    offset = int(residual.min(initial = 0))
+    shifted = (residual-offset).astype(np.uint64)
+    largest = int(shifted.max(initial = 0))
+    itemsize = 1 if largest < 2**8 else 2 if largest < 2**16 else 4 if largest < 2**32 else 8
+
+    stored = shifted.astype(_unsigned[itemsize])
+    shuffled = stored.view(np.uint8).reshape(len(stored),itemsize).T.tobytes()
+
+    #the first row of row differences is kept whole in front of the offset
+    return _segment.pack(itemsize,int(rowwise),offset)+(struct.pack("<q",first) if rowwise else b"")+shuffled
+
+def _unpack(data:memoryview,position:int,count:int):
+    itemsize,rowwise,offset = _segment.unpack_from(data,position)
+    position += _segment.size
+
+    if rowwise:
+        first = struct.unpack_from("<q",data,position)[0]
+        position += 8
+        count -= 1
+
+    planes = np.frombuffer(data,dtype = np.uint8,count = count*itemsize,offset = position)
+    stored = np.ascontiguousarray(planes.reshape(itemsize,count).T).view(_unsigned[itemsize]).reshape(count)
+    values = stored.astype(np.int64)+offset
+
+    if rowwise:
+        values = np.cumsum(np.concatenate(([first],values)))
+
+    return values,position+count*itemsize
+
+def _column_kinds(atoms:pd.DataFrame,boxbounds:pd.DataFrame,precision:float,column_precision:dict)->tuple:
+    """
+    how every column is stored, "int"(exact), "quantized"(with a scale) or
+    "float"(exact float64 bits)
+    """
+    lengths = (boxbounds.loc["high",["x","y","z"]].to_numpy(dtype = float)-boxbounds.loc["low",["x","y","z"]].to_numpy(dtype = float)).tolist()
+    kinds = {}
+    scales = {}
+
+    for column in atoms.columns:
+        name = str(column)
+        if np.issubdtype(atoms[column].dtype,np.integer):
+            kinds[name] = "int"
+        elif name in column_precision:
+            kinds[name],scales[name] = "quantized",float(column_precision[name])
+        elif name in cartesian_columns:
+            kinds[name],scales[name] = "quantized",float(precision)
+        elif name in scaled_columns:
+            kinds[name],scales[name] = "quantized",float(precision)/lengths[scaled_columns[name]]
+        else:
+            kinds[name] = "float"
+
+    return kinds,scales
+
+def _quantize(values:np.ndarray,scale:float,column:str)->np.ndarray:
+    scaled = values/scale
+    if not np.all(np.isfinite(scaled)) or np.abs(scaled).max(initial = 0.0) > 2.0**62:
+        raise Exception("Column "+column+" can not be quantized(non finite or too large for its precision)")
+
+    return np.rint(scaled).astype(np.int64)
+
+################################################################################
+#Writing########################################################################
+################################################################################
+
+def write_compressed_trajectory(dump_files,file_path:str,precision:float = 1e-3,column_precision:dict = None,keyframe_interval:int = 10,compression:str = "zlib",level:int = 6,sort_by_id:bool = True)->dict:
+    """
+    writes a dictionary {id:dumpFile} or any iterable(generator) of dumpFile
+    classes to a compressed trajectory file one frame at a time
+
+    proper call:
+    stats = write_compressed_trajectory(dump_files,file_path,precision = 1e-3,column_precision = None,keyframe_interval = 10,compression = "zlib",level = 6,sort_by_id = True)
+
+    precision = quantization step of x y z xu yu zu(length units) so values are
+                read back within precision/2, the scaled xs ys zs columns use
+                precision/box length
+    column_precision = {"vx":1e-4,...} quantizes other float columns, float
+                columns not listed are kept exactly
+    keyframe_interval = frames between frames stored without the previous frame
+                (reading a frame decodes at most this many frames)
+    compression = "zlib" or "lzma"(smaller but slower)
+    sort_by_id = False keeps the row order of the frames(for example from
+                spatial_sort_trajectory), it must be the same in every frame
+                for the frames to be stored as differences
+
+    every frame must have the columns of the first frame, frames whose atom ids
+    differ from the previous frame start a new keyframe
+
+    returns {"frames","bytes_written","compression_ratio"} where the ratio is
+    against the float64/int64 size of the atom columns
+    """
+    if compression not in _compressors:
+        raise Exception('compression is not recognized ["zlib","lzma"]')
+    compress = _compressors[compression][0]
+    column_precision = {} if column_precision is None else column_precision
+
+    frames = dump_files.values() if isinstance(dump_files,dict) else dump_files
+    index = {"columns":None,"kinds":None,"scales":None,"compression":compression,"sorted_by_id":sort_by_id,"frames":[]}
+    previous_ids = None
+    previous = {}
+    raw_bytes = 0
+
+    with open(file_path,"wb") as file:
+        file.write(magic)
+
+        for dump_class in frames:
+            with instrumentation.stage("encode_frame"):
+                atoms = dump_class.atoms.sort_values(dumpFile.id,kind = "stable") if sort_by_id else dump_class.atoms
+
+                if index["columns"] is None:
+                    index["kinds"],index["scales"] = _column_kinds(atoms,dump_class.sim_boxbounds,precision,column_precision)
+                    index["columns"] = list(index["kinds"])
+
+                if [str(column) for column in atoms.columns] != index["columns"]:
+                    raise Exception("Frame "+str(dump_class.sim_timestep)+" does not have the columns of the trajectory file")
+
+                ids = atoms[dumpFile.id].to_numpy(dtype = np.int64)
+                keyframe = len(index["frames"]) % keyframe_interval == 0 or previous_ids is None or not np.array_equal(ids,previous_ids)
+
+                segments = []
+                for column in index["columns"]:
+                    kind = index["kinds"][column]
+                    values = atoms[column].to_numpy()
+
+                    if kind == "float":
+                        segments.append(values.astype(np.float64).view(np.uint8).reshape(len(values),8).T.tobytes())
+                        continue
+
+                    current = values.astype(np.int64) if kind == "int" else _quantize(values.astype(np.float64),index["scales"][column],column)
+                    if keyframe:
+                        residual = current
+                    elif column == dumpFile.id:
+                        residual = current[:0]#unchanged ids are not stored
+                    else:
+                        residual = current-previous[column]
+
+                    segments.append(_pack(residual))
+                    previous[column] = current
+
+                payload = compress(b"".join(segments),level)
+
+            boxbounds = dump_class.sim_boxbounds
+            index["frames"].append({"timestep":int(dump_class.sim_timestep),
+                                    "numberofatoms":int(dump_class.sim_numberofatoms),
+                                    "rows":len(atoms),
+                                    "keyframe":bool(keyframe),
+                                    "offset":file.tell(),
+                                    "length":len(payload),
+                                    "lows":boxbounds.loc["low",["x","y","z"]].astype(float).tolist(),
+                                    "highs":boxbounds.loc["high",["x","y","z"]].astype(float).tolist(),
+                                    "boundingtypes":boxbounds.loc["type",["x","y","z"]].tolist(),
+                                    "tilts":boxbounds.loc["tilt",["x","y","z"]].astype(float).tolist() if "tilt" in boxbounds.index else None})
+            file.write(payload)
+
+            previous_ids = ids
+            raw_bytes += len(atoms)*len(index["columns"])*8
+            instrumentation.count("frames_processed")
+
+        #the index and its length close the file so frames can be found from the end
+        encoded = json.dumps(index).encode()
+        file.write(encoded)
+        file.write(struct.pack("<Q",len(encoded)))
+        file.write(magic)
+        written = file.tell()
+
+    instrumentation.count("bytes_written",written)
+
+    return {"frames":len(index["frames"]),"bytes_written":written,"compression_ratio":raw_bytes/written if written else 0.0}
+
+################################################################################
+#Reading########################################################################
+################################################################################
+
+class compressedTrajectory:
+    """
+    This is a reader of a trajectory written by write_compressed_trajectory,
+    only the index is read when it is opened and each frame is decoded from
+    its nearest keyframe, the last decoded frame is kept so reading frames in
+    order decodes every frame once
+
+    proper call:
+    with compressedTrajectory(file_path) as trajectory:
+        dump_class = trajectory.frame(0) #by position
+        dump_class = trajectory.frame_at(10000) #by timestep
+        for dump_class in trajectory:
+            ...
+
+    valid property calls:
+        trajectory.timesteps = timesteps of the frames[np.ndarray]
+        trajectory.columns = atom columns[list]
+        trajectory.precision = {column:largest rounding error} of the lossy columns[dict]
+        trajectory.numberofframes = frames in the file[int]
+
+    the atoms of every frame are sorted by id unless the file was written with
+    sort_by_id = False
+    """
+
+    def __init__(self,file_path:str):
+        self.file_path = file_path
+        self.file = open(file_path,"rb")
+
+        self.file.seek(-len(magic)-8,2)
+        length = struct.unpack("<Q",self.file.read(8))[0]
+        if self.file.read(len(magic)) != magic:
+            raise Exception(str(file_path)+" is not a compressed trajectory file")
+
+        self.file.seek(-len(magic)-8-length,2)
+        self.index = json.loads(self.file.read(length))
+
+        self.frames = self.index["frames"]
+        self.columns = self.index["columns"]
+        self.timesteps = np.array([frame["timestep"] for frame in self.frames],dtype = np.int64)
+        self._decompress = _compressors[self.index["compression"]][1]
+        self._decoded = None#(position,{column:integers or floats})
+
+    @property
+    def numberofframes(self):
+        return len(self.frames)
+
+    @property
+    def precision(self):
+        return {column:scale/2.0 for column,scale in self.index["scales"].items()}
+
+    def _decode(self,position:int,previous:dict)->dict:
+        """
+        column values of one frame, previous holds the decoded integers of the
+        frame before it(ignored for keyframes)
+        """
+        entry = self.frames[position]
+        self.file.seek(entry["offset"])
+        data = memoryview(self._decompress(self.file.read(entry["length"])))
+        count = entry["rows"]
+        instrumentation.count("bytes_read",entry["length"])
+
+        values = {}
+        offset = 0
+        for column in self.columns:
+            if self.index["kinds"][column] == "float":
+                planes = np.frombuffer(data,dtype = np.uint8,count = count*8,offset = offset)
+                values[column] = np.ascontiguousarray(planes.reshape(8,count).T).view(np.float64).reshape(count)
+                offset += count*8
+                continue
+
+            if entry["keyframe"]:
+                values[column],offset = _unpack(data,offset,count)
+            elif column == dumpFile.id:
+                values[column],offset = previous[column],_unpack(data,offset,0)[1]
+            else:
+                residual,offset = _unpack(data,offset,count)
+                values[column] = previous[column]+residual
+
+        return values
+
+    def _values(self,position:int)->dict:
+        if position < 0:
+            position += self.numberofframes
+        if not 0 <= position < self.numberofframes:
+            raise Exception("Frame "+str(position)+" is not in the trajectory")
+
+        #decoding from the cached frame when it is between the keyframe and position
+        start = position
+        while not self.frames[start]["keyframe"]:
+            start -= 1
+        if self._decoded is not None and start <= self._decoded[0] <= position:
+            start,values = self._decoded[0]+1,self._decoded[1]
+        else:
+            values = None
+
+        with instrumentation.stage("decode_frame"):
+            for step in range(start,position+1):
+                values = self._decode(step,values)
+                instrumentation.count("frames_processed")
+
+        self._decoded = (position,values)
+
+        return values
+
+    def frame(self,position:int,columns:list = None)->dumpFile:
+        """
+        decodes one frame by position into a dumpFile
+        """
+        values = self._values(position)
+        entry = self.frames[position]
+        columns = self.columns if columns is None else list(columns)
+
+        atoms = {}
+        for column in columns:
+            kind = self.index["kinds"][column]
+            atoms[column] = values[column]*self.index["scales"][column] if kind == "quantized" else values[column]
+
+        boxbounds = _make_boxbounds(entry["lows"],entry["highs"],entry["boundingtypes"],entry["tilts"])
+
+        return dumpFile(entry["timestep"],entry["numberofatoms"],boxbounds,pd.DataFrame(atoms,columns = columns))
+
+    def frame_at(self,timestep:int,columns:list = None)->dumpFile:
+        """
+        decodes one frame by timestep into a dumpFile
+        """
+        matches = np.flatnonzero(self.timesteps == timestep)
+        if len(matches) == 0:
+            raise Exception("Timestep "+str(timestep)+" is not in the trajectory")
+
+        return self.frame(int(matches[0]),columns)
+
+    def __iter__(self):
+        for position in range(self.numberofframes):
+            yield self.frame(position)
+
+    def __len__(self):
+        return self.numberofframes
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc_info):
+        self.close()
+        return False
@@ -0,0 +1,319 @@
+"""
+This is the merging and splitting of dump files at the frame level, the frames
+are located by their byte offsets and copied verbatim so the atom lines are
+never parsed, restarted runs with overlapping timesteps can be merged into one
+trajectory and a multi-timestep file can be split into single frame files
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#default imports
+import os
+import glob
+import warnings
+import concurrent.futures
+
+#package imports
+from LammpsFileManipulation.dump_file_parsing import _read_dump_header,_skip_line_block
+from LammpsFileManipulation import instrumentation
+
+################################################################################
+#Frame offsets##################################################################
+################################################################################
+
+def frame_offsets(file_path:str)->list:
+    """
+    byte range of every frame of a single or multi timestep dump, only the
+    headers are decoded and the atom lines are stepped over
+
+    proper call:
+    frames = frame_offsets(file_path)
+
+    returns a list of dictionaries {"path","timestep","numberofatoms","start","end"}
+    where start:end are the bytes of the frame from "ITEM: TIMESTEP" to the end
+    of its last atom line, a last frame cut short(a crashed run) is left out
+    with a warning
+    """
+    frames = []
+
+    with open(file_path,"rb") as file:
+        start = file.tell()
+        header = _read_dump_header(file)
+
+        while header is not None:
+            missing = _skip_line_block(file,header["numberofatoms"])
+            end = file.tell()
+
+            if missing == 1 and _complete_last_line(file,end,len(header["titles"])):
+                missing = 0#the file does not end with a newline
+
+            if missing > 0:
+                warnings.warn("Skipping the last frame of "+str(file_path)+" timestep "+str(header["timestep"])+" it is missing "+str(missing)+" atom lines")
+                break
+
+            frames.append({"path":file_path,"timestep":header["timestep"],"numberofatoms":header["numberofatoms"],"start":start,"end":end})
+
+            start = end
+            header = _read_dump_header(file)
+
+    instrumentation.count("frames_indexed",len(frames))
+
+    return frames
+
+def _complete_last_line(file,end:int,ncolumns:int)->bool:
+    """
+    whether the file ends with a whole atom line that has no newline
+    """
+    file.seek(max(0,end-4096))
+    tail = file.read(end-max(0,end-4096))
+    file.seek(end)
+
+    if not tail or tail.endswith(b"\n"):
+        return False
+
+    return len(tail.rsplit(b"\n",1)[-1].split()) == ncolumns
+
+def _source_files(sources)->list:
+    """
+    expands directories(every file not starting with ".") and glob patterns of
+    a list of sources keeping the given order of the sources
+    """
+    if isinstance(sources,str):
+        sources = [sources]
+
+    file_paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            file_paths += sorted(os.path.join(source,name) for name in os.listdir(source) if not name.startswith(".") and os.path.isfile(os.path.join(source,name)))
+        elif os.path.exists(source):
+            file_paths.append(source)
+        else:
+            matches = sorted(glob.glob(source))
+            if not matches:
+                raise Exception("No dump files found for "+str(source))
+            file_paths += matches
+
+    return file_paths
+
+def _indexed_sources(file_paths:list)->list:
+    """
+    frame offsets of every file, files without a dump header(text without ITEM
+    lines or binary files) are skipped with a warning, a broken header or a
+    file that can not be read raises, the files are ordered by their first
+    timestep and ties keep the order of file_paths so later restarts stay later
+    """
+    indexed = []
+    for file_path in file_paths:
+        try:
+            frames = frame_offsets(file_path)
+        except UnicodeDecodeError:
+            frames = []#not a text file so there is no dump header
+
+        if not frames:
+            warnings.warn("Skipping "+str(file_path)+" it does not have a complete dump frame")
+            continue
+        indexed.append(frames)
+
+    return sorted(indexed,key = lambda frames: frames[0]["timestep"])
+
+################################################################################
+#Concatenating##################################################################
+################################################################################
+
+def _resolve(indexed:list,duplicates:str)->list:
+    """
+    frames kept in timestep order
+
+    duplicates = "first" keeps the earliest copy of a repeated timestep, "last"
+                 the copy from the latest file and "restart" also drops every
+                 frame of a file at or after the first timestep of the next file
+                 (the run was restarted from an earlier point)
+    """
+    if duplicates not in ["first","last","restart"]:
+        raise Exception('duplicates is not recognized ["first","last","restart"]')
+
+    if duplicates == "restart":
+        truncated = []
+        for ind,frames in enumerate(indexed):
+            if ind+1 < len(indexed):
+                restart = indexed[ind+1][0]["timestep"]
+                frames = [frame for frame in frames if frame["timestep"] < restart]
+            truncated.append(frames)
+        indexed = truncated
+        duplicates = "last"
+
+    kept = {}
+    for frames in indexed:
+        for frame in frames:
+            if duplicates == "last" or frame["timestep"] not in kept:
+                kept[frame["timestep"]] = frame
+
+    return [kept[timestep] for timestep in sorted(kept)]
+
+def _copy_range(source,destination,start:int,end:int,buffer_size:int):
+    """
+    copies the bytes start:end of an unbuffered source file to the end of an
+    unbuffered destination, copy_file_range keeps the data in the kernel where
+    the platform has it
+    """
+    instrumentation.count("bytes_copied",end-start)
+
+    if hasattr(os,"copy_file_range"):
+        try:
+            while start < end:
+                copied = os.copy_file_range(source.fileno(),destination.fileno(),min(end-start,2**30),start)
+                if copied == 0:
+                    break
+                start += copied
+            return
+        except OSError:
+            pass#different file systems on some kernels
+
+    source.seek(start)
+    while start < end:
+        chunk = source.read(min(buffer_size,end-start))
+        if not chunk:
+            break
+        destination.write(chunk)
+        start += len(chunk)
+
+def _ends_with_newline(source,end:int)->bool:
+    source.seek(end-1)
+    return source.read(1) == b"\n"
+
+def _copy_frames(frames:list,file_path:str,mode:str,buffer_size:int):
+    """
+    writes frames(from frame_offsets) to file_path in order, frames that follow
+    each other in the same file are copied as one range
+    """
+    ranges = []
+    for frame in frames:
+        if ranges and ranges[-1][0] == frame["path"] and ranges[-1][2] == frame["start"]:
+            ranges[-1][2] = frame["end"]
+        else:
+            ranges.append([frame["path"],frame["start"],frame["end"]])
+
+    sources = {}
+    try:
+        with open(file_path,mode,buffering = 0) as destination:
+            for path,start,end in ranges:
+                if path not in sources:
+                    sources[path] = open(path,"rb",buffering = 0)
+                source = sources[path]
+
+                _copy_range(source,destination,start,end,buffer_size)
+
+                #the last frame of a file may not end with a newline
+                if not _ends_with_newline(source,end):
+                    destination.write(b"\n")
+    finally:
+        for source in sources.values():
+            source.close()
+
+def concatenate_dumps(sources,file_path:str,duplicates:str = "last",timestep_range:tuple = None,mode:str = "w",buffer_size:int = 2**22)->list:
+    """
+    merges dump files(or directories/glob patterns of them) into one multi
+    timestep dump in timestep order without parsing the atoms
+
+    proper call:
+    frames = concatenate_dumps(sources,file_path,duplicates = "last",timestep_range = None,mode = "w")
+
+    sources = file path, directory, glob pattern or a list of them, the files are
+              ordered by their first timestep, files starting at the same
+              timestep keep the order of sources and the matches of a
+              directory or glob pattern are in name order(dump.10 before
+              dump.2) so give restarts with equal first timesteps as a list
+    duplicates = "first" keeps the earliest copy of a repeated timestep
+                 "last" keeps the copy from the latest file
+                 "restart" like "last" but a file also loses every frame at or
+                 after the first timestep of the next file(the frames a crashed
+                 run wrote past the restart point)
+    timestep_range = (lo,hi) inclusive range of timesteps to keep
+    mode = "w" overwrite or "a" append to file_path
+
+    returns the frames written(see frame_offsets)
+    """
+    if mode not in ["w","a"]:
+        raise Exception('mode is not recognized ["w","a"]')
+
+    file_paths = _source_files(sources)
+    if os.path.abspath(file_path) in [os.path.abspath(path) for path in file_paths]:
+        raise Exception("The output file can not be one of the sources")
+
+    with instrumentation.stage("concatenate_dumps"):
+        frames = _resolve(_indexed_sources(file_paths),duplicates)
+
+        if timestep_range is not None:
+            frames = [frame for frame in frames if timestep_range[0] <= frame["timestep"] <= timestep_range[1]]
+
+        _copy_frames(frames,file_path,mode+"b",buffer_size)
+        instrumentation.count("frames_written",len(frames))
+
+    return frames
+
+################################################################################
+#Splitting######################################################################
+################################################################################
+
+def _write_split(arguments):
+    file_path,frames,buffer_size = arguments
+
+    with open(file_path,"rb",buffering = 0) as source:
+        for frame in frames:
+            with open(frame["output"],"wb",buffering = 0) as destination:
+                _copy_range(source,destination,frame["start"],frame["end"],buffer_size)
+                if not _ends_with_newline(source,frame["end"]):
+                    destination.write(b"\n")
+
+    return len(frames)
+
+def split_dump(file_path:str,directory:str,file_pattern:str = "dump.{timestep}.txt",start:int = None,stop:int = None,step:int = None,max_workers:int = None,buffer_size:int = 2**22)->list:
+    """
+    writes every frame of a multi timestep dump to its own file, the frames are
+    found by their byte offsets and copied verbatim by a process pool
+    (max_workers = 1 runs in this process)
+
+    proper call:
+    file_paths = split_dump(file_path,directory,file_pattern = "dump.{timestep}.txt",max_workers = None)
+
+    file_pattern = name of each file formatted with {timestep} and {index}(the
+                   frame position), use {index} when timesteps repeat
+    start,stop,step = slice of the frame positions to write
+
+    returns the written file paths in frame order, the files can be read back
+    with batch_import_files or dumpCatalog
+    """
+    frames = frame_offsets(file_path)[slice(start,stop,step)]
+
+    for index,frame in enumerate(frames):
+        frame["output"] = os.path.join(directory,file_pattern.format(timestep = frame["timestep"],index = index))
+
+    outputs = [frame["output"] for frame in frames]
+    if len(set(outputs)) != len(outputs):
+        raise Exception("file_pattern gives the same name to several frames, add {index} to it")
+
+    os.makedirs(directory,exist_ok = True)
+
+    workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+    size = max(1,-(-len(frames)//workers))
+    arguments = [(file_path,frames[ind:ind+size],buffer_size) for ind in range(0,len(frames),size)]
+
+    with instrumentation.stage("split_dump"):
+        if max_workers == 1 or len(arguments) < 2:
+            for argument in arguments:
+                _write_split(argument)
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers = max_workers) as executor:
+                list(executor.map(_write_split,arguments))
+
+        instrumentation.count("frames_written",len(frames))
+
+    return outputs
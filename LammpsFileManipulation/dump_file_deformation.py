@@ -0,0 +1,238 @@
+"""
+This is per atom deformation analysis of dumpFile classes against a reference
+frame, the displacement of every atom and the Falk-Langer non-affine squared
+displacement D2min(Phys. Rev. E 57, 7192 (1998)) over the neighbors the atom
+had in the reference frame, atoms are matched by id with lookups instead of
+merges and frames of a trajectory are streamed through a process pool
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#default imports
+import os
+import collections
+import concurrent.futures
+
+#non-default imports
+import numpy as np
+
+#package imports
+from LammpsFileManipulation.dump_file_manipulation import dumpFile
+from LammpsFileManipulation.dump_frame import dumpFrame
+from LammpsFileManipulation.dump_file_periodic import box_matrix,periodic_axes,positions,image_columns
+from LammpsFileManipulation.dump_file_neighbors import neighbor_list
+from LammpsFileManipulation import instrumentation
+from LammpsFileManipulation import kernels
+
+################################################################################
+#Reference frame################################################################
+################################################################################
+
+def _has_images(dump_class:dumpFile)->bool:
+    return set(image_columns).issubset(dump_class.atoms.columns)
+
+def _unwrapped(dump_class:dumpFile)->np.ndarray:
+    """
+    positions with the image flags added when the frame has them
+    """
+    if not _has_images(dump_class):
+        return positions(dump_class)
+
+    origin,matrix = box_matrix(dump_class)
+    return positions(dump_class)+dump_class.atoms[image_columns].to_numpy(dtype = float) @ matrix
+
+def _reference_state(reference:dumpFile,cutoff:float = None)->dict:
+    """
+    what every frame is compared with, the ids(for the lookup), the positions
+    and the neighbor pairs of the reference frame
+    """
+    with instrumentation.stage("deformation_reference"):
+        atoms = reference.atoms[[dumpFile.id]].copy()
+        state = {"frame":dumpFile(reference.sim_timestep,reference.sim_numberofatoms,reference.sim_boxbounds,atoms),
+                 "positions":_unwrapped(reference),"images":_has_images(reference),"cutoff":cutoff}
+
+        if cutoff is not None:
+            offsets,neighbors,vectors = neighbor_list(reference,cutoff)
+            state["source"] = np.repeat(np.arange(len(atoms)),np.diff(offsets))
+            state["target"] = neighbors
+            state["vectors"] = vectors
+            state["inverse"],state["singular"] = _reference_inverse(state["source"],vectors,len(atoms))
+
+    return state
+
+################################################################################
+#Displacement and D2min#########################################################
+################################################################################
+
+def _reference_inverse(source:np.ndarray,reference_vectors:np.ndarray,natoms:int):
+    """
+    Y^-1 with Y = sum d0 d0^T over the reference neighbors of every atom, it
+    only depends on the reference frame so it is found once, atoms with less
+    than three neighbors out of a plane(Y singular) are flagged
+    """
+    Y = np.empty((natoms,3,3))
+    for a in range(3):
+        for b in range(a,3):
+            Y[:,a,b] = np.bincount(source,reference_vectors[:,a]*reference_vectors[:,b],minlength = natoms)
+            Y[:,b,a] = Y[:,a,b]
+
+    scale = np.einsum("aii->a",Y)
+    singular = ~(np.abs(np.linalg.det(Y)) > 1e-12*scale**3)
+    Y[singular] = np.eye(3)
+
+    return np.linalg.inv(Y),singular
+
+def _d2min(state:dict,current:np.ndarray)->np.ndarray:
+    """
+    D2min = min over J of sum_j |d_ij - J d0_ij|^2 with d0 the reference and d
+    the current neighbor vectors, J = X Y^-1 with X = sum d d0^T and the
+    minimum is sum |d|^2 - sum_ab J_ab X_ab
+
+    atoms with a singular Y or with a neighbor missing from the frame get nan
+    """
+    source = state["source"]
+    reference_vectors = state["vectors"]
+    natoms = len(state["inverse"])
+
+    X = np.empty((natoms,3,3))
+    for a in range(3):
+        for b in range(3):
+            X[:,a,b] = np.bincount(source,current[:,a]*reference_vectors[:,b],minlength = natoms)
+    squared = np.bincount(source,np.einsum("ij,ij->i",current,current),minlength = natoms)
+
+    J = X @ state["inverse"]
+    values = np.maximum(squared-np.einsum("aij,aij->a",J,X),0.0)
+    values[state["singular"]] = np.nan
+
+    return values
+
+def _deform(state:dict,dump_class:dumpFile,columns:list,d2min_column:str)->dumpFile:
+    if isinstance(dump_class,dumpFrame):
+        dump_class = dump_class.to_dumpfile()
+
+    reference = state["frame"]
+    rows = reference.rows_of_ids(dump_class.atoms[dumpFile.id].to_numpy())
+
+    #r - r0 of every atom of the frame(in its row order)
+    current = _unwrapped(dump_class)
+    delta = current-state["positions"][rows]
+    if not (state["images"] and _has_images(dump_class)):
+        origin,matrix = box_matrix(dump_class)
+        delta = kernels.minimum_image(delta,matrix,np.linalg.inv(matrix),periodic_axes(dump_class))
+
+    atoms = dump_class.atoms.copy()
+    for ind,column in enumerate(columns[:3]):
+        atoms[column] = delta[:,ind]
+    if len(columns) > 3:
+        atoms[columns[3]] = np.sqrt(np.einsum("ij,ij->i",delta,delta))
+
+    if state["cutoff"] is not None:
+        #the reference pairs in the box of this frame(follows box deformation),
+        #nan for atoms not in the frame
+        placed = np.full(state["positions"].shape,np.nan)
+        placed[rows] = current
+        origin,matrix = box_matrix(dump_class)
+        vectors = kernels.minimum_image(placed[state["target"]]-placed[state["source"]],matrix,np.linalg.inv(matrix),periodic_axes(dump_class))
+        atoms[d2min_column] = _d2min(state,vectors)[rows]
+
+    instrumentation.count("frames_processed",1)
+
+    return dumpFile(dump_class.sim_timestep,dump_class.sim_numberofatoms,dump_class.sim_boxbounds,atoms)
+
+def displacement(reference:dumpFile,dump_class:dumpFile,cutoff:float = None,columns:list = ["dx","dy","dz","dr"],d2min_column:str = "d2min")->dumpFile:
+    """
+    returns a new dumpFile with the displacement of every atom since the
+    reference frame and(when a cutoff is given) its D2min
+
+    proper call:
+    dump_class = displacement(reference,dump_class,cutoff = None,columns = ["dx","dy","dz","dr"],d2min_column = "d2min")
+
+    atoms are matched by id, every atom of dump_class must be in the reference
+    frame, when both frames have the ix iy iz image flags the unwrapped
+    positions are used otherwise the displacements are the minimum image ones
+    in the box of dump_class(so they must stay below half a box length)
+
+    columns = names of the x y z displacement and its length(give 3 names to
+              leave out the length)
+    cutoff = neighbor cutoff of D2min, the neighbors are the ones within
+             cutoff in the reference frame and D2min is the sum of the squared
+             non-affine parts of their relative displacements
+    """
+    with instrumentation.stage("displacement"):
+        return _deform(_reference_state(reference,cutoff),dump_class,columns,d2min_column)
+
+################################################################################
+#Trajectories###################################################################
+################################################################################
+
+_state = None #reference state of the pool workers
+
+def _set_state(state:dict):
+    global _state
+    _state = state
+
+def _deform_frame(arguments):
+    dump_class,columns,d2min_column = arguments
+
+    with instrumentation.stage("displacement"):
+        return _deform(_state,dump_class,columns,d2min_column)
+
+def displacement_frames(reference:dumpFile,frames,cutoff:float = None,columns:list = ["dx","dy","dz","dr"],d2min_column:str = "d2min",max_workers:int = None,queue_depth:int = None):
+    """
+    generator of the frames with the displacement(and D2min) columns added in
+    the order they were given, the frames are read from any iterable of
+    dumpFile or dumpFrame classes(read_frames, frameCache, ...) as they are
+    needed so the trajectory never has to be in memory
+
+    proper call:
+    for dump_class in displacement_frames(reference,frames,cutoff = 3.5,max_workers = None,queue_depth = None):
+        ...
+
+    the reference neighbor list is built once and sent once to every process
+    of the pool(max_workers = 1 runs in this process), at most queue_depth
+    frames **default 2 per process are in flight at a time
+    see displacement for the other options
+    """
+    frames = frames.values() if isinstance(frames,dict) else frames
+    state = _reference_state(reference,cutoff)
+
+    if max_workers == 1:
+        for dump_class in frames:
+            with instrumentation.stage("displacement"):
+                yield _deform(state,dump_class,columns,d2min_column)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers = max_workers,initializer = _set_state,initargs = (state,)) as executor:
+        queue_depth = queue_depth if queue_depth is not None else 2*(max_workers or os.cpu_count() or 1)
+        pending = collections.deque()
+
+        for dump_class in frames:
+            pending.append(executor.submit(_deform_frame,(dump_class,columns,d2min_column)))
+            if len(pending) >= queue_depth:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+def displacement_trajectory(dump_files:dict,cutoff:float = None,reference = None,columns:list = ["dx","dy","dz","dr"],d2min_column:str = "d2min",max_workers:int = None)->dict:
+    """
+    adds the displacement(and D2min) columns to every frame of a dictionary
+    {id:dumpFile}, reference = a dumpFile or the id of a frame in dump_files
+    **default the first frame
+
+    returns a new dictionary {id:dumpFile}
+    """
+    if reference is None:
+        reference = next(iter(dump_files.values()))
+    elif not isinstance(reference,dumpFile):
+        reference = dump_files[reference]
+
+    return dict(zip(dump_files.keys(),displacement_frames(reference,dump_files,cutoff,columns,d2min_column,max_workers)))
@@ -0,0 +1,208 @@
+"""
+This is an HDF5 trajectory store for dumpFile classes, every atom column is a
+chunked and compressed (frames x atoms) dataset so single frames or the history
+of single atoms can be read without decompressing the rest of the file
+
+requires h5py(pip install LammpsFileManipulation[hdf5])
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#non-default imports
+import pandas as pd
+import numpy as np
+
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+#package imports
+from LammpsFileManipulation.dump_file_manipulation import dumpFile,_make_boxbounds
+
+################################################################################
+#Writing########################################################################
+################################################################################
+
+def _require_h5py():
+    if h5py is None:
+        raise Exception("h5py is required for HDF5 trajectories (pip install h5py)")
+
+def _frame_atoms(dump_class:dumpFile,sort_by_id:bool)->pd.DataFrame:
+    if sort_by_id:
+        return dump_class.atoms.sort_values(dumpFile.id,kind = "stable")
+    return dump_class.atoms
+
+def write_hdf5_trajectory(dump_files,file_path:str,compression:str = "gzip",chunk_frames:int = 16,chunk_atoms:int = 4096,sort_by_id:bool = True):
+    """
+    writes(or appends to) an HDF5 trajectory from a dictionary {id:dumpFile} or
+    any iterable of dumpFile classes
+
+    file layout:
+        timesteps = (frames) timesteps
+        numberofatoms = (frames) simulation number of atoms
+        boxbounds = (frames x 3 x 2) low/high of x y z
+        tilts = (frames x 3) xy xz yz, only once a triclinic frame is written
+                (nan for the orthogonal frames so they are read back orthogonal)
+        atoms/<column> = (frames x atoms) chunked(chunk_frames x chunk_atoms) and compressed
+        attributes: boundingtypes, columns
+
+    every frame must have the same atoms and columns as the file, with
+    sort_by_id = True rows are ordered by id so a row is the same atom in every frame
+    """
+    _require_h5py()
+
+    frames = dump_files.values() if isinstance(dump_files,dict) else dump_files
+
+    with h5py.File(file_path,"a") as file:
+        for dump_class in frames:
+            atoms = _frame_atoms(dump_class,sort_by_id)
+            natoms = len(atoms)
+            triclinic = "tilt" in dump_class.sim_boxbounds.index
+
+            if "timesteps" not in file:
+                #creating the datasets from the first frame
+                file.attrs["boundingtypes"] = dump_class.boundingtypes[["x","y","z"]].tolist()
+                file.attrs["columns"] = [str(column) for column in atoms.columns]
+                file.attrs["sorted_by_id"] = sort_by_id
+                file.create_dataset("timesteps",shape = (0,),maxshape = (None,),dtype = np.int64,chunks = (1024,))
+                file.create_dataset("numberofatoms",shape = (0,),maxshape = (None,),dtype = np.int64,chunks = (1024,))
+                file.create_dataset("boxbounds",shape = (0,3,2),maxshape = (None,3,2),dtype = np.float64,chunks = (1024,3,2))
+
+                group = file.create_group("atoms")
+                chunks = (chunk_frames,max(1,min(chunk_atoms,natoms)))
+                for column in atoms.columns:
+                    group.create_dataset(str(column),shape = (0,natoms),maxshape = (None,natoms),dtype = atoms[column].to_numpy().dtype,chunks = chunks,compression = compression)
+
+            if [str(column) for column in atoms.columns] != list(file.attrs["columns"]) or natoms != file["atoms"][str(atoms.columns[0])].shape[1]:
+                raise Exception("Frame "+str(dump_class.sim_timestep)+" does not have the atoms/columns of the trajectory file")
+
+            index = file["timesteps"].shape[0]
+            if triclinic and "tilts" not in file:
+                #the first triclinic frame(possibly appended to an orthogonal run), earlier frames get nan tilts
+                file.create_dataset("tilts",data = np.full((index,3),np.nan),maxshape = (None,3),dtype = np.float64,chunks = (1024,3))
+
+            for name in ["timesteps","numberofatoms","boxbounds"]+(["tilts"] if "tilts" in file else []):
+                file[name].resize(index+1,axis = 0)
+
+            file["timesteps"][index] = dump_class.sim_timestep
+            file["numberofatoms"][index] = dump_class.sim_numberofatoms
+            file["boxbounds"][index] = dump_class.sim_boxbounds.loc[["low","high"],["x","y","z"]].to_numpy(dtype = float).T
+            if "tilts" in file:
+                file["tilts"][index] = dump_class.sim_boxbounds.loc["tilt",["x","y","z"]].to_numpy(dtype = float) if triclinic else np.nan
+
+            for column in atoms.columns:
+                dataset = file["atoms"][str(column)]
+                dataset.resize(index+1,axis = 0)
+                dataset[index] = atoms[column].to_numpy()
+
+################################################################################
+#Reading########################################################################
+################################################################################
+
+class hdf5Trajectory:
+    """
+    This is a read only view of a trajectory written by write_hdf5_trajectory,
+    nothing is read until a frame, column slice or atom history is requested
+
+    proper call:
+    with hdf5Trajectory(file_path) as trajectory:
+        dump_class = trajectory.frame(0) #by position
+        dump_class = trajectory.frame_at(10000) #by timestep
+        x = trajectory.column("x")[:,10] #lazy h5py dataset slicing (frames x atoms)
+        history = trajectory.atom_history(atom_id,columns = ["x","y","z"])
+
+    valid property calls:
+        trajectory.timesteps = timesteps of the frames[np.ndarray]
+        trajectory.columns = atom columns[list]
+        trajectory.numberofframes = frames in the file[int]
+    """
+
+    def __init__(self,file_path:str):
+        _require_h5py()
+
+        self.file_path = file_path
+        self.file = h5py.File(file_path,"r")
+        self.timesteps = self.file["timesteps"][:]
+        self.columns = list(self.file.attrs["columns"])
+        self.boundingtypes = list(self.file.attrs["boundingtypes"])
+        self._ids = None
+
+    @property
+    def numberofframes(self):
+        return len(self.timesteps)
+
+    def column(self,name:str):
+        """
+        the h5py dataset of a column, slicing it only reads the chunks needed
+        """
+        return self.file["atoms"][name]
+
+    def frame(self,index:int,columns:list = None)->dumpFile:
+        """
+        reads one frame by position into a dumpFile
+        """
+        columns = self.columns if columns is None else list(columns)
+        atoms = pd.DataFrame({column:self.file["atoms"][column][index] for column in columns})
+
+        tilts = self.file["tilts"][index] if "tilts" in self.file else None
+        tilts = None if tilts is None or np.isnan(tilts).any() else tilts.tolist()#nan rows are orthogonal frames
+        bounds = self.file["boxbounds"][index]
+        boxbounds = _make_boxbounds(bounds[:,0].tolist(),bounds[:,1].tolist(),self.boundingtypes,tilts)
+
+        return dumpFile(int(self.timesteps[index]),int(self.file["numberofatoms"][index]),boxbounds,atoms)
+
+    def frame_at(self,timestep:int,columns:list = None)->dumpFile:
+        """
+        reads one frame by timestep into a dumpFile
+        """
+        matches = np.flatnonzero(self.timesteps == timestep)
+        if len(matches) == 0:
+            raise Exception("Timestep "+str(timestep)+" is not in the trajectory")
+
+        return self.frame(int(matches[0]),columns)
+
+    def atom_history(self,atom_id:int,columns:list = None)->pd.DataFrame:
+        """
+        values of one atom in every frame indexed by timestep, only the column of
+        chunks holding that atom is decompressed
+        """
+        if not self.file.attrs.get("sorted_by_id",False):
+            raise Exception("atom_history needs a trajectory written with sort_by_id = True")
+
+        if self._ids is None:
+            self._ids = self.file["atoms"][dumpFile.id][0]
+
+        row = int(np.searchsorted(self._ids,atom_id))
+        if row >= len(self._ids) or self._ids[row] != atom_id:
+            raise Exception("Atom id "+str(atom_id)+" is not in the trajectory")
+
+        columns = [column for column in self.columns if column != dumpFile.id] if columns is None else list(columns)
+        history = pd.DataFrame({column:self.file["atoms"][column][:,row] for column in columns},index = pd.Index(self.timesteps,name = "timestep"))
+
+        return history
+
+    def __iter__(self):
+        for index in range(self.numberofframes):
+            yield self.frame(index)
+
+    def __len__(self):
+        return self.numberofframes
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc_info):
+        self.close()
+        return False
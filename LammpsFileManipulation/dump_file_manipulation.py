@@ -15,19 +15,158 @@ github: https://github.com/AaronSchwan
 #default imports
 import sys
 import os
+import io
 import time
 import warnings
 import types
 import copy
+import collections
+import concurrent.futures
 
 #non-default imports
 import pandas as pd
 import numpy as np
 
+#package imports
+from LammpsFileManipulation import instrumentation
+from LammpsFileManipulation import kernels
+from LammpsFileManipulation.dump_file_parsing import _read_dump_header,_bounding_box,_read_line_block,_skip_line_block,_subsample_rows,_select_lines
+
 ################################################################################
 #Dealing with lammps dump files#################################################
 ################################################################################
 
+#parsing helpers################################################################
+def _make_boxbounds(lows:list,highs:list,boundingtypes:list,tilts:list = None)->pd.DataFrame:
+    """
+    builds the sim_boxbounds layout used by dumpFile (index low/high/type and
+    columns x/y/z)
+
+    triclinic boxes get a fourth "tilt" row holding xy, xz and yz in the x, y
+    and z columns
+    """
+    data = {"low":lows,"high":highs,"type":boundingtypes}
+    if tilts is not None:
+        data["tilt"] = tilts
+
+    return pd.DataFrame(data = data,index = ["x","y","z"]).T
+
+def _read_atom_block(buffer,titles:list,numberofatoms:int,atom_filter = None,columns:list = None)->pd.DataFrame:
+    """
+    parses the whitespace separated atom lines of a frame into a DataFrame
+
+    buffer = binary file like object positioned at the first atom line
+    atom_filter = atomFilter evaluated on every chunk of atom_filter.chunksize
+                  rows while decoding so only the matching rows are kept
+    columns = only these columns are converted **default all
+    """
+    if numberofatoms == 0:
+        return pd.DataFrame(columns = titles if columns is None else columns)
+
+    if kernels.backend != "numpy" and atom_filter is None and isinstance(buffer,io.BytesIO):
+        atoms = _tokenize_atom_block(buffer,titles,numberofatoms,columns)
+        if atoms is not None:
+            return atoms
+
+    with instrumentation.stage("read_csv"):
+        if atom_filter is None:
+            atoms = pd.read_csv(buffer,sep = r"\s+",header = None,names = titles,nrows = numberofatoms,usecols = columns)
+        else:
+            chunks = pd.read_csv(buffer,sep = r"\s+",header = None,names = titles,nrows = numberofatoms,usecols = columns,chunksize = atom_filter.chunksize)
+            atoms = pd.concat([atom_filter.apply(chunk) for chunk in chunks])
+
+    if instrumentation.active:
+        instrumentation.count("rows_parsed",numberofatoms)
+        instrumentation.peak("atoms_bytes",int(atoms.memory_usage().sum()))
+
+    return atoms
+
+def _tokenize_atom_block(buffer:io.BytesIO,titles:list,numberofatoms:int,columns:list = None)->pd.DataFrame:
+    """
+    parses the atom lines with the compiled tokenizer of the kernels module,
+    columns holding only integers keep an integer dtype like read_csv
+
+    returns None when the block is not exactly numberofatoms rows of numbers so
+    read_csv handles it
+    """
+    data = buffer.getbuffer()[buffer.tell():]
+
+    with instrumentation.stage("tokenize"):
+        values,integral = kernels.parse_numbers(data,len(titles))
+
+    if len(values) != numberofatoms*len(titles):
+        return None
+
+    values = values.reshape(numberofatoms,len(titles))
+    atoms = pd.DataFrame({title:(values[:,ind].astype(np.int64) if integral[ind] else values[:,ind]) for ind,title in enumerate(titles) if columns is None or title in columns})
+
+    if instrumentation.active:
+        instrumentation.count("rows_parsed",numberofatoms)
+        instrumentation.peak("atoms_bytes",int(atoms.memory_usage().sum()))
+
+    return atoms
+
+def _atoms_from_block(header:dict,block,atom_filter = None,rows:np.ndarray = None,columns:list = None)->pd.DataFrame:
+    """
+    parses the bytes of the atom lines of a frame
+
+    rows = line positions to keep(subsampling) **default all rows
+    columns = only these columns are converted **default all
+    """
+    numberofatoms = header["numberofatoms"]
+
+    if rows is not None:
+        block = _select_lines(block,rows)
+        numberofatoms = len(rows)
+
+    atoms = _read_atom_block(io.BytesIO(block),header["titles"],numberofatoms,atom_filter,columns)
+
+    if rows is not None and numberofatoms > 0:
+        atoms.index = rows[atoms.index.to_numpy()]#keeping the row positions of the file
+
+    return atoms
+
+def _frame_from_block(header:dict,block,atom_filter = None,rows:np.ndarray = None):
+    """
+    builds a dumpFile from a parsed header and the bytes of its atom lines
+
+    rows = line positions to keep(subsampling) **default all rows
+    """
+    atoms = _atoms_from_block(header,block,atom_filter,rows)
+    boxbounds = _make_boxbounds(header["lows"],header["highs"],header["boundingtypes"],header.get("tilts"))
+    instrumentation.count("frames_processed")
+
+    return dumpFile(header["timestep"],header["numberofatoms"],boxbounds,atoms)
+
+def _read_raw_file(file_path:str,buffer_size:int)->bytearray:
+    """
+    reads a whole file into memory in buffer_size pieces
+    """
+    with instrumentation.stage("read_file"),open(file_path,"rb",buffering = 0) as file:
+        raw = bytearray(os.fstat(file.fileno()).st_size)
+        view = memoryview(raw)
+        position = 0
+
+        while position < len(raw):
+            read = file.readinto(view[position:position+buffer_size])
+            if not read:
+                break
+            position += read
+
+    del view
+    del raw[position:]#file shrank while reading
+    instrumentation.count("bytes_read",position)
+
+    return raw
+
+def _copy(dump_class):
+    """
+    deep copy of a dumpFile that is counted by the instrumentation
+    """
+    with instrumentation.stage("deepcopy"):
+        instrumentation.count("copies_made")
+        return copy.deepcopy(dump_class)
+
 class dumpFile:
 
     """
@@ -250,28 +389,44 @@ class dumpFile:
 
     #Alternative CLass Constructive Methods#####################################
     @classmethod
-    def lammps_dump(cls,file_path:str):
+    def lammps_dump(cls,file_path:str,atom_filter = None):
         """
         uses path of raw lammps file **Must be a singular timestep
 
         will create the class of dumpFile once processed
+
+        atom_filter = atomFilter applied while the atoms are parsed so only the
+                      selected atoms are ever held in memory **default None
         """
-        raw_data = pd.read_csv(file_path,header = None)#getting data
+        if atom_filter is not None:
+            with open(file_path,"rb") as file:
+                return cls.bytes_to_dumpfile(file.read(),atom_filter)
+
+        with instrumentation.stage("read_csv"):
+            raw_data = pd.read_csv(file_path,header = None)#getting data
         indexes = raw_data.index[raw_data[0].str.contains("ITEM: TIMESTEP")].tolist()#allowing check for singular
 
         if len(indexes) == 1:
             titles = raw_data.iloc[8].str.split(expand = True).iloc[0][2:].tolist()#getting titles of atomic data
-            atoms = pd.DataFrame(raw_data.iloc[9:,0].str.split(' ',len(titles)-1).tolist(), columns = titles)#getting atomic data
-            atoms =  atoms.apply(pd.to_numeric)
+            with instrumentation.stage("str.split"):
+                atoms = pd.DataFrame(raw_data.iloc[9:,0].str.split(' ',n = len(titles)-1).tolist(), columns = titles)#getting atomic data
+            with instrumentation.stage("to_numeric"):
+                atoms =  atoms.apply(pd.to_numeric)
+
+            if instrumentation.active:
+                instrumentation.count("bytes_read",os.path.getsize(file_path))
+                instrumentation.count("rows_parsed",len(atoms))
+                instrumentation.count("frames_processed")
+                instrumentation.peak("atoms_bytes",int(atoms.memory_usage().sum()))
 
             #getting bounds and making custom format to values
             boxboundtype =  raw_data.iloc[4,0].replace("ITEM: BOX BOUNDS ","").split(" ")#grabbing it prior to clean up later
 
-            box = pd.DataFrame(raw_data.iloc[5:8:,0].str.split(' ',len(titles)-1).tolist(), columns = ["low","high"],index= ["x","y","z"])
+            box = pd.DataFrame(raw_data.iloc[5:8:,0].str.split(' ',n = len(titles)-1).tolist(), columns = ["low","high"],index= ["x","y","z"])
             box = box.apply(pd.to_numeric).T
 
             types = pd.DataFrame(data = boxboundtype[0:3],index = ["x","y","z"],columns = ["type"]).T
-            boxbounds = box.append(types)
+            boxbounds = pd.concat([box,types])
 
             #returning class
             return cls(int(raw_data.iloc[1,0]),int(raw_data.iloc[3,0]),boxbounds,atoms)
@@ -294,15 +449,21 @@ class dumpFile:
 
         if len(indexes) == 1:
             titles = raw_data.iloc[8].str.split(expand = True).iloc[0][2:].tolist()#getting titles of atomic data
-            atoms = pd.DataFrame(raw_data.iloc[9:,0].str.split(' ',len(titles)-1).tolist(), columns = titles)#getting atomic data
-            atoms =  atoms.apply(pd.to_numeric)
+            with instrumentation.stage("str.split"):
+                atoms = pd.DataFrame(raw_data.iloc[9:,0].str.split(' ',n = len(titles)-1).tolist(), columns = titles)#getting atomic data
+            with instrumentation.stage("to_numeric"):
+                atoms =  atoms.apply(pd.to_numeric)
+
+            if instrumentation.active:
+                instrumentation.count("rows_parsed",len(atoms))
+                instrumentation.count("frames_processed")
 
             #getting bounds and making custom format to values
             boxboundtype =  raw_data.iloc[4,0].replace("ITEM: BOX BOUNDS ","").split(" ")#grabbing it prior to clean up later
-            box = pd.DataFrame(raw_data.iloc[5:8:,0].str.split(' ',len(titles)-1).tolist(), columns = ["low","high"],index= ["x","y","z"])
+            box = pd.DataFrame(raw_data.iloc[5:8:,0].str.split(' ',n = len(titles)-1).tolist(), columns = ["low","high"],index= ["x","y","z"])
             box = box.apply(pd.to_numeric).T
             types = pd.DataFrame(data = boxboundtype[0:3],index = ["x","y","z"],columns = ["type"]).T
-            boxbounds = box.append(types)
+            boxbounds = pd.concat([box,types])
 
             #returning class
             return cls(int(raw_data.iloc[1,0]),int(raw_data.iloc[3,0]),boxbounds,atoms)
@@ -313,6 +474,40 @@ class dumpFile:
         else:
             raise Exception("FILE IMPORT ERROR: check file formatting ")
 
+    @classmethod
+    def bytes_to_dumpfile(cls,raw_data:bytes,atom_filter = None,subsample = None,seed = None):
+        """
+        takes in the raw bytes of a lammps dump file **Must be a singular timestep
+
+        this is used by the prefetchReader so the file reading can be done
+        separately from the parsing
+
+        atom_filter = atomFilter applied while the atoms are parsed **default None
+        subsample = fraction(float) or count(int) of randomly chosen atoms to
+                    parse, the other lines are never decoded **default None
+        seed = seed or np.random.Generator making the subsample reproducible
+        """
+        count = raw_data.count(b"ITEM: TIMESTEP")#allowing check for singular
+
+        if count == 1:
+            buffer = io.BytesIO(raw_data)
+            header = _read_dump_header(buffer)
+            block = memoryview(raw_data)[buffer.tell():]
+
+            rows = None
+            if subsample is not None:
+                rows = _subsample_rows(header["numberofatoms"],subsample,np.random.default_rng(seed))
+
+            #returning class
+            dump_class = _frame_from_block(header,block,atom_filter,rows)
+            return cls(dump_class.sim_timestep,dump_class.sim_numberofatoms,dump_class.sim_boxbounds,dump_class.atoms)
+
+        elif count > 1:
+            raise Exception("FILE IMPORT ERROR: You may not import a multiple timestep file using this method please use the multiple_timestep_singular_file_dumps function")
+
+        else:
+            raise Exception("FILE IMPORT ERROR: check file formatting ")
+
     #Class methods##############################################################
     @classmethod
     def change_checking_tolerance(cls,value):
@@ -470,7 +665,7 @@ class dumpFile:
 
 
         #defining new object
-        dump_class_object = copy.deepcopy(self)
+        dump_class_object = _copy(self)
 
 
         id = self.id
@@ -620,7 +815,7 @@ class dumpFile:
 
 
         #defining new object
-        dump_class_object = copy.deepcopy(self)
+        dump_class_object = _copy(self)
 
 
         id = self.id
@@ -740,6 +935,177 @@ class dumpFile:
         else:
              raise Exception("Not a valid input to translation function")
 
+    #atom id lookups
+    def _id_lookup(self):
+        """
+        cached lookup from atom id to row position, it is rebuilt when obj.atoms
+        or its id column is replaced(editing single ids in place needs
+        obj.reset_id_lookup())
+
+        compact ids(range at most twice the number of atoms) use a dense array
+        indexed by id otherwise the sorted ids are searched with np.searchsorted
+        """
+        ids = self.atoms[self.id].to_numpy()
+        key = (id(self.atoms),ids.__array_interface__["data"][0],len(ids))
+        cache = self.__dict__.get("_id_cache")
+
+        if cache is None or cache[0] != key:
+            if len(ids) == 0:
+                lookup = ("sorted",ids,np.zeros(0,dtype = np.int64))
+            elif ids.max()-ids.min()+1 <= 2*len(ids):
+                dense = np.full(ids.max()-ids.min()+1,-1,dtype = np.int64)
+                dense[ids-ids.min()] = np.arange(len(ids))
+                lookup = ("dense",ids.min(),dense)
+            else:
+                order = np.argsort(ids,kind = "stable")
+                lookup = ("sorted",ids[order],order)
+
+            cache = (key,lookup)
+            self.__dict__["_id_cache"] = cache
+
+        return cache[1]
+
+    def reset_id_lookup(self):
+        self.__dict__.pop("_id_cache",None)
+
+    def rows_of_ids(self,ids)->np.ndarray:
+        """
+        row positions in obj.atoms of the given atom ids(in the given order),
+        ids that are not in the frame raise an Exception
+        """
+        ids = np.asarray(ids,dtype = np.int64)
+        kind,base,table = self._id_lookup()
+
+        if kind == "dense":
+            offsets = ids-base
+            inside = (offsets >= 0) & (offsets < len(table))
+            rows = np.full(len(ids),-1,dtype = np.int64)
+            rows[inside] = table[offsets[inside]]
+        elif len(base) == 0:
+            rows = np.full(len(ids),-1,dtype = np.int64)
+        else:
+            positions = np.minimum(np.searchsorted(base,ids),len(base)-1)
+            rows = np.where(base[positions] == ids,table[positions],-1)
+
+        if (rows < 0).any():
+            raise Exception("Atom ids not in the frame: "+str(ids[rows < 0][:10].tolist()))
+
+        return rows
+
+    def select_ids(self,ids):
+        """
+        returns a new instance with only the atoms of the given ids in that order
+
+        proper call:
+        group = class_instance.select_ids(ids)
+        """
+        atoms = self.atoms.iloc[self.rows_of_ids(ids)]
+
+        return dumpFile(self.sim_timestep,self.sim_numberofatoms,self.sim_boxbounds,atoms)
+
+    def field_bin(self,bins = 10,axes:list = ["x"],geometry:str = "cartesian",**options)->dict:
+        """
+        bins the atoms into a 1-D, 2-D or 3-D grid of number density, per type
+        concentration and averaged columns in one vectorized pass
+
+        proper call:
+        result = class_instance.field_bin(bins = (20,20),axes = ["x","y"],columns = ["c_eng"])
+
+        geometry = "cartesian", "cylindrical" or "spherical"
+        see dump_file_binning.fieldBinner for the options and for accumulating
+        over many frames
+        """
+        from LammpsFileManipulation.dump_file_binning import field_bin
+
+        return field_bin(self,bins,axes,geometry,**options)
+
+    def wrap(self,image_flags:bool = True):
+        """
+        returns a new instance with the atoms wrapped into the box along the
+        periodic axes(orthogonal or triclinic) updating the ix iy iz columns
+
+        see dump_file_periodic.wrap_atoms
+        """
+        from LammpsFileManipulation.dump_file_periodic import wrap_atoms
+
+        return wrap_atoms(self,image_flags)
+
+    def unwrap(self,keep_image_flags:bool = False):
+        """
+        returns a new instance with the atoms unwrapped using the ix iy iz columns
+
+        see dump_file_periodic.unwrap_atoms
+        """
+        from LammpsFileManipulation.dump_file_periodic import unwrap_atoms
+
+        return unwrap_atoms(self,keep_image_flags)
+
+    def cluster(self,cutoff:float,column:str = "cluster",masses:dict = None,min_size:int = 1):
+        """
+        returns a new instance with the cluster id of every atom in column and a
+        DataFrame of the cluster sizes and centers of mass
+
+        see dump_file_cluster.cluster_atoms
+        """
+        from LammpsFileManipulation.dump_file_cluster import cluster_atoms
+
+        return cluster_atoms(self,cutoff,column,masses,min_size)
+
+    def centrosymmetry(self,num_neighbors:int = 12,column:str = "csp"):
+        """
+        returns a new instance with the centrosymmetry parameter in column
+
+        see dump_file_structure.centrosymmetry
+        """
+        from LammpsFileManipulation.dump_file_structure import centrosymmetry
+
+        return centrosymmetry(self,num_neighbors,column)
+
+    def adaptive_cna(self,column:str = "structure"):
+        """
+        returns a new instance with the adaptive common neighbor analysis
+        structure type(0 other, 1 fcc, 2 hcp, 3 bcc, 4 ico) in column
+
+        see dump_file_structure.adaptive_cna
+        """
+        from LammpsFileManipulation.dump_file_structure import adaptive_cna
+
+        return adaptive_cna(self,column)
+
+    def replicate(self,n:int,m:int,k:int,overlap_cutoff:float = None):
+        """
+        returns a new instance with the cell tiled n x m x k times, ids renumbered
+        and the box scaled
+
+        see dump_file_replicate.replicate_atoms(write_replicated streams large
+        supercells straight to a file)
+        """
+        from LammpsFileManipulation.dump_file_replicate import replicate_atoms
+
+        return replicate_atoms(self,n,m,k,overlap_cutoff)
+
+    def spatial_sort(self,curve:str = "hilbert",bits:int = 10,column:str = None):
+        """
+        returns a new instance with the atoms ordered along a Morton or Hilbert
+        curve and the permutation back to the original row order
+
+        see dump_file_ordering.spatial_sort
+        """
+        from LammpsFileManipulation.dump_file_ordering import spatial_sort
+
+        return spatial_sort(self,curve,bits,column)
+
+    def displacement(self,reference,cutoff:float = None,columns:list = ["dx","dy","dz","dr"],d2min_column:str = "d2min"):
+        """
+        returns a new instance with the displacement of every atom since the
+        reference dumpFile(matched by id) and its D2min when a cutoff is given
+
+        see dump_file_deformation.displacement
+        """
+        from LammpsFileManipulation.dump_file_deformation import displacement
+
+        return displacement(reference,self,cutoff,columns,d2min_column)
+
     #writing out functions
     def write_dump_file(self,file_path:str,mode:str = "a",use_atomic:bool = False, use_atomic_numberofatoms:bool = False):
         """
@@ -757,7 +1123,7 @@ class dumpFile:
         if mode == "a" or mode == "w":
             precision = dumpFile.class_tolerance#get writing precision
             #defining new object
-            dump_class_object = copy.deepcopy(self)
+            dump_class_object = _copy(self)
 
             with open(file_path,mode) as file:
                 file.write("ITEM: TIMESTEP \n")
@@ -787,15 +1153,23 @@ class dumpFile:
                     file.write(str(round(lows[2],precision))+" "+str(round(highs[2],precision))+"\n")
 
                 else:
-                    if self.sim_xlo <= self.atomic_xlo and self.sim_ylo <= self.atomic_ylo and self.sim_zlo <= self.atomic_zlo and self.sim_xhi >= self.atomic_xhi and self.sim_yhi >= self.atomic_yhi and self.sim_zhi >= self.atomic_zhi:
+                    lows = dump_class_object.sim_boxbounds.loc["low"].tolist()
+                    highs = dump_class_object.sim_boxbounds.loc["high"].tolist()
+                    tilts = ["","",""]#nothing added to the bound lines of orthogonal boxes
+
+                    if "tilt" in dump_class_object.sim_boxbounds.index:
+                        tilts = dump_class_object.sim_boxbounds.loc["tilt"].tolist()
+                        lows,highs = _bounding_box(lows,highs,tilts)
+                        tilts = [" "+str(round(tilt,precision)) for tilt in tilts]
+                        file.write("xy xz yz ")
+
+                    if lows[0] <= self.atomic_xlo and lows[1] <= self.atomic_ylo and lows[2] <= self.atomic_zlo and highs[0] >= self.atomic_xhi and highs[1] >= self.atomic_yhi and highs[2] >= self.atomic_zhi:
                         types = dump_class_object.sim_boxbounds.loc["type"].tolist()
                         file.write(types[0]+" "+types[1]+" "+types[2])
                         file.write("\n")
-                        lows = dump_class_object.sim_boxbounds.loc["low"].tolist()
-                        highs = dump_class_object.sim_boxbounds.loc["high"].tolist()
-                        file.write(str(round(lows[0],precision))+" "+str(round(highs[0],precision))+"\n")
-                        file.write(str(round(lows[1],precision))+" "+str(round(highs[1],precision))+"\n")
-                        file.write(str(round(lows[2],precision))+" "+str(round(highs[2],precision))+"\n")
+                        file.write(str(round(lows[0],precision))+" "+str(round(highs[0],precision))+tilts[0]+"\n")
+                        file.write(str(round(lows[1],precision))+" "+str(round(highs[1],precision))+tilts[1]+"\n")
+                        file.write(str(round(lows[2],precision))+" "+str(round(highs[2],precision))+tilts[2]+"\n")
 
                     else:
                         raise Exception("The atomic positions are not contained within the simulation positions")
@@ -803,7 +1177,9 @@ class dumpFile:
                 file.write("ITEM: ATOMS ")
 
 
-            dump_class_object.atoms.round(precision).to_csv(file_path,mode = "a", index = False,sep = ' ')
+            with instrumentation.stage("write_dump_file"):
+                dump_class_object.atoms.round(precision).to_csv(file_path,mode = "a", index = False,sep = ' ')
+            instrumentation.count("rows_written",len(dump_class_object.atoms))
             del dump_class_object
         else:
             raise Exception('Mode entered for writing is not recognized ["a"= append to files, "w"= overwrite file]')
@@ -838,7 +1214,7 @@ class dumpFile:
         if mode == "a" or mode == "w":
             precision = dumpFile.class_tolerance#get writing precision
             #defining new object
-            dump_class_object = copy.deepcopy(self)
+            dump_class_object = _copy(self)
 
             id = dump_class_object.id
             type = dump_class_object.type
@@ -850,22 +1226,22 @@ class dumpFile:
                 file.write("# LAMMPS data file written by LammpsFileManipulation.py \n")
 
                 if use_atomic == True or use_atomic_numberofatoms == True:
-                    file.write(str(dump_class.atomic_numberofatoms))
+                    file.write(str(dump_class_object.atomic_numberofatoms))
                 else:
                     if self.sim_numberofatoms == self.atomic_numberofatoms:
-                        file.write(str(dump_class.sim_numberofatoms))
+                        file.write(str(dump_class_object.sim_numberofatoms))
                     else:
                         raise Exception("The number of atoms of the simulation has changed")
 
                 file.write(" atoms \n")
-                file.write(str(max(dump_class.atoms["type"])))
+                file.write(str(max(dump_class_object.atoms["type"])))
                 file.write(" atom types \n")
                 if use_atomic == True:
                     file.write(str(round(dump_class_object.atomic_xlo,precision))+" "+str(round(dump_class_object.atomic_xhi,precision))+" xlo xhi\n")
                     file.write(str(round(dump_class_object.atomic_ylo,precision))+" "+str(round(dump_class_object.atomic_yhi,precision))+" ylo yhi\n")
                     file.write(str(round(dump_class_object.atomic_zlo,precision))+" "+str(round(dump_class_object.atomic_zhi,precision))+" zlo zhi\n")
                 else:
-                    if  self.sim_xlo <= self.atomic_xlo and self.sim_ylo <= self.atomic_ylo and self.sim_zlo <= self.atomic_zlo and self.sim_xhi <= self.atomic_xhi and self.sim_yhi <= self.atomic_yhi and self.sim_zhi <= self.atomic_zhi:
+                    if  self.sim_xlo <= self.atomic_xlo and self.sim_ylo <= self.atomic_ylo and self.sim_zlo <= self.atomic_zlo and self.sim_xhi >= self.atomic_xhi and self.sim_yhi >= self.atomic_yhi and self.sim_zhi >= self.atomic_zhi:
                         file.write(str(round(dump_class_object.sim_xlo,precision))+" "+str(round(dump_class_object.sim_xhi,precision))+" xlo xhi\n")
                         file.write(str(round(dump_class_object.sim_ylo,precision))+" "+str(round(dump_class_object.sim_yhi,precision))+" ylo yhi\n")
                         file.write(str(round(dump_class_object.sim_zlo,precision))+" "+str(round(dump_class_object.sim_zhi,precision))+" zlo zhi\n")
@@ -874,12 +1250,130 @@ class dumpFile:
                 file.write("\n\n")
                 file.write("Atoms  # atomic\n\n")
 
-            dump_class.atoms[[id,type, x, y, z]].round(precision).to_csv(file_path,mode = "a", index = False,header = False ,sep = ' ')
+            with instrumentation.stage("write_dump_to_data_format"):
+                dump_class_object.atoms[[id,type, x, y, z]].round(precision).to_csv(file_path,mode = "a", index = False,header = False ,sep = ' ')
+            instrumentation.count("rows_written",len(dump_class_object.atoms))
             del dump_class_object
 
         else:
             raise Exception('Mode entered for writing is not recognized ["a"= append to files, "w"= overwrite file]')
 
+class lazyDumpFile(dumpFile):
+    """
+    This is a dumpFile whose header is read right away while the atom lines are
+    only parsed the first time obj.atoms is used, the frame keeps the file path
+    and the byte offset of its atom lines instead of the atoms
+
+    proper call:
+    dump_class = lazyDumpFile.open(file_path,atom_filter = None,subsample = None,seed = None)
+    dump_class.sim_timestep #no atoms parsed
+    dump_class.column("c_eng") #parses only that column
+    dump_class.atoms #parses every column on first access
+    dump_class.release() #drops the parsed atoms, they are read again when used
+
+    the batch readers return lazyDumpFile classes with lazy = True
+
+    valid property calls(on top of the dumpFile ones):
+        obj.file_path = file the frame is read from[str]
+        obj.offset = byte offset of the first atom line[int]
+        obj.titles = atom columns of the file[list]
+        obj.is_loaded = whether the atoms are parsed[bool]
+
+    assigning obj.atoms replaces the file backed atoms so release() is no longer
+    allowed(the changes would be lost)
+    """
+
+    def __init__(self,file_path:str,offset:int,header:dict,atom_filter = None,rows:np.ndarray = None):
+        self.file_path = file_path
+        self.offset = offset
+        self.header = header
+        self.atom_filter = atom_filter
+        self.rows = rows
+
+        self.sim_timestep = header["timestep"]
+        self.sim_numberofatoms = header["numberofatoms"]
+        self.sim_boxbounds = _make_boxbounds(header["lows"],header["highs"],header["boundingtypes"],header.get("tilts"))
+
+        self._atoms = None
+        self._columns = {}
+        self._file_backed = True
+
+    @classmethod
+    def open(cls,file_path:str,atom_filter = None,subsample = None,seed = None):
+        """
+        reads only the header of a single timestep dump
+        """
+        with open(file_path,"rb") as file:
+            header = _read_dump_header(file)
+            offset = file.tell()
+
+        if header is None:
+            raise Exception("FILE IMPORT ERROR: check file formatting ")
+
+        rows = None
+        if subsample is not None:
+            rows = _subsample_rows(header["numberofatoms"],subsample,np.random.default_rng(seed))
+
+        return cls(file_path,offset,header,atom_filter,rows)
+
+    @property
+    def titles(self):
+        return list(self.header["titles"])
+
+    @property
+    def is_loaded(self):
+        return self._atoms is not None
+
+    @property
+    def atoms(self):
+        if self._atoms is None:
+            self._atoms = self._parse()
+        return self._atoms
+
+    @atoms.setter
+    def atoms(self,atoms:pd.DataFrame):
+        self._atoms = atoms
+        self._columns = {}
+        self._file_backed = False
+
+    def _parse(self,columns:list = None)->pd.DataFrame:
+        with instrumentation.stage("lazy_load"),open(self.file_path,"rb") as file:
+            file.seek(self.offset)
+            block = _read_line_block(file,self.header["numberofatoms"])
+
+        instrumentation.count("lazy_loads")
+        return _atoms_from_block(self.header,block,self.atom_filter,self.rows,columns)
+
+    def column(self,name:str)->pd.Series:
+        """
+        one atom column, when the atoms are not parsed only this column is
+        converted and it is cached until release()
+        """
+        if self._atoms is not None or self.atom_filter is not None:
+            #the filter needs the other columns of the rows
+            return self.atoms[name]
+
+        if name not in self._columns:
+            if name not in self.header["titles"]:
+                raise Exception("Column "+str(name)+" is not in the dump file")
+            self._columns[name] = self._parse([name])[name]
+
+        return self._columns[name]
+
+    def release(self):
+        """
+        drops the parsed atoms and columns, they are parsed again on the next use
+        """
+        if not self._file_backed:
+            raise Exception("The atoms were replaced and are no longer backed by the file")
+
+        self._atoms = None
+        self._columns = {}
+        self.reset_id_lookup()
+
+    def __repr__(self):
+        return "{TimeStep:"+str(self.sim_timestep)+"\nBoundings"+str(self.sim_boxbounds)+"\nColumns of atomic data"+str(self.titles)+"}"
+
 def group_translate(dump_files, translation_operation):
     """
     This takes in a group of dumps in the dictionary format of class and ####translates
@@ -1052,7 +1546,37 @@ def group_translate(dump_files, translation_operation):
     return translated_dump_files
 
 
-def multiple_timestep_singular_file_dumps(file_path:str,ids:list = ["TimestepDefault"]):
+def group_track(dump_files,ids,columns:list = ["x","y","z"])->dict:
+    """
+    This extracts the same atoms from every frame of a group of dumps into
+    (frames x group size) arrays using the cached id lookup of each frame, one
+    vectorized gather per frame and column
+
+    proper call:
+    tracked = group_track(dump_files,ids,columns = ["x","y","z"])
+
+    dump_files = {id:class,...}
+
+    returns a dictionary
+        "timesteps" = timestep of every frame[np.ndarray]
+        "ids" = the tracked ids[np.ndarray]
+        column = (frames x group size) values for each requested column[np.ndarray]
+    """
+    ids = np.asarray(ids,dtype = np.int64)
+    frames = list(dump_files.values())
+
+    tracked = {"timesteps":np.array([dump_class.sim_timestep for dump_class in frames]),"ids":ids}
+    for column in columns:
+        tracked[column] = np.empty((len(frames),len(ids)),dtype = frames[0].atoms[column].dtype if frames else float)
+
+    for ind,dump_class in enumerate(frames):
+        rows = dump_class.rows_of_ids(ids)
+        for column in columns:
+            tracked[column][ind] = dump_class.atoms[column].to_numpy()[rows]
+
+    return tracked
+
+def multiple_timestep_singular_file_dumps(file_path:str,ids:list = ["TimestepDefault"],atom_filter = None,start:int = None,stop:int = None,step:int = None,timestep_range:tuple = None,subsample = None,seed = None,lazy:bool = False):
     """
     this opens a multi-timestep lammps dump and converts it to a dictionary of
     dumpFile classes with the keys set to the timesteps
@@ -1060,31 +1584,68 @@ def multiple_timestep_singular_file_dumps(file_path:str,ids:list = ["TimestepDef
     ids:list = ["TimestepDefault"]
     ids are set to the dumpclass timestep by default however if there are duplicates
     this will override the timesteps so you can define the ids for the dictionary
-    """
-    dump_files = {} #dictionary of class
 
-    raw_data = pd.read_csv(file_path,header = None)#getting data
-    indexes = raw_data.index[raw_data[0] == "ITEM: TIMESTEP"].tolist()#getting splitting indexes
+    atom_filter = atomFilter applied to every frame while it is parsed **default None
 
-    if len(ids) == len(indexes) or ids == ["TimestepDefault"]:
+    selecting frames(the atom lines of skipped frames are stepped over at the
+    byte level and never parsed):
+        start,stop,step = slice of the frame positions in the file **non negative
+        timestep_range = (lo,hi) inclusive range of timesteps to keep
 
-        #splitting and iterating through pandas dataFrame
-        for ind, index in enumerate(indexes):
+    subsample = fraction(float) or count(int) of randomly chosen atoms parsed
+                per frame **default None
+    seed = seed or np.random.Generator making the subsample reproducible
 
-            if ind < len(indexes)-1:
-                #all except last index
-                df = raw_data.loc[index:indexes[ind+1]-1,:]#making new dataFrame
-                dump_class = dumpFile.pandas_to_dumpfile(df)#dump class processing
+    lazy = True returns lazyDumpFile classes holding only the header and the
+    byte offset of each frame, the atoms are parsed on first use
 
+    the file is streamed frame by frame so only one frames text is in memory at
+    a time
+    """
+    if (start is not None and start < 0) or (stop is not None and stop < 0):
+        raise Exception("start and stop must be non negative frame positions")
+    if step is not None and step < 1:
+        raise Exception("step must be a non negative(at least 1) frame stride")
+    frames = range(sys.maxsize)[slice(start,stop,step)]#frame positions to keep
+
+    rng = np.random.default_rng(seed)
+    dump_classes = []
+
+    with open(file_path,"rb") as file:
+        header = _read_dump_header(file)
+        position = 0
+
+        while header is not None and position < frames.stop:
+            keep = position in frames
+            if keep and timestep_range is not None:
+                keep = timestep_range[0] <= header["timestep"] <= timestep_range[1]
+
+            if keep:
+                rows = None
+                if subsample is not None:
+                    rows = _subsample_rows(header["numberofatoms"],subsample,rng)
+
+                if lazy:
+                    dump_classes.append(lazyDumpFile(file_path,file.tell(),header,atom_filter,rows))
+                    _skip_line_block(file,header["numberofatoms"])
+                else:
+                    block = _read_line_block(file,header["numberofatoms"])
+                    dump_classes.append(_frame_from_block(header,block,atom_filter,rows))
             else:
-                #last index
-                df = raw_data.loc[index:len(raw_data)+1,:]#making new dataFrame
-                dump_class = dumpFile.pandas_to_dumpfile(df)#dump class processing
+                _skip_line_block(file,header["numberofatoms"])
+
+            header = _read_dump_header(file)
+            position += 1
+
+    if len(ids) == len(dump_classes) or ids == ["TimestepDefault"]:
+
+        dump_files = {} #dictionary of class
 
+        for ind,dump_class in enumerate(dump_classes):
             #adding to dictionary
             if ids == ["TimestepDefault"]:
                 #using timestep to insert
-                dump_files[int(dump_class.timestep)] = dump_class
+                dump_files[int(dump_class.sim_timestep)] = dump_class
             else:
                 #using custom id
                 dump_files[ids[ind]] = dump_class
@@ -1096,7 +1657,7 @@ def multiple_timestep_singular_file_dumps(file_path:str,ids:list = ["TimestepDef
          warnings.warn("Length of ids list is not equal to files list length")
 
 
-def batch_import_files(file_paths:list,ids:list = ["TimestepDefault"]):
+def batch_import_files(file_paths:list,ids:list = ["TimestepDefault"],queue_depth:int = 0,buffer_size:int = 2**22,atom_filter = None,start:int = None,stop:int = None,step:int = None,timestep_range:tuple = None,subsample = None,seed = None,lazy:bool = False):
     """
     this opens several lammps dumps and converts it to a dictionary of
     dumpFile classes with the keys set to the timesteps
@@ -1104,19 +1665,59 @@ def batch_import_files(file_paths:list,ids:list = ["TimestepDefault"]):
     ids:list = ["TimestepDefault"]
     ids are set to the dumpclass timestep by default however if there are duplicates
     this will override the timesteps so you can define the ids for the dictionary
+
+    queue_depth:int = 0
+    when greater than 0 the files are read ahead by a prefetchReader so the
+    reading of the next files overlaps with the parsing of the current one
+    buffer_size:int = 2**22 bytes read per call when prefetching
+
+    atom_filter = atomFilter applied to every file while it is parsed **default None
+
+    selecting files(only the header of a file is read to check its timestep):
+        start,stop,step = slice of the file_paths list
+        timestep_range = (lo,hi) inclusive range of timesteps to keep
+
+    subsample = fraction(float) or count(int) of randomly chosen atoms parsed
+                per file **default None
+    seed = seed or np.random.Generator making the subsample reproducible
+
+    lazy = True only reads the header of every file and returns lazyDumpFile
+    classes that parse their atoms on first use(queue_depth is ignored)
+
+    when selecting files the ids list must match the selected files
     """
+    if step is not None and step < 1:
+        raise Exception("step must be a non negative(at least 1) file stride")
+    file_paths = list(file_paths)[slice(start,stop,step)]
+
+    if timestep_range is not None:
+        selected = []
+        for file_path in file_paths:
+            with open(file_path,"rb") as file:
+                timestep = _read_dump_header(file)["timestep"]
+            if timestep_range[0] <= timestep <= timestep_range[1]:
+                selected.append(file_path)
+        file_paths = selected
+
     if len(ids) == len(file_paths) or ids == ["TimestepDefault"]:
 
         dump_files = {} #dictionary of class
+        rng = np.random.default_rng(seed)
+
+        if lazy:
+            dump_classes = (lazyDumpFile.open(file_path,atom_filter,subsample,rng) for file_path in file_paths)
+        elif queue_depth > 0:
+            dump_classes = (dump_class for file_path,dump_class in prefetchReader(file_paths,queue_depth,buffer_size,atom_filter = atom_filter,subsample = subsample,seed = rng))
+        elif subsample is not None:
+            dump_classes = (dumpFile.bytes_to_dumpfile(_read_raw_file(file_path,buffer_size),atom_filter,subsample,rng) for file_path in file_paths)
+        else:
+            dump_classes = (dumpFile.lammps_dump(file_path,atom_filter) for file_path in file_paths)
 
-        for ind,file_path in enumerate(file_paths):
-            #importing class
-            dump_class = dumpFile.lammps_dump(file_path)
-
+        for ind,dump_class in enumerate(dump_classes):
             #adding to dictionary
             if ids == ["TimestepDefault"]:
                 #using timestep to insert
-                dump_files[int(dump_class.timestep)] = dump_class
+                dump_files[int(dump_class.sim_timestep)] = dump_class
             else:
                 #using custom id
                 dump_files[ids[ind]] = dump_class
@@ -1128,6 +1729,138 @@ def batch_import_files(file_paths:list,ids:list = ["TimestepDefault"]):
          warnings.warn("Length of ids list is not equal to files list length")
 
 
+class atomFilter:
+    """
+    This is a selection of atoms that the readers evaluate while decoding the
+    atom lines so that only the matching rows are ever materialized, this avoids
+    parsing a whole frame and then slicing a deep copy of it
+
+    proper call:
+    atom_filter = atomFilter(types = None,ids = None,box = None,column_ranges = None)
+    dump_class = dumpFile.lammps_dump(file_path,atom_filter = atom_filter)
+
+    types = atom types to keep [list]
+    ids = atom ids to keep [list]
+    box = [xlo,xhi,ylo,yhi,zlo,zhi] inclusive bounds like cart_slice [list]
+    column_ranges = {column:(low,high),...} inclusive ranges of any column [dict]
+
+    all of the given conditions must be met for an atom to be kept, the rows are
+    decoded chunksize at a time(class variable)
+    """
+
+    chunksize = 1000000 #rows decoded at once while filtering
+
+    def __init__(self,types:list = None,ids:list = None,box:list = None,column_ranges:dict = None):
+        self.types = None if types is None else np.unique(types)
+        self.ids = None if ids is None else np.unique(ids)
+        self.column_ranges = dict(column_ranges) if column_ranges is not None else {}
+
+        if box is not None:
+            if len(box) != 6:
+                raise Exception("box must be given as [xlo,xhi,ylo,yhi,zlo,zhi]")
+            self.column_ranges[dumpFile.x_axis_cart] = (box[0],box[1])
+            self.column_ranges[dumpFile.y_axis_cart] = (box[2],box[3])
+            self.column_ranges[dumpFile.z_axis_cart] = (box[4],box[5])
+
+    def mask(self,atoms:pd.DataFrame)->np.ndarray:
+        """
+        boolean array of the rows of atoms that pass the filter
+        """
+        keep = np.ones(len(atoms),dtype = bool)
+
+        if self.types is not None:
+            keep &= np.isin(atoms[dumpFile.type].to_numpy(),self.types)
+
+        if self.ids is not None:
+            keep &= np.isin(atoms[dumpFile.id].to_numpy(),self.ids)
+
+        for column,(low,high) in self.column_ranges.items():
+            values = atoms[column].to_numpy()
+            keep &= (low <= values) & (values <= high)
+
+        return keep
+
+    def apply(self,atoms:pd.DataFrame)->pd.DataFrame:
+        return atoms[self.mask(atoms)]
+
+class prefetchReader:
+    """
+    This is a pipelined reader for a list of single timestep dump files, a pool
+    of threads reads the raw bytes of the upcoming files while the current file
+    is parsed so the disk(or network filesystem) and the cpu are both kept busy
+
+    proper call:
+    reader = prefetchReader(file_paths,queue_depth = 4,buffer_size = 2**22,max_workers = None,atom_filter = None,subsample = None,seed = None)
+    for file_path,dump_class in reader:
+        ...
+
+    queue_depth[int] = how many files may be read ahead of the parser
+    buffer_size[int] = bytes read per call while reading a file
+    max_workers[int] = reading threads **default queue_depth
+    atom_filter[atomFilter] = filter applied while each file is parsed
+    subsample[float or int] = fraction or count of random atoms parsed per file
+    seed[int] = seed making the subsample reproducible
+
+    after(or during) iteration reader.stats holds the instrumentation
+        frames = number of files parsed
+        bytes_read = total bytes read
+        read_time = summed time the reading threads spent reading
+        io_wait_time = time the parser sat waiting on a file that was not read yet
+        parse_time = time spent parsing the raw bytes into dumpFile classes
+    """
+
+    def __init__(self,file_paths:list,queue_depth:int = 4,buffer_size:int = 2**22,max_workers:int = None,atom_filter = None,subsample = None,seed = None):
+        if queue_depth < 1 or buffer_size < 1:
+            raise Exception("queue_depth and buffer_size must be at least 1")
+
+        self.file_paths = list(file_paths)
+        self.queue_depth = queue_depth
+        self.buffer_size = buffer_size
+        self.max_workers = max_workers if max_workers is not None else queue_depth
+        self.atom_filter = atom_filter
+        self.subsample = subsample
+        self.seed = seed
+        self.stats = {"frames":0,"bytes_read":0,"read_time":0.0,"io_wait_time":0.0,"parse_time":0.0}
+
+    def _read(self,file_path:str):
+        start = time.perf_counter()
+        raw_data = _read_raw_file(file_path,self.buffer_size)
+        return raw_data,time.perf_counter()-start
+
+    def __iter__(self):
+        paths = iter(self.file_paths)
+        pending = collections.deque()#bounded read ahead queue
+        rng = np.random.default_rng(self.seed)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers = self.max_workers) as pool:
+            #filling the queue
+            for file_path in paths:
+                pending.append((file_path,pool.submit(self._read,file_path)))
+                if len(pending) == self.queue_depth:
+                    break
+
+            while pending:
+                file_path,future = pending.popleft()
+
+                start = time.perf_counter()
+                raw_data,read_time = future.result()
+                self.stats["io_wait_time"] += time.perf_counter()-start
+                self.stats["read_time"] += read_time
+                self.stats["bytes_read"] += len(raw_data)
+
+                #topping up the queue before parsing so reading continues
+                next_path = next(paths,None)
+                if next_path is not None:
+                    pending.append((next_path,pool.submit(self._read,next_path)))
+
+                start = time.perf_counter()
+                dump_class = dumpFile.bytes_to_dumpfile(raw_data,self.atom_filter,self.subsample,rng)
+                self.stats["parse_time"] += time.perf_counter()-start
+                self.stats["frames"] += 1
+
+                del raw_data
+                yield file_path,dump_class
+
 def merge(dump_class_1:dumpFile,dump_class_2:dumpFile)->dumpFile:
     """
     This is an alternative merge method to addition or using pandas
@@ -1153,7 +1886,7 @@ def cart_slice(dump_class_to_slice:dumpFile,xlo,xhi,ylo,yhi,zlo,zhi):
     this means all the atoms in a given volume are selected making a new class
     LEAVING THE SIMULATION VALUES THE SAME
     """
-    dump_class = copy.deepcopy(dump_class_to_slice)#copying to return a new one
+    dump_class = _copy(dump_class_to_slice)#copying to return a new one
 
     df =  dump_class.atoms
     dump_class.atoms = df[(df[dump_class.x_axis_cart] <= xhi) & (xlo <= df[dump_class.x_axis_cart]) & (df[dump_class.y_axis_cart] <= yhi) & (ylo <= df[dump_class.y_axis_cart]) & (df[dump_class.z_axis_cart] <= zhi) & (zlo <= df[dump_class.z_axis_cart])]
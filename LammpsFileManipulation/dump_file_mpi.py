@@ -0,0 +1,289 @@
+"""
+This is MPI parallel trajectory processing with mpi4py, the ranks split the
+frames of many files(or the atom lines of one huge frame) by bytes, read their
+share independently and combine per frame results with collective reductions
+on one rank
+
+requires mpi4py(pip install LammpsFileManipulation[mpi]), without it or when
+started without mpirun everything runs as a single rank
+
+running:
+    mpirun -n 4 python analysis.py
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#non-default imports
+import numpy as np
+
+try:
+    from mpi4py import MPI
+except ImportError:
+    MPI = None
+
+#package imports
+from LammpsFileManipulation.dump_file_manipulation import dumpFile,_frame_from_block,_atoms_from_block,_make_boxbounds
+from LammpsFileManipulation.dump_file_parsing import _read_dump_header,_read_line_block
+from LammpsFileManipulation.dump_file_concatenate import frame_offsets,_source_files
+from LammpsFileManipulation import instrumentation
+
+################################################################################
+#Ranks##########################################################################
+################################################################################
+
+def _communicator(comm = None):
+    """
+    the given communicator, COMM_WORLD when mpi4py is installed or None(a
+    single rank)
+    """
+    if comm is not None:
+        return comm
+    return MPI.COMM_WORLD if MPI is not None else None
+
+def rank_and_size(comm = None)->tuple:
+    """
+    rank of this process and number of ranks((0,1) without mpi4py)
+    """
+    comm = _communicator(comm)
+    if comm is None:
+        return 0,1
+    return comm.Get_rank(),comm.Get_size()
+
+def _bcast(value,comm,root:int = 0):
+    return value if comm is None else comm.bcast(value,root = root)
+
+def _balanced(weights:np.ndarray,size:int)->np.ndarray:
+    """
+    size+1 boundaries splitting consecutive items into size groups of about
+    equal total weight(bytes)
+    """
+    cumulative = np.cumsum(np.asarray(weights,dtype = np.float64))
+    if len(cumulative) == 0:
+        return np.zeros(size+1,dtype = np.int64)
+
+    targets = cumulative[-1]*np.arange(1,size)/size
+    inner = np.searchsorted(cumulative-np.asarray(weights)/2.0,targets)
+
+    return np.concatenate(([0],inner,[len(cumulative)])).astype(np.int64)
+
+################################################################################
+#Reading a share of the frames##################################################
+################################################################################
+
+def mpi_frames(sources,comm = None,atom_filter = None,start:int = None,stop:int = None,step:int = None,timestep_range:tuple = None):
+    """
+    generator of the (position,dumpFile) frames read by this rank
+
+    proper call:
+    for position,dump_class in mpi_frames(sources,comm = None):
+        ...
+
+    sources = dump file, directory, glob pattern or a list of them(single or
+              multi timestep files)
+    start,stop,step = slice of the frame positions(all files in order)
+    timestep_range = (lo,hi) inclusive range of timesteps to keep
+
+    rank 0 indexes the byte range of every frame(headers only) and broadcasts
+    it, the selected frames are split into consecutive groups of about equal
+    bytes so every rank reads a contiguous part of the files
+    """
+    comm = _communicator(comm)
+    rank,size = rank_and_size(comm)
+
+    frames = None
+    if rank == 0:
+        frames = [frame for file_path in _source_files(sources) for frame in frame_offsets(file_path)]
+    frames = _bcast(frames,comm)
+
+    positions = list(range(len(frames)))[slice(start,stop,step)]
+    if timestep_range is not None:
+        positions = [position for position in positions if timestep_range[0] <= frames[position]["timestep"] <= timestep_range[1]]
+
+    bounds = _balanced([frames[position]["end"]-frames[position]["start"] for position in positions],size)
+    mine = positions[bounds[rank]:bounds[rank+1]]
+    instrumentation.count("mpi_frames",len(mine))
+
+    file_path = None
+    file = None
+    try:
+        for position in mine:
+            frame = frames[position]
+            if frame["path"] != file_path:
+                if file is not None:
+                    file.close()
+                file_path = frame["path"]
+                file = open(file_path,"rb")
+
+            file.seek(frame["start"])
+            header = _read_dump_header(file)
+            block = _read_line_block(file,header["numberofatoms"])
+
+            yield position,_frame_from_block(header,block,atom_filter)
+    finally:
+        if file is not None:
+            file.close()
+
+def _line_start(file,position:int,end:int)->int:
+    """
+    first line start at or after position(the byte after the next newline)
+    """
+    file.seek(position-1)
+    while position < end:
+        chunk = file.read(min(2**16,end-position+1))
+        if not chunk:
+            return end
+        newline = chunk.find(b"\n")
+        if newline >= 0:
+            return position+newline
+        position += len(chunk)
+
+    return end
+
+def mpi_read_frame(file_path:str,comm = None,frame:int = 0,atom_filter = None)->dumpFile:
+    """
+    reads this rank's share of the atoms of one(huge) frame, the atom lines are
+    split into byte ranges aligned to whole lines so every line is parsed by
+    exactly one rank
+
+    proper call:
+    part = mpi_read_frame(file_path,comm = None,frame = 0)
+
+    part.atoms is indexed by the row of the atom in the frame and
+    part.sim_numberofatoms is the number of atoms of the whole frame
+    """
+    comm = _communicator(comm)
+    rank,size = rank_and_size(comm)
+
+    offsets = None
+    if rank == 0:
+        offsets = frame_offsets(file_path)[frame]
+    offsets = _bcast(offsets,comm)
+
+    with open(file_path,"rb") as file:
+        file.seek(offsets["start"])
+        header = _read_dump_header(file)
+        first = file.tell()
+        end = offsets["end"]
+
+        #the same rule on every rank so the ranges meet at line starts
+        low = first+(end-first)*rank//size
+        high = first+(end-first)*(rank+1)//size
+        low = first if rank == 0 else _line_start(file,low,end)
+        high = end if rank == size-1 else _line_start(file,high,end)
+
+        file.seek(low)
+        block = file.read(high-low)
+        instrumentation.count("bytes_read",len(block))
+
+    lines = block.count(b"\n")+(1 if block and not block.endswith(b"\n") else 0)
+    first_row = 0 if comm is None else (comm.exscan(lines) or 0)
+
+    atoms = _atoms_from_block(dict(header,numberofatoms = lines),block,atom_filter)
+    atoms.index = atoms.index+first_row
+    boxbounds = _make_boxbounds(header["lows"],header["highs"],header["boundingtypes"],header.get("tilts"))
+
+    return dumpFile(header["timestep"],header["numberofatoms"],boxbounds,atoms)
+
+################################################################################
+#Combining results##############################################################
+################################################################################
+
+def mpi_map(function,frames,comm = None,root:int = 0):
+    """
+    applies function(dump_class) to the (position,dumpFile) frames of this rank
+    (from mpi_frames) and gathers {position:result} of every rank on root(the
+    other ranks get None)
+
+    proper call:
+    results = mpi_map(function,mpi_frames(sources),comm = None,root = 0)
+    """
+    comm = _communicator(comm)
+    results = {position:function(dump_class) for position,dump_class in frames}
+
+    if comm is None:
+        return results
+
+    gathered = comm.gather(results,root = root)
+    if comm.Get_rank() != root:
+        return None
+
+    combined = {}
+    for part in gathered:
+        combined.update(part)
+
+    return dict(sorted(combined.items()))
+
+_operations = ["sum","max","min"]
+
+def mpi_reduce(values,op:str = "sum",comm = None,root:int = 0):
+    """
+    element wise sum/max/min of numbers or numpy arrays of the same shape over
+    every rank, the result is on root(None on the other ranks)
+
+    proper call:
+    total = mpi_reduce(values,op = "sum",comm = None,root = 0)
+    """
+    if op not in _operations:
+        raise Exception("op is not recognized "+str(_operations))
+
+    comm = _communicator(comm)
+    if comm is None:
+        return values
+
+    operation = {"sum":MPI.SUM,"max":MPI.MAX,"min":MPI.MIN}[op]
+
+    if isinstance(values,np.ndarray) and values.dtype.kind in "iuf":
+        #buffer based reduction without pickling
+        values = np.ascontiguousarray(values)
+        result = np.empty_like(values) if comm.Get_rank() == root else None
+        comm.Reduce(values,result,op = operation,root = root)
+        return result
+
+    return comm.reduce(values,op = operation,root = root)
+
+def mpi_mean(sums,counts,comm = None,root:int = 0):
+    """
+    mean of per rank sums and counts(numbers or arrays), on root only
+    """
+    sums = mpi_reduce(sums,"sum",comm,root)
+    counts = mpi_reduce(counts,"sum",comm,root)
+    if sums is None:
+        return None
+
+    with np.errstate(invalid = "ignore",divide = "ignore"):
+        return np.asarray(sums,dtype = np.float64)/counts
+
+def mpi_field_bin(binner,comm = None,root:int = 0):
+    """
+    merges the fieldBinner of every rank(each filled with its own frames) on
+    root and returns the merged binner there(None on the other ranks)
+
+    proper call:
+    binner = fieldBinner(bins = 50,axes = ["z"],columns = ["c_eng"])
+    binner.add_frames(dump_class for position,dump_class in mpi_frames(sources))
+    merged = mpi_field_bin(binner)
+    if merged is not None:
+        result = merged.result()
+    """
+    comm = _communicator(comm)
+    if comm is None:
+        return binner
+
+    gathered = comm.gather(binner,root = root)
+    if comm.Get_rank() != root:
+        return None
+
+    merged = gathered[root]
+    for rank,other in enumerate(gathered):
+        if rank != root:
+            merged.merge(other)
+
+    return merged
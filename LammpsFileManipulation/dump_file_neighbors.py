@@ -0,0 +1,218 @@
+"""
+This is a periodic aware neighbor search for dumpFile classes built on a cell
+list, pairs are generated cell by cell with array operations and in chunks of
+atoms so memory stays bounded on large frames
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#default imports
+import itertools
+
+#non-default imports
+import numpy as np
+
+#package imports
+from LammpsFileManipulation.dump_file_manipulation import dumpFile
+from LammpsFileManipulation.dump_file_periodic import box_matrix,periodic_axes,positions
+from LammpsFileManipulation import instrumentation
+from LammpsFileManipulation import kernels
+
+################################################################################
+#Cell list######################################################################
+################################################################################
+
+chunk_atoms = 200000 #atoms whose candidate pairs are built at once
+
+def _cell_list(fractional:np.ndarray,periodic:np.ndarray,matrix:np.ndarray,cutoff:float):
+    """
+    bins fractional coordinates into cells at least cutoff wide
+
+    returns the number of cells per axis, the cell of every atom(n x 3), the
+    atom order sorted by cell and the start/count of every flat cell
+    """
+    volume = abs(np.linalg.det(matrix))
+    #perpendicular widths of the (possibly triclinic) box
+    widths = np.array([volume/np.linalg.norm(np.cross(matrix[1],matrix[2])),volume/np.linalg.norm(np.cross(matrix[2],matrix[0])),volume/np.linalg.norm(np.cross(matrix[0],matrix[1]))])
+
+    if (cutoff > widths[periodic]/2).any():
+        raise Exception("The cutoff is larger than half of a periodic box width")
+
+    ncells = np.maximum(np.floor(widths/cutoff).astype(np.int64),1)
+    cells = np.floor(fractional*ncells).astype(np.int64)
+    cells = np.clip(cells,0,ncells-1)#atoms outside fixed boundaries go to the edge cells
+
+    flat = np.ravel_multi_index(cells.T,ncells)
+    order,starts,counts = kernels.cell_sort(flat,int(np.prod(ncells)))
+
+    return ncells,cells,order,starts,counts
+
+def _offsets(ncells:np.ndarray,periodic:np.ndarray)->list:
+    """
+    neighbor cell offsets with repeated periodic images removed for axes with
+    fewer than three cells
+    """
+    per_axis = []
+    for n,is_periodic in zip(ncells,periodic):
+        if is_periodic:
+            unique = {}
+            for offset in [-1,0,1]:
+                unique.setdefault(offset % n,offset)
+            per_axis.append(sorted(unique.values()))
+        else:
+            per_axis.append([-1,0,1])
+
+    return list(itertools.product(*per_axis))
+
+def _ragged_arange(starts:np.ndarray,counts:np.ndarray)->np.ndarray:
+    """
+    concatenation of arange(start,start+count) for every start/count pair
+    """
+    total = int(counts.sum())
+    if total == 0:
+        return np.zeros(0,dtype = np.int64)
+
+    ends = np.cumsum(counts)
+    steps = np.ones(total,dtype = np.int64)
+    first = ends-counts
+    valid = counts > 0
+    steps[first[valid]] = starts[valid]-np.concatenate(([0],(starts+counts-1)[valid][:-1]))
+    steps[0] = starts[valid][0]
+
+    return np.cumsum(steps)
+
+################################################################################
+#Neighbor pairs#################################################################
+################################################################################
+
+def neighbor_pairs(dump_class:dumpFile,cutoff:float,return_vectors:bool = False):
+    """
+    finds every pair of atoms closer than cutoff using a cell list and the
+    minimum image convention along periodic axes(orthogonal or triclinic)
+
+    proper call:
+    i,j,distances = neighbor_pairs(dump_class,cutoff)
+    i,j,distances,vectors = neighbor_pairs(dump_class,cutoff,return_vectors = True)
+
+    i,j = row positions in dump_class.atoms with i < j[np.ndarray]
+    distances = pair distances[np.ndarray]
+    vectors = r_j - r_i minimum image vectors(pairs x 3)[np.ndarray]
+    """
+    with instrumentation.stage("neighbor_pairs"):
+        origin,matrix = box_matrix(dump_class)
+        inverse = np.linalg.inv(matrix)
+        periodic = periodic_axes(dump_class)
+        cartesian = positions(dump_class)
+
+        fractional = (cartesian-origin) @ inverse
+        fractional[:,periodic] -= np.floor(fractional[:,periodic])
+
+        ncells,cells,order,starts,counts = _cell_list(fractional,periodic,matrix,cutoff)
+
+        found_i = []
+        found_j = []
+        found_vectors = []
+
+        for chunk in range(0,len(cartesian),chunk_atoms):
+            atoms = np.arange(chunk,min(chunk+chunk_atoms,len(cartesian)))
+
+            for offset in _offsets(ncells,periodic):
+                neighbor = cells[atoms]+np.array(offset)
+                valid = np.ones(len(atoms),dtype = bool)
+                for axis in range(3):
+                    if periodic[axis]:
+                        neighbor[:,axis] %= ncells[axis]
+                    else:
+                        valid &= (neighbor[:,axis] >= 0) & (neighbor[:,axis] < ncells[axis])
+
+                source = atoms[valid]
+                flat = np.ravel_multi_index(neighbor[valid].T,ncells)
+                candidate_counts = counts[flat]
+
+                i = np.repeat(source,candidate_counts)
+                j = order[_ragged_arange(starts[flat],candidate_counts)]
+
+                keep = i < j
+                i = i[keep]
+                j = j[keep]
+
+                delta = kernels.minimum_image(cartesian[j]-cartesian[i],matrix,inverse,periodic)
+
+                close = np.einsum("ij,ij->i",delta,delta) < cutoff*cutoff
+                found_i.append(i[close])
+                found_j.append(j[close])
+                found_vectors.append(delta[close])
+
+        i = np.concatenate(found_i) if found_i else np.zeros(0,dtype = np.int64)
+        j = np.concatenate(found_j) if found_j else np.zeros(0,dtype = np.int64)
+        vectors = np.concatenate(found_vectors) if found_vectors else np.zeros((0,3))
+        distances = np.sqrt(np.einsum("ij,ij->i",vectors,vectors))
+
+        instrumentation.count("neighbor_pairs",len(i))
+
+    if return_vectors:
+        return i,j,distances,vectors
+    return i,j,distances
+
+def neighbor_list(dump_class:dumpFile,cutoff:float):
+    """
+    full(both directions) neighbor list in compressed sparse row form
+
+    proper call:
+    offsets,neighbors,vectors = neighbor_list(dump_class,cutoff)
+
+    the neighbors of atom row a are neighbors[offsets[a]:offsets[a+1]] and
+    vectors holds r_neighbor - r_a for each of them
+    """
+    i,j,distances,vectors = neighbor_pairs(dump_class,cutoff,return_vectors = True)
+
+    source = np.concatenate((i,j))
+    target = np.concatenate((j,i))
+    vectors = np.concatenate((vectors,-vectors))
+
+    order = np.argsort(source,kind = "stable")
+    offsets = np.concatenate(([0],np.cumsum(np.bincount(source,minlength = len(dump_class.atoms)))))
+
+    return offsets,target[order],vectors[order]
+
+def nearest_neighbors(dump_class:dumpFile,k:int,cutoff:float = None):
+    """
+    the k nearest neighbors of every atom sorted by distance
+
+    proper call:
+    neighbors,vectors = nearest_neighbors(dump_class,k)
+
+    neighbors = (atoms x k) row positions[np.ndarray]
+    vectors = (atoms x k x 3) minimum image vectors to them[np.ndarray]
+
+    the search cutoff starts from the number density(or the given cutoff) and
+    is grown until every atom has k neighbors
+    """
+    origin,matrix = box_matrix(dump_class)
+    natoms = len(dump_class.atoms)
+
+    if cutoff is None:
+        density = natoms/abs(np.linalg.det(matrix))
+        cutoff = 1.2*(3.0*(k+1)/(4.0*np.pi*density))**(1.0/3.0)
+
+    while True:
+        offsets,neighbors,vectors = neighbor_list(dump_class,cutoff)
+        if np.diff(offsets).min(initial = k) >= k:
+            break
+        cutoff *= 1.25
+
+    distances = np.einsum("ij,ij->i",vectors,vectors)
+    source = np.repeat(np.arange(natoms),np.diff(offsets))
+    order = np.lexsort((distances,source))#by atom then by distance
+    rank = np.arange(len(order))-offsets[source[order]]
+    keep = order[rank < k]
+
+    return neighbors[keep].reshape(natoms,k),vectors[keep].reshape(natoms,k,3)
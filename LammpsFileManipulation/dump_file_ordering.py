@@ -0,0 +1,181 @@
+"""
+This is spatial reordering of the atoms of dumpFile classes along Morton(Z
+order) or Hilbert space filling curves, atoms close in space end up close in
+memory so neighbor searches, binning and slicing of large frames touch memory
+in order, the permutation back to the file order is kept
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#non-default imports
+import numpy as np
+
+#package imports
+from LammpsFileManipulation.dump_file_manipulation import dumpFile
+from LammpsFileManipulation.dump_file_periodic import fractional_coordinates,periodic_axes
+from LammpsFileManipulation import instrumentation
+
+################################################################################
+#Curve keys#####################################################################
+################################################################################
+
+curves = ["morton","hilbert"]
+
+def _grid(dump_class:dumpFile,bits:int)->np.ndarray:
+    """
+    integer grid cell(3 x n) of every atom with 2**bits cells per box vector,
+    periodic axes are wrapped and atoms outside fixed boundaries go to the edge
+    """
+    if not 1 <= bits <= 21:
+        raise Exception("bits must be between 1 and 21(3 x bits must fit in 64 bits)")
+
+    fractional = fractional_coordinates(dump_class)
+    periodic = periodic_axes(dump_class)
+    fractional[:,periodic] -= np.floor(fractional[:,periodic])
+
+    cells = np.floor(fractional*2**bits)
+    cells = np.clip(cells,0,2**bits-1)
+
+    return cells.T.astype(np.uint64)
+
+def _spread(values:np.ndarray)->np.ndarray:
+    """
+    moves bit b of 21 bit integers to bit 3b
+    """
+    values = values & np.uint64(0x1fffff)
+    values = (values | values << np.uint64(32)) & np.uint64(0x1f00000000ffff)
+    values = (values | values << np.uint64(16)) & np.uint64(0x1f0000ff0000ff)
+    values = (values | values << np.uint64(8)) & np.uint64(0x100f00f00f00f00f)
+    values = (values | values << np.uint64(4)) & np.uint64(0x10c30c30c30c30c3)
+    values = (values | values << np.uint64(2)) & np.uint64(0x1249249249249249)
+
+    return values
+
+def _interleave(grid:np.ndarray)->np.ndarray:
+    return (_spread(grid[0]) << np.uint64(2)) | (_spread(grid[1]) << np.uint64(1)) | _spread(grid[2])
+
+def _hilbert_transpose(grid:np.ndarray,bits:int)->np.ndarray:
+    """
+    Skilling's axes to transpose conversion(AIP Conf. Proc. 707, 381 (2004))
+    on every atom at once, interleaving the result gives the Hilbert index
+    """
+    grid = grid.copy()
+    one = np.uint64(1)
+
+    #inverse undo, the branches are done with 0/1 multipliers
+    for bit in range(bits-1,0,-1):
+        p = np.uint64((1 << bit)-1)
+        for axis in range(3):
+            flipped = (grid[axis] >> np.uint64(bit)) & one
+            grid[0] ^= p*flipped
+            swapped = ((grid[0] ^ grid[axis]) & p)*(one-flipped)
+            grid[0] ^= swapped
+            grid[axis] ^= swapped
+
+    #gray encode
+    grid[1] ^= grid[0]
+    grid[2] ^= grid[1]
+    turns = np.zeros(grid.shape[1],dtype = np.uint64)
+    for bit in range(bits-1,0,-1):
+        turns ^= np.uint64((1 << bit)-1)*((grid[2] >> np.uint64(bit)) & one)
+    grid ^= turns
+
+    return grid
+
+def curve_keys(dump_class:dumpFile,curve:str = "hilbert",bits:int = 10)->np.ndarray:
+    """
+    position of every atom along a space filling curve through the box
+
+    proper call:
+    keys = curve_keys(dump_class,curve = "hilbert",bits = 10)
+
+    curve = "morton" or "hilbert"(better locality, slightly slower)
+    bits = resolution of the curve, 2**bits cells per box vector(at most 21),
+           atoms in the same cell keep their order
+    """
+    if curve not in curves:
+        raise Exception("curve is not recognized "+str(curves))
+
+    grid = _grid(dump_class,bits)
+    if curve == "hilbert":
+        grid = _hilbert_transpose(grid,bits)
+
+    return _interleave(grid)
+
+################################################################################
+#Reordering#####################################################################
+################################################################################
+
+def spatial_sort(dump_class:dumpFile,curve:str = "hilbert",bits:int = 10,column:str = None):
+    """
+    returns a new dumpFile with the atoms ordered along a space filling curve and
+    the permutation to get back to the original order
+
+    proper call:
+    sorted_class,permutation = spatial_sort(dump_class,curve = "hilbert",bits = 10,column = None)
+
+    sorted_class.atoms row i is dump_class.atoms row permutation[i], restore_order
+    undoes it, column = name of a column holding the original row of every atom
+    so the order can be undone after writing and reading the frame back
+    """
+    with instrumentation.stage("spatial_sort"):
+        keys = curve_keys(dump_class,curve,bits)
+        permutation = np.argsort(keys,kind = "stable")
+
+        atoms = dump_class.atoms.iloc[permutation].reset_index(drop = True)
+        if column is not None:
+            atoms[column] = permutation
+
+    return dumpFile(dump_class.sim_timestep,dump_class.sim_numberofatoms,dump_class.sim_boxbounds,atoms),permutation
+
+def restore_order(dump_class:dumpFile,permutation = None,column:str = None,by_id:bool = False)->dumpFile:
+    """
+    undoes spatial_sort with its permutation or the original row column, by_id =
+    True orders the atoms by id instead
+
+    proper call:
+    dump_class = restore_order(sorted_class,permutation)
+    dump_class = restore_order(sorted_class,column = "row")
+    dump_class = restore_order(sorted_class,by_id = True)
+    """
+    if by_id:
+        order = np.argsort(dump_class.atoms[dumpFile.id].to_numpy(),kind = "stable")
+    elif column is not None:
+        order = np.argsort(dump_class.atoms[column].to_numpy(),kind = "stable")
+    elif permutation is not None:
+        order = np.argsort(np.asarray(permutation),kind = "stable")
+    else:
+        raise Exception("restore_order needs a permutation, a column or by_id = True")
+
+    atoms = dump_class.atoms.iloc[order].reset_index(drop = True)
+    if column is not None:
+        atoms = atoms.drop(columns = [column])
+
+    return dumpFile(dump_class.sim_timestep,dump_class.sim_numberofatoms,dump_class.sim_boxbounds,atoms)
+
+def spatial_sort_trajectory(dump_files:dict,curve:str = "hilbert",bits:int = 10,reference = None)->dict:
+    """
+    orders every frame of a dictionary {id:dumpFile} like the spatially sorted
+    reference frame(default the first frame) matching atoms by id so a row is
+    the same atom in every frame, write_hdf5_trajectory(sort_by_id = False) and
+    write_compressed_trajectory(sort_by_id = False) then keep this order
+
+    returns a new dictionary {id:dumpFile}
+    """
+    if reference is None:
+        reference = next(iter(dump_files.values()))
+    elif not isinstance(reference,dumpFile):
+        reference = dump_files[reference]
+
+    ordered,permutation = spatial_sort(reference,curve,bits)
+    ids = ordered.atoms[dumpFile.id].to_numpy()
+
+    return {key:dump_class.select_ids(ids) for key,dump_class in dump_files.items()}
@@ -0,0 +1,179 @@
+"""
+This is the pandas free part of the dump file parsing, the header reader and
+the byte level line handling shared by dumpFile and the numpy backed dumpFrame
+so that they can be used without importing pandas
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#non-default imports
+import numpy as np
+
+#package imports
+from LammpsFileManipulation import instrumentation
+
+################################################################################
+#Parsing helpers################################################################
+################################################################################
+
+def _read_dump_header(file):
+    """
+    reads the ITEM lines of one frame from an open binary file up to and
+    including the "ITEM: ATOMS" line leaving the file at the first atom line
+
+    returns a dictionary with timestep, numberofatoms, boundingtypes, lows,
+    highs and titles or None if the end of the file was reached
+    """
+    header = {}
+    line = file.readline()
+
+    while line:
+        text = line.decode().strip()
+
+        if text.startswith("ITEM: TIMESTEP"):
+            header["timestep"] = int(file.readline())
+
+        elif text.startswith("ITEM: NUMBER OF ATOMS"):
+            header["numberofatoms"] = int(file.readline())
+
+        elif text.startswith("ITEM: BOX BOUNDS"):
+            header["boundingtypes"] = text.replace("ITEM: BOX BOUNDS","").split()[-3:]
+            bounds = [file.readline().split() for i in range(3)]
+            header["lows"] = [float(bound[0]) for bound in bounds]
+            header["highs"] = [float(bound[1]) for bound in bounds]
+
+            if len(bounds[0]) == 3:
+                #triclinic boxes list the bounding box and the xy xz yz tilts
+                header["tilts"] = [float(bound[2]) for bound in bounds]
+                header["lows"],header["highs"] = _box_from_bounding_box(header["lows"],header["highs"],header["tilts"])
+
+        elif text.startswith("ITEM: ATOMS"):
+            header["titles"] = text.replace("ITEM: ATOMS","").split()
+            return header
+
+        elif text.startswith("ITEM:"):
+            #single value items such as ITEM: TIME or ITEM: UNITS
+            file.readline()
+
+        line = file.readline()
+
+    if header:
+        raise Exception("FILE IMPORT ERROR: check file formatting ")
+
+    return None
+
+def _box_from_bounding_box(lows:list,highs:list,tilts:list):
+    """
+    converts the bounding box of a triclinic dump header to xlo xhi ylo yhi zlo zhi
+    """
+    xy,xz,yz = tilts
+    lows = [lows[0]-min(0.0,xy,xz,xy+xz),lows[1]-min(0.0,yz),lows[2]]
+    highs = [highs[0]-max(0.0,xy,xz,xy+xz),highs[1]-max(0.0,yz),highs[2]]
+
+    return lows,highs
+
+def _bounding_box(lows:list,highs:list,tilts:list):
+    """
+    converts triclinic xlo xhi ylo yhi zlo zhi to the bounding box written in dumps
+    """
+    xy,xz,yz = tilts
+    lows = [lows[0]+min(0.0,xy,xz,xy+xz),lows[1]+min(0.0,yz),lows[2]]
+    highs = [highs[0]+max(0.0,xy,xz,xy+xz),highs[1]+max(0.0,yz),highs[2]]
+
+    return lows,highs
+
+def _read_line_block(file,numberoflines:int,buffer_size:int = 2**22)->bytes:
+    """
+    returns the bytes of the next numberoflines lines of an open binary file
+    leaving the file positioned at the start of the following line
+
+    the newlines are counted on whole buffers so no per line python work is done
+    """
+    pieces = []
+    remaining = numberoflines
+
+    while remaining > 0:
+        chunk = file.read(buffer_size)
+        if not chunk:
+            break
+
+        newlines = np.flatnonzero(np.frombuffer(chunk,dtype = np.uint8) == 10)
+
+        if len(newlines) >= remaining:
+            end = newlines[remaining-1]+1
+            file.seek(end-len(chunk),1)#stepping back to the end of the block
+            pieces.append(chunk[:end])
+            remaining = 0
+        else:
+            pieces.append(chunk)
+            remaining -= len(newlines)
+
+    block = b"".join(pieces)
+    instrumentation.count("bytes_read",len(block))
+
+    return block
+
+def _skip_line_block(file,numberoflines:int,buffer_size:int = 2**22):
+    """
+    moves an open binary file past the next numberoflines lines without keeping
+    or parsing them, returns the number of lines missing at the end of the file
+    (0 for a complete block)
+    """
+    remaining = numberoflines
+
+    while remaining > 0:
+        chunk = file.read(buffer_size)
+        if not chunk:
+            break
+
+        count = chunk.count(b"\n")
+
+        if count >= remaining:
+            newlines = np.flatnonzero(np.frombuffer(chunk,dtype = np.uint8) == 10)
+            file.seek(newlines[remaining-1]+1-len(chunk),1)
+            instrumentation.count("bytes_skipped",int(newlines[remaining-1])+1)
+            remaining = 0
+        else:
+            instrumentation.count("bytes_skipped",len(chunk))
+            remaining -= count
+
+    return remaining
+
+def _subsample_rows(numberofatoms:int,subsample,rng)->np.ndarray:
+    """
+    sorted random row positions to keep, subsample is a fraction(float) or a
+    count(int) of the atoms
+    """
+    if isinstance(subsample,float):
+        if not 0.0 <= subsample <= 1.0:
+            raise Exception("A subsample fraction must be between 0 and 1")
+        count = int(round(subsample*numberofatoms))
+    else:
+        count = min(int(subsample),numberofatoms)
+
+    return np.sort(rng.choice(numberofatoms,count,replace = False))
+
+def _select_lines(block,rows:np.ndarray)->bytes:
+    """
+    keeps only the given line positions of a block of text using a byte mask so
+    the dropped lines are never decoded
+    """
+    data = np.frombuffer(block,dtype = np.uint8)
+    ends = np.flatnonzero(data == 10)+1
+
+    if len(ends) == 0 or ends[-1] != len(data):
+        ends = np.append(ends,len(data))#last line without a newline
+
+    starts = np.concatenate(([0],ends[:-1]))
+    keep = np.zeros(len(ends),dtype = bool)
+    keep[rows] = True
+
+    return data[np.repeat(keep,ends-starts)].tobytes()
@@ -0,0 +1,193 @@
+"""
+This is a set of vectorized periodic boundary operations for dumpFile classes,
+wrapping atoms into orthogonal or triclinic boxes, unwrapping them with image
+flags and finding the boundary crossings of a trajectory
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#non-default imports
+import pandas as pd
+import numpy as np
+
+#package imports
+from LammpsFileManipulation.dump_file_manipulation import dumpFile
+from LammpsFileManipulation import kernels
+
+################################################################################
+#Box geometry###################################################################
+################################################################################
+
+axes = ["x","y","z"]
+image_columns = ["ix","iy","iz"] #lammps image flag columns
+
+def box_matrix(dump_class:dumpFile):
+    """
+    returns the box origin(3) and the 3x3 matrix whose rows are the box vectors
+    a = (lx,0,0), b = (xy,ly,0), c = (xz,yz,lz) so r = origin + s @ matrix
+    """
+    lows = dump_class.sim_boxbounds.loc["low",axes].to_numpy(dtype = float)
+    highs = dump_class.sim_boxbounds.loc["high",axes].to_numpy(dtype = float)
+    matrix = np.diag(highs-lows)
+
+    if "tilt" in dump_class.sim_boxbounds.index:
+        xy,xz,yz = dump_class.sim_boxbounds.loc["tilt",axes].to_numpy(dtype = float)
+        matrix[1,0] = xy
+        matrix[2,0] = xz
+        matrix[2,1] = yz
+
+    return lows,matrix
+
+def periodic_axes(dump_class:dumpFile)->np.ndarray:
+    """
+    boolean array of the x y z axes with periodic(pp) boundaries
+    """
+    return (dump_class.boundingtypes[axes] == "pp").to_numpy()
+
+def positions(dump_class:dumpFile)->np.ndarray:
+    return dump_class.atoms[[dumpFile.x_axis_cart,dumpFile.y_axis_cart,dumpFile.z_axis_cart]].to_numpy(dtype = float)
+
+def fractional_coordinates(dump_class:dumpFile)->np.ndarray:
+    """
+    atom positions as fractions of the box vectors(n x 3)
+    """
+    origin,matrix = box_matrix(dump_class)
+    return (positions(dump_class)-origin) @ np.linalg.inv(matrix)
+
+def minimum_image(delta:np.ndarray,dump_class:dumpFile)->np.ndarray:
+    """
+    applies the minimum image convention to displacement vectors(n x 3) along
+    the periodic axes of the box of dump_class
+    """
+    origin,matrix = box_matrix(dump_class)
+
+    return kernels.minimum_image(delta,matrix,np.linalg.inv(matrix),periodic_axes(dump_class))
+
+def _with_positions(dump_class:dumpFile,cartesian:np.ndarray,atoms:pd.DataFrame = None)->dumpFile:
+    atoms = dump_class.atoms.copy() if atoms is None else atoms
+    atoms[[dumpFile.x_axis_cart,dumpFile.y_axis_cart,dumpFile.z_axis_cart]] = cartesian
+
+    return dumpFile(dump_class.sim_timestep,dump_class.sim_numberofatoms,dump_class.sim_boxbounds,atoms)
+
+################################################################################
+#Wrapping and unwrapping########################################################
+################################################################################
+
+def wrap_atoms(dump_class:dumpFile,image_flags:bool = True)->dumpFile:
+    """
+    returns a new dumpFile with the atoms moved back into the box along every
+    periodic axis(non periodic axes are left alone)
+
+    image_flags = True adds(or updates) the ix iy iz columns with the number of
+                  box lengths each atom was moved so unwrap_atoms can undo it
+    """
+    origin,matrix = box_matrix(dump_class)
+    fractional = fractional_coordinates(dump_class)
+    periodic = periodic_axes(dump_class)
+
+    shift = np.zeros(fractional.shape,dtype = np.int64)
+    shift[:,periodic] = np.floor(fractional[:,periodic]).astype(np.int64)
+    wrapped = dump_class.atoms.copy()
+
+    if image_flags:
+        if set(image_columns).issubset(wrapped.columns):
+            wrapped[image_columns] = wrapped[image_columns].to_numpy(dtype = np.int64)+shift
+        else:
+            for ind,column in enumerate(image_columns):
+                wrapped[column] = shift[:,ind]
+
+    return _with_positions(dump_class,origin+(fractional-shift) @ matrix,wrapped)
+
+def unwrap_atoms(dump_class:dumpFile,keep_image_flags:bool = False)->dumpFile:
+    """
+    returns a new dumpFile with the positions unwrapped using the ix iy iz image
+    flag columns(r + ix*a + iy*b + iz*c)
+
+    keep_image_flags = False drops the image flag columns as they no longer
+                       describe the unwrapped positions
+    """
+    if not set(image_columns).issubset(dump_class.atoms.columns):
+        raise Exception("unwrapping needs the image flag columns ix iy iz")
+
+    origin,matrix = box_matrix(dump_class)
+    images = dump_class.atoms[image_columns].to_numpy(dtype = float)
+    atoms = dump_class.atoms.copy() if keep_image_flags else dump_class.atoms.drop(columns = image_columns)
+
+    return _with_positions(dump_class,positions(dump_class)+images @ matrix,atoms)
+
+################################################################################
+#Trajectories###################################################################
+################################################################################
+
+def _sorted_fractional(dump_class:dumpFile):
+    order = np.argsort(dump_class.atoms[dumpFile.id].to_numpy(),kind = "stable")
+    return order,dump_class.atoms[dumpFile.id].to_numpy()[order],fractional_coordinates(dump_class)[order]
+
+def boundary_crossings(dump_class_1:dumpFile,dump_class_2:dumpFile)->pd.DataFrame:
+    """
+    finds the atoms that crossed a periodic boundary between two consecutive
+    wrapped frames by matching ids, an atom whose fractional coordinate jumps by
+    more than half a box length crossed the boundary
+
+    returns a DataFrame of id and the image flag change(ix iy iz) of every atom
+    that crossed, ordered by id
+    """
+    order_1,ids_1,fractional_1 = _sorted_fractional(dump_class_1)
+    order_2,ids_2,fractional_2 = _sorted_fractional(dump_class_2)
+
+    if not np.array_equal(ids_1,ids_2):
+        raise Exception("The frames do not contain the same atom ids")
+
+    crossings = _crossings(fractional_1,fractional_2,periodic_axes(dump_class_2))
+    moved = crossings.any(axis = 1)
+
+    return pd.DataFrame(crossings[moved],columns = image_columns,index = pd.Index(ids_2[moved],name = dumpFile.id)).reset_index()
+
+def _crossings(fractional_1:np.ndarray,fractional_2:np.ndarray,periodic:np.ndarray)->np.ndarray:
+    crossings = np.zeros(fractional_1.shape,dtype = np.int64)
+    crossings[:,periodic] = -np.round(fractional_2[:,periodic]-fractional_1[:,periodic]).astype(np.int64)
+    return crossings
+
+def track_image_flags(dump_files:dict)->dict:
+    """
+    builds image flags for a wrapped trajectory {id:dumpFile}(in time order) by
+    accumulating the boundary crossings of consecutive frames, one array
+    operation per frame
+
+    returns a new dictionary of dumpFile classes with ix iy iz columns, the flags
+    of the first frame are used as the starting point when it has them
+    """
+    tracked = {}
+    previous = None
+
+    for key,dump_class in dump_files.items():
+        order,ids,fractional = _sorted_fractional(dump_class)
+
+        if previous is None:
+            if set(image_columns).issubset(dump_class.atoms.columns):
+                images = dump_class.atoms[image_columns].to_numpy(dtype = np.int64)[order]
+            else:
+                images = np.zeros(fractional.shape,dtype = np.int64)
+        else:
+            if not np.array_equal(ids,previous[0]):
+                raise Exception("Frame "+str(key)+" does not contain the same atom ids as the previous frame")
+            images = previous[2]+_crossings(previous[1],fractional,periodic_axes(dump_class))
+
+        atoms = dump_class.atoms.copy()
+        unsorted = np.empty_like(images)
+        unsorted[order] = images#back to the row order of the frame
+        for ind,column in enumerate(image_columns):
+            atoms[column] = unsorted[:,ind]
+
+        tracked[key] = dumpFile(dump_class.sim_timestep,dump_class.sim_numberofatoms,dump_class.sim_boxbounds,atoms)
+        previous = (ids,fractional,images)
+
+    return tracked
@@ -0,0 +1,264 @@
+"""
+This is supercell replication for dumpFile classes, a cell is tiled n x m x k
+times with array broadcasting and can be streamed straight into a data or dump
+file in chunks of images so very large systems are never held in memory
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#non-default imports
+import pandas as pd
+import numpy as np
+
+#package imports
+from LammpsFileManipulation.dump_file_manipulation import dumpFile,_make_boxbounds,_bounding_box
+from LammpsFileManipulation.dump_file_periodic import box_matrix,positions
+from LammpsFileManipulation.dump_file_neighbors import neighbor_pairs
+from LammpsFileManipulation import instrumentation
+
+################################################################################
+#Replication####################################################################
+################################################################################
+
+def _replicated_boxbounds(dump_class:dumpFile,counts:tuple)->pd.DataFrame:
+    """
+    box of the supercell, the box vectors a b c are scaled by n m k
+    """
+    origin,matrix = box_matrix(dump_class)
+    lengths = np.diag(matrix)*np.array(counts)
+    tilts = None
+
+    if "tilt" in dump_class.sim_boxbounds.index:
+        #xy follows b(m copies) while xz and yz follow c(k copies)
+        tilts = [matrix[1,0]*counts[1],matrix[2,0]*counts[2],matrix[2,1]*counts[2]]
+
+    return _make_boxbounds(origin.tolist(),(origin+lengths).tolist(),dump_class.boundingtypes[["x","y","z"]].tolist(),tilts)
+
+def _image_shifts(dump_class:dumpFile,counts:tuple)->np.ndarray:
+    """
+    translation of every image(images x 3) in the order x slowest, z fastest
+    """
+    origin,matrix = box_matrix(dump_class)
+    images = np.stack(np.meshgrid(np.arange(counts[0]),np.arange(counts[1]),np.arange(counts[2]),indexing = "ij"),axis = -1).reshape(-1,3)
+
+    return images @ matrix
+
+def _overlapping_rows(dump_class:dumpFile,counts:tuple,overlap_cutoff:float):
+    """
+    rows of the cell to drop so no two atoms of the supercell are closer than
+    overlap_cutoff, the cell is made periodic along the replicated axes so the
+    overlaps between neighboring images are found without building them and
+    the later atom of every overlapping pair is dropped
+
+    returns the rows dropped from every image and the rows(with the image
+    offset of their partner) dropped only from the images whose partner exists,
+    along an axis that is not periodic the outermost images have no partner
+    beyond the outer face so those atoms are kept
+    """
+    original = np.array([bound == "pp" for bound in dump_class.boundingtypes[["x","y","z"]].tolist()])
+    boundingtypes = ["pp" if count > 1 or periodic else bound for count,periodic,bound in zip(counts,original,dump_class.boundingtypes[["x","y","z"]].tolist())]
+    boxbounds = dump_class.sim_boxbounds.copy()
+    boxbounds.loc["type",["x","y","z"]] = boundingtypes
+    cell = dumpFile(dump_class.sim_timestep,dump_class.sim_numberofatoms,boxbounds,dump_class.atoms)
+
+    i,j,distances,vectors = neighbor_pairs(cell,overlap_cutoff,return_vectors = True)
+
+    #image of the partner of j relative to the image of j(j in image I meets i in image I + offset)
+    origin,matrix = box_matrix(cell)
+    cartesian = positions(cell)
+    offsets = np.rint((cartesian[j]-cartesian[i]-vectors) @ np.linalg.inv(matrix)).astype(np.int64)
+    offsets[:,original] = 0#periodic axes wrap so the partner always exists
+
+    everywhere = np.unique(j[~offsets.any(axis = 1)])
+    partial = ~np.isin(j,everywhere) & offsets.any(axis = 1)
+
+    return everywhere,j[partial],offsets[partial]
+
+def _seam_drops(rows:np.ndarray,offsets:np.ndarray,counts:tuple,images:np.ndarray):
+    """
+    (position in images, row) of the atoms dropped only at the internal seams
+    between images
+    """
+    if len(rows) == 0:
+        return np.zeros(0,dtype = np.int64),np.zeros(0,dtype = np.int64)
+
+    grid = np.stack(np.unravel_index(images,counts),axis = 1)
+    found_images = []
+    found_rows = []
+
+    for offset in np.unique(offsets,axis = 0):
+        group = np.unique(rows[(offsets == offset).all(axis = 1)])
+        partner = grid+offset
+        exists = np.flatnonzero(((partner >= 0) & (partner < np.array(counts))).all(axis = 1))
+        found_images.append(np.repeat(exists,len(group)))
+        found_rows.append(np.tile(group,len(exists)))
+
+    #a corner atom can meet partners along several axes
+    pairs = np.unique(np.stack((np.concatenate(found_images),np.concatenate(found_rows)),axis = 1),axis = 0)
+
+    return pairs[:,0],pairs[:,1]
+
+def _base_cell(dump_class:dumpFile,counts:tuple,overlap_cutoff:float):
+    """
+    atoms of the cell with the overlaps removed, their positions, the id
+    offset between images and the atoms dropped only at the seams
+    """
+    atoms = dump_class.atoms
+    seams = (np.zeros(0,dtype = np.int64),np.zeros((0,3),dtype = np.int64))
+    if overlap_cutoff is not None:
+        drop,rows,offsets = _overlapping_rows(dump_class,counts,overlap_cutoff)
+        atoms = atoms.drop(index = atoms.index[drop])
+
+        #rows counted again without the ones dropped everywhere
+        remap = np.full(len(dump_class.atoms),-1,dtype = np.int64)
+        remap[np.setdiff1d(np.arange(len(dump_class.atoms)),drop)] = np.arange(len(atoms))
+        seams = (remap[rows],offsets)
+        instrumentation.count("overlaps_removed",len(drop))
+
+    cell = dumpFile(dump_class.sim_timestep,len(atoms),dump_class.sim_boxbounds,atoms)
+    id_offset = int(dump_class.atoms[dumpFile.id].max()) if len(dump_class.atoms) > 0 else 0
+
+    return atoms,positions(cell),id_offset,seams
+
+def _image_block(atoms:pd.DataFrame,cartesian:np.ndarray,shifts:np.ndarray,images:np.ndarray,id_offset:int,seams:tuple,counts:tuple)->pd.DataFrame:
+    """
+    the atoms of the given images as one DataFrame, ids are renumbered as
+    id + image*id_offset like lammps replicate
+    """
+    natoms = len(atoms)
+    block = {}
+
+    for column in atoms.columns:
+        block[column] = np.tile(atoms[column].to_numpy(),len(images))
+
+    tiled = (cartesian[None,:,:]+shifts[images][:,None,:]).reshape(-1,3)
+    block[dumpFile.x_axis_cart] = tiled[:,0]
+    block[dumpFile.y_axis_cart] = tiled[:,1]
+    block[dumpFile.z_axis_cart] = tiled[:,2]
+    block[dumpFile.id] = (atoms[dumpFile.id].to_numpy(dtype = np.int64)[None,:]+images[:,None].astype(np.int64)*id_offset).reshape(-1)
+
+    block = pd.DataFrame(block,columns = atoms.columns)
+
+    dropped_images,dropped_rows = _seam_drops(*seams,counts,images)
+    if len(dropped_rows) > 0:
+        keep = np.ones(len(block),dtype = bool)
+        keep[dropped_images*natoms+dropped_rows] = False
+        block = block[keep].reset_index(drop = True)
+
+    return block
+
+def replicate_atoms(dump_class:dumpFile,n:int,m:int,k:int,overlap_cutoff:float = None)->dumpFile:
+    """
+    tiles the cell n x m x k times along the box vectors in memory
+
+    proper call:
+    supercell = replicate_atoms(dump_class,n,m,k,overlap_cutoff = None)
+
+    ids are renumbered as id + image*max(id)(image = (i*m+j)*k+l), the box and
+    triclinic tilts are scaled and overlap_cutoff removes the later atom of every
+    pair closer than the cutoff(atoms duplicated on the faces of the cell, on
+    axes that are not periodic only at the seams between images)
+    """
+    counts = (int(n),int(m),int(k))
+    if min(counts) < 1:
+        raise Exception("The replication counts must be at least 1")
+
+    with instrumentation.stage("replicate"):
+        atoms,cartesian,id_offset,seams = _base_cell(dump_class,counts,overlap_cutoff)
+        shifts = _image_shifts(dump_class,counts)
+        block = _image_block(atoms,cartesian,shifts,np.arange(len(shifts)),id_offset,seams,counts)
+
+    return dumpFile(dump_class.sim_timestep,len(block),_replicated_boxbounds(dump_class,counts),block)
+
+################################################################################
+#Streamed writing###############################################################
+################################################################################
+
+def _data_header(boxbounds:pd.DataFrame,numberofatoms:int,numberoftypes:int,precision:int)->str:
+    lows = boxbounds.loc["low",["x","y","z"]].tolist()
+    highs = boxbounds.loc["high",["x","y","z"]].tolist()
+
+    header = "# LAMMPS data file written by LammpsFileManipulation.py \n"
+    header += str(numberofatoms)+" atoms \n"
+    header += str(numberoftypes)+" atom types \n"
+    for low,high,axis in zip(lows,highs,["x","y","z"]):
+        header += str(round(low,precision))+" "+str(round(high,precision))+" "+axis+"lo "+axis+"hi\n"
+    if "tilt" in boxbounds.index:
+        header += " ".join(str(round(tilt,precision)) for tilt in boxbounds.loc["tilt",["x","y","z"]].tolist())+" xy xz yz\n"
+    header += "\n\n"
+    header += "Atoms  # atomic\n\n"
+
+    return header
+
+def _dump_header(boxbounds:pd.DataFrame,timestep:int,numberofatoms:int,columns:list,precision:int)->str:
+    lows = boxbounds.loc["low",["x","y","z"]].tolist()
+    highs = boxbounds.loc["high",["x","y","z"]].tolist()
+    types = boxbounds.loc["type",["x","y","z"]].tolist()
+    tilts = ["","",""]
+
+    header = "ITEM: TIMESTEP \n"+str(timestep)+"\n"
+    header += "ITEM: NUMBER OF ATOMS \n"+str(numberofatoms)+"\n"
+    header += "ITEM: BOX BOUNDS "
+
+    if "tilt" in boxbounds.index:
+        tilts = boxbounds.loc["tilt",["x","y","z"]].tolist()
+        lows,highs = _bounding_box(lows,highs,tilts)
+        tilts = [" "+str(round(tilt,precision)) for tilt in tilts]
+        header += "xy xz yz "
+
+    header += types[0]+" "+types[1]+" "+types[2]+"\n"
+    for low,high,tilt in zip(lows,highs,tilts):
+        header += str(round(low,precision))+" "+str(round(high,precision))+tilt+"\n"
+    header += "ITEM: ATOMS "+" ".join(str(column) for column in columns)+"\n"
+
+    return header
+
+def write_replicated(dump_class:dumpFile,file_path:str,n:int,m:int,k:int,file_format:str = "data",overlap_cutoff:float = None,chunk_atoms:int = 2**22):
+    """
+    writes the n x m x k supercell straight to a lammps data or dump file, only
+    the images of one chunk(about chunk_atoms atoms) are in memory at a time
+
+    proper call:
+    write_replicated(dump_class,file_path,n,m,k,file_format = "data",overlap_cutoff = None,chunk_atoms = 2**22)
+
+    file_format = "data"(id type x y z, Atoms # atomic) or "dump"(every column)
+    the ids, box and overlap removal are the same as replicate_atoms
+    """
+    if file_format not in ["data","dump"]:
+        raise Exception('file_format is not recognized ["data","dump"]')
+
+    counts = (int(n),int(m),int(k))
+    if min(counts) < 1:
+        raise Exception("The replication counts must be at least 1")
+
+    precision = dumpFile.class_tolerance
+    atoms,cartesian,id_offset,seams = _base_cell(dump_class,counts,overlap_cutoff)
+    shifts = _image_shifts(dump_class,counts)
+    boxbounds = _replicated_boxbounds(dump_class,counts)
+    numberofatoms = len(atoms)*len(shifts)-len(_seam_drops(*seams,counts,np.arange(len(shifts)))[1])
+
+    if file_format == "data":
+        atoms = atoms[[dumpFile.id,dumpFile.type,dumpFile.x_axis_cart,dumpFile.y_axis_cart,dumpFile.z_axis_cart]]
+        header = _data_header(boxbounds,numberofatoms,int(atoms[dumpFile.type].max()),precision)
+    else:
+        header = _dump_header(boxbounds,dump_class.sim_timestep,numberofatoms,list(atoms.columns),precision)
+
+    images_per_chunk = max(1,chunk_atoms//max(1,len(atoms)))
+
+    with open(file_path,"w") as file:
+        file.write(header)
+
+        with instrumentation.stage("write_replicated"):
+            for start in range(0,len(shifts),images_per_chunk):
+                images = np.arange(start,min(start+images_per_chunk,len(shifts)))
+                block = _image_block(atoms,cartesian,shifts,images,id_offset,seams,counts)
+                block.round(precision).to_csv(file,index = False,header = False,sep = ' ')
+                instrumentation.count("rows_written",len(block))
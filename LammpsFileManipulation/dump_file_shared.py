@@ -0,0 +1,333 @@
+"""
+This is a shared memory trajectory store, a trajectory is parsed once into
+multiprocessing.shared_memory blocks(one per frame) described by a small
+catalog block and other processes on the same host attach to it by name and
+get read only dumpFile views of the frames without copying or parsing
+
+the blocks are reference counted, every attach adds one and every close
+removes one, the last process to close unlinks them
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#default imports
+import os
+import json
+import fcntl
+import inspect
+import struct
+import secrets
+import tempfile
+import weakref
+from multiprocessing import shared_memory,resource_tracker
+
+#non-default imports
+import pandas as pd
+import numpy as np
+
+#package imports
+from LammpsFileManipulation.dump_file_manipulation import dumpFile,_make_boxbounds
+from LammpsFileManipulation.dump_file_concatenate import _source_files
+from LammpsFileManipulation.dump_frame import dumpFrame,read_frames
+from LammpsFileManipulation import instrumentation
+
+################################################################################
+#Shared memory blocks###########################################################
+################################################################################
+
+_counter = struct.Struct("<qq")#reference count, catalog length
+_alignment = 64
+
+#python >= 3.13 can skip the resource tracker, older versions register every
+#block and unlink it when the process that opened it exits
+_trackable = "track" in inspect.signature(shared_memory.SharedMemory).parameters
+
+def _segment(name:str,create:bool = False,size:int = 0):
+    """
+    opens or creates a block that is not unlinked when this process exits(the
+    reference count decides when it is removed)
+    """
+    if _trackable:
+        return shared_memory.SharedMemory(name = name,create = create,size = size,track = False)
+
+    segment = shared_memory.SharedMemory(name = name,create = create,size = size)
+    resource_tracker.unregister(segment._name,"shared_memory")
+    return segment
+
+def _unlink(segment):
+    if not _trackable:
+        #unlink unregisters the block so it is registered again first
+        resource_tracker.register(segment._name,"shared_memory")
+    segment.unlink()
+
+def _close(segment):
+    try:
+        segment.close()
+    except BufferError:
+        pass#views of it are still alive, it is unmapped when they are collected
+
+class _locked:
+    """
+    exclusive lock on a file next to the blocks while the count is changed
+    """
+    def __init__(self,name:str):
+        self.path = os.path.join(tempfile.gettempdir(),name+".lock")
+
+    def __enter__(self):
+        self.file = open(self.path,"a")
+        fcntl.flock(self.file,fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self,*exc_info):
+        fcntl.flock(self.file,fcntl.LOCK_UN)
+        self.file.close()
+        return False
+
+def _frame_parts(frame)->tuple:
+    """
+    header values and column arrays of a dumpFile or dumpFrame
+    """
+    if isinstance(frame,dumpFrame):
+        tilts = None if frame.tilts is None else frame.tilts.tolist()
+        return frame.timestep,frame.numberofatoms,frame.lows.tolist(),frame.highs.tolist(),list(frame.boundingtypes),tilts,frame.columns
+
+    boxbounds = frame.sim_boxbounds
+    tilts = boxbounds.loc["tilt",["x","y","z"]].astype(float).tolist() if "tilt" in boxbounds.index else None
+    columns = {str(column):frame.atoms[column].to_numpy() for column in frame.atoms.columns}
+
+    return frame.sim_timestep,frame.sim_numberofatoms,boxbounds.loc["low",["x","y","z"]].astype(float).tolist(),boxbounds.loc["high",["x","y","z"]].astype(float).tolist(),boxbounds.loc["type",["x","y","z"]].tolist(),tilts,columns
+
+def _release(name:str,segments:list,catalog):
+    """
+    removes one reference, the last one unlinks every block
+    """
+    with _locked(name):
+        count,length = _counter.unpack_from(catalog.buf,0)
+        count -= 1
+        _counter.pack_into(catalog.buf,0,count,length)
+
+        for segment in segments:
+            if count <= 0:
+                _unlink(segment)
+            _close(segment)
+
+        if count <= 0:
+            _unlink(catalog)
+        _close(catalog)
+
+    if count <= 0:
+        try:
+            os.remove(os.path.join(tempfile.gettempdir(),name+".lock"))
+        except OSError:
+            pass
+
+################################################################################
+#Shared trajectory##############################################################
+################################################################################
+
+class sharedTrajectory:
+    """
+    This is a trajectory held in shared memory that any process on the host can
+    attach to by name, frames come back as read only dumpFile classes whose
+    atoms point straight into the shared blocks
+
+    proper call:
+    #process that loads the trajectory once
+    shared = sharedTrajectory.load(sources,name = None)
+    shared = sharedTrajectory.publish(dump_files,name = None)
+    shared.name #give this to the other processes
+
+    #any other process(jupyter kernel, pool worker)
+    with sharedTrajectory.attach(name) as trajectory:
+        dump_class = trajectory.frame(0) #by position
+        dump_class = trajectory.frame_at(10000) #by timestep
+        x = trajectory.column(0,"x") #read only numpy view
+
+    valid property calls:
+        trajectory.name = name of the catalog block[str]
+        trajectory.timesteps = timesteps of the frames[np.ndarray]
+        trajectory.numberofframes = frames in the trajectory[int]
+        trajectory.references = processes(or handles) attached right now[int]
+
+    every handle must be closed(or used in a with block), the blocks are
+    unlinked when the last one is closed, handles still open when a process
+    exits are closed then, the frames must not be used after close
+    """
+
+    def __init__(self,name:str,catalog,entries:list):
+        self.name = name
+        self._catalog = catalog
+        self.entries = entries
+        self.timesteps = np.array([entry["timestep"] for entry in entries],dtype = np.int64)
+        self._segments = [_segment(entry["segment"]) for entry in entries]
+        self._finalizer = weakref.finalize(self,_release,name,self._segments,catalog)
+
+    #Alternative CLass Constructive Methods#####################################
+    @classmethod
+    def publish(cls,dump_files,name:str = None):
+        """
+        copies a dictionary {id:dumpFile} or any iterable of dumpFile/dumpFrame
+        classes into shared memory one frame at a time and returns the first
+        handle to it
+        """
+        name = "lfm_"+secrets.token_hex(6) if name is None else name
+        frames = dump_files.values() if isinstance(dump_files,dict) else dump_files
+        entries = []
+        segments = []
+
+        try:
+            for position,frame in enumerate(frames):
+                with instrumentation.stage("publish_frame"):
+                    timestep,numberofatoms,lows,highs,boundingtypes,tilts,columns = _frame_parts(frame)
+
+                    layout = []
+                    size = 0
+                    for column,values in columns.items():
+                        values = np.ascontiguousarray(values)
+                        if values.dtype == object:
+                            raise Exception("Column "+column+" is not numeric and can not be shared")
+                        layout.append({"column":column,"dtype":values.dtype.str,"offset":size,"length":len(values)})
+                        size += -(-values.nbytes//_alignment)*_alignment
+
+                    segment = _segment(name+"_"+str(position),True,max(size,1))
+                    segments.append(segment)
+                    for item,values in zip(layout,columns.values()):
+                        target = np.ndarray(item["length"],dtype = item["dtype"],buffer = segment.buf,offset = item["offset"])
+                        target[:] = values
+                        del target
+
+                    entries.append({"segment":name+"_"+str(position),"timestep":int(timestep),"numberofatoms":int(numberofatoms),
+                                    "lows":lows,"highs":highs,"boundingtypes":boundingtypes,"tilts":tilts,"columns":layout})
+                    instrumentation.count("bytes_shared",size)
+
+            encoded = json.dumps({"frames":entries}).encode()
+            catalog = _segment(name,True,_counter.size+len(encoded))
+            _counter.pack_into(catalog.buf,0,1,len(encoded))
+            catalog.buf[_counter.size:_counter.size+len(encoded)] = encoded
+        except BaseException:
+            for segment in segments:
+                _unlink(segment)
+                _close(segment)
+            raise
+
+        for segment in segments:
+            _close(segment)
+
+        return cls(name,catalog,entries)
+
+    @classmethod
+    def load(cls,sources,name:str = None):
+        """
+        parses dump files(a file, directory, glob pattern or a list of them)
+        straight into shared memory, only one frame is parsed at a time
+        """
+        frames = (frame for file_path in _source_files(sources) for frame in read_frames(file_path))
+
+        return cls.publish(frames,name)
+
+    @classmethod
+    def attach(cls,name:str):
+        """
+        opens a shared trajectory by name adding one reference
+        """
+        with _locked(name):
+            try:
+                catalog = _segment(name)
+            except FileNotFoundError:
+                raise Exception("No shared trajectory named "+str(name))
+
+            count,length = _counter.unpack_from(catalog.buf,0)
+            if count <= 0:
+                _close(catalog)
+                raise Exception("The shared trajectory "+str(name)+" has been released")
+            _counter.pack_into(catalog.buf,0,count+1,length)
+            entries = json.loads(bytes(catalog.buf[_counter.size:_counter.size+length]))["frames"]
+
+        return cls(name,catalog,entries)
+
+    #property defined functions#################################################
+    @property
+    def numberofframes(self):
+        return len(self.entries)
+
+    @property
+    def references(self):
+        return _counter.unpack_from(self._catalog.buf,0)[0]
+
+    #Class functional methods###################################################
+    def _columns(self,position:int)->dict:
+        if not self._finalizer.alive:
+            raise Exception("The shared trajectory handle is closed")
+
+        segment = self._segments[position]
+        arrays = {}
+        for item in self.entries[position]["columns"]:
+            values = np.ndarray(item["length"],dtype = item["dtype"],buffer = segment.buf,offset = item["offset"])
+            values.flags.writeable = False
+            arrays[item["column"]] = values
+
+        return arrays
+
+    def column(self,position:int,name:str)->np.ndarray:
+        """
+        read only array of one column of a frame in shared memory
+        """
+        return self._columns(position)[name]
+
+    def frame(self,position:int)->dumpFile:
+        """
+        read only dumpFile view of one frame by position, the atoms are not copied
+        """
+        entry = self.entries[position]
+        atoms = pd.DataFrame(self._columns(position),copy = False)
+        boxbounds = _make_boxbounds(entry["lows"],entry["highs"],entry["boundingtypes"],entry["tilts"])
+
+        return dumpFile(entry["timestep"],entry["numberofatoms"],boxbounds,atoms)
+
+    def frame_at(self,timestep:int)->dumpFile:
+        """
+        read only dumpFile view of one frame by timestep
+        """
+        matches = np.flatnonzero(self.timesteps == timestep)
+        if len(matches) == 0:
+            raise Exception("Timestep "+str(timestep)+" is not in the trajectory")
+
+        return self.frame(int(matches[0]))
+
+    def frames(self)->dict:
+        """
+        {timestep:dumpFile} of read only views like multiple_timestep_singular_file_dumps
+        """
+        return {int(timestep):self.frame(position) for position,timestep in enumerate(self.timesteps)}
+
+    def close(self):
+        """
+        drops the reference of this handle, the last one unlinks the blocks
+        """
+        self._finalizer()
+
+    #dubble under functions#####################################################
+    def __iter__(self):
+        for position in range(self.numberofframes):
+            yield self.frame(position)
+
+    def __len__(self):
+        return self.numberofframes
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc_info):
+        self.close()
+        return False
+
+    def __repr__(self):
+        return "{Shared:"+self.name+"\nFrames:"+str(self.numberofframes)+"}"
@@ -0,0 +1,205 @@
+"""
+This is a set of vectorized structural descriptors for dumpFile classes, the
+centrosymmetry parameter and adaptive common neighbor analysis(a-CNA) for
+finding dislocations, stacking faults and grain boundaries
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#default imports
+import concurrent.futures
+
+#non-default imports
+import numpy as np
+
+#package imports
+from LammpsFileManipulation.dump_file_manipulation import dumpFile
+from LammpsFileManipulation.dump_file_neighbors import nearest_neighbors
+from LammpsFileManipulation import instrumentation
+
+################################################################################
+#Centrosymmetry#################################################################
+################################################################################
+
+chunk_atoms = 4096 #atoms whose neighbor bonds are built at once
+
+#structure type values of the a-CNA column
+structure_types = {0:"other",1:"fcc",2:"hcp",3:"bcc",4:"ico"}
+
+def _centrosymmetry(vectors:np.ndarray)->np.ndarray:
+    """
+    sum of the N/2 smallest |r_i + r_j|^2 over the neighbor pairs of every atom
+    (the greedy lammps compute centro/atom definition)
+    """
+    n = vectors.shape[1]
+    first,second = np.triu_indices(n,1)
+    values = np.empty(len(vectors))
+
+    for chunk in range(0,len(vectors),chunk_atoms):
+        block = vectors[chunk:chunk+chunk_atoms]
+        sums = block[:,first,:]+block[:,second,:]
+        squared = np.einsum("apk,apk->ap",sums,sums)
+        values[chunk:chunk+chunk_atoms] = np.partition(squared,n//2-1,axis = 1)[:,:n//2].sum(axis = 1)
+
+    return values
+
+def centrosymmetry(dump_class:dumpFile,num_neighbors:int = 12,column:str = "csp")->dumpFile:
+    """
+    returns a new dumpFile with the centrosymmetry parameter in column
+
+    proper call:
+    dump_class = centrosymmetry(dump_class,num_neighbors = 12,column = "csp")
+
+    num_neighbors = 12 for fcc and 8 for bcc lattices(must be even)
+    """
+    if num_neighbors % 2 != 0:
+        raise Exception("num_neighbors must be even for the centrosymmetry parameter")
+
+    with instrumentation.stage("centrosymmetry"):
+        neighbors,vectors = nearest_neighbors(dump_class,num_neighbors)
+        atoms = dump_class.atoms.copy()
+        atoms[column] = _centrosymmetry(vectors)
+
+    return dumpFile(dump_class.sim_timestep,dump_class.sim_numberofatoms,dump_class.sim_boxbounds,atoms)
+
+################################################################################
+#Adaptive common neighbor analysis##############################################
+################################################################################
+
+def _signatures(vectors:np.ndarray,cutoff:np.ndarray):
+    """
+    the common neighbor signature of every atom-neighbor bond using only the
+    neighbors of the central atom
+
+    vectors = (atoms x N x 3) neighbor vectors
+    cutoff = (atoms) local cutoffs
+
+    returns (atoms x N) arrays of the number of common neighbors, the number of
+    bonds between them and the longest chain of those bonds
+    """
+    natoms,n = vectors.shape[:2]
+
+    #bonds between the neighbors of each atom
+    delta = vectors[:,:,None,:]-vectors[:,None,:,:]
+    bonds = np.einsum("aklx,aklx->akl",delta,delta) < (cutoff*cutoff)[:,None,None]
+    bonds[:,np.arange(n),np.arange(n)] = False
+
+    #common neighbors of the central atom and neighbor m are the neighbors bonded to m
+    common = bonds#(atom,m,k)
+    ncommon = common.sum(axis = 2)
+
+    #bonds among the common neighbors of each (atom,m)
+    edges = bonds[:,None,:,:] & common[:,:,:,None] & common[:,:,None,:]#(atom,m,k,l)
+    nbonds = edges.sum(axis = (2,3))//2
+
+    #connected bond clusters by min label propagation
+    labels = np.broadcast_to(np.arange(n,dtype = np.int8),(natoms,n,n)).copy()
+    while True:
+        candidates = np.where(edges,labels[:,:,None,:],np.int8(n)).min(axis = 3)
+        updated = np.minimum(labels,candidates)
+        if np.array_equal(updated,labels):
+            break
+        labels = updated
+
+    #bonds per cluster, every bond is counted from both ends
+    a,m,k,l = np.nonzero(edges)
+    keys = (a*n+m)*n+labels[a,m,k]
+    chain = (np.bincount(keys,minlength = natoms*n*n).reshape(natoms,n,n)//2).max(axis = 2)
+
+    return ncommon,nbonds,chain
+
+def _match(ncommon:np.ndarray,nbonds:np.ndarray,chain:np.ndarray,signature:tuple)->np.ndarray:
+    return (ncommon == signature[0]) & (nbonds == signature[1]) & (chain == signature[2])
+
+def _classify(vectors:np.ndarray)->np.ndarray:
+    """
+    a-CNA structure type(see structure_types) of every atom from its 14 nearest
+    neighbor vectors sorted by distance
+    """
+    structures = np.zeros(len(vectors),dtype = np.int64)
+    distances = np.sqrt(np.einsum("akx,akx->ak",vectors,vectors))
+
+    #fcc, hcp and icosahedral from the 12 nearest neighbors
+    cutoff = (1.0+np.sqrt(2.0))/2.0*distances[:,:12].mean(axis = 1)
+    ncommon,nbonds,chain = _signatures(vectors[:,:12],cutoff)
+    s421 = _match(ncommon,nbonds,chain,(4,2,1)).sum(axis = 1)
+    s422 = _match(ncommon,nbonds,chain,(4,2,2)).sum(axis = 1)
+    s555 = _match(ncommon,nbonds,chain,(5,5,5)).sum(axis = 1)
+
+    structures[s421 == 12] = 1
+    structures[(s421 == 6) & (s422 == 6)] = 2
+    structures[s555 == 12] = 4
+
+    #bcc from the 14 nearest neighbors(8 first and 6 second shell)
+    remaining = np.flatnonzero(structures == 0)
+    if len(remaining) > 0:
+        shells = distances[remaining]
+        cutoff = (1.0+np.sqrt(2.0))/2.0*(shells[:,:8].sum(axis = 1)*2.0/np.sqrt(3.0)+shells[:,8:14].sum(axis = 1))/14.0
+        ncommon,nbonds,chain = _signatures(vectors[remaining,:14],cutoff)
+        s666 = _match(ncommon,nbonds,chain,(6,6,6)).sum(axis = 1)
+        s444 = _match(ncommon,nbonds,chain,(4,4,4)).sum(axis = 1)
+        structures[remaining[(s666 == 8) & (s444 == 6)]] = 3
+
+    return structures
+
+def adaptive_cna(dump_class:dumpFile,column:str = "structure")->dumpFile:
+    """
+    returns a new dumpFile with the adaptive common neighbor analysis structure
+    type of every atom in column
+
+    proper call:
+    dump_class = adaptive_cna(dump_class,column = "structure")
+
+    structure_types = {0:"other",1:"fcc",2:"hcp",3:"bcc",4:"ico"}
+
+    the local cutoff of every atom comes from its own 12(fcc/hcp/ico) or
+    14(bcc) nearest neighbors so no global cutoff is needed
+    """
+    with instrumentation.stage("adaptive_cna"):
+        neighbors,vectors = nearest_neighbors(dump_class,14)
+        structures = np.empty(len(vectors),dtype = np.int64)
+
+        for chunk in range(0,len(vectors),chunk_atoms):
+            structures[chunk:chunk+chunk_atoms] = _classify(vectors[chunk:chunk+chunk_atoms])
+
+        atoms = dump_class.atoms.copy()
+        atoms[column] = structures
+
+    return dumpFile(dump_class.sim_timestep,dump_class.sim_numberofatoms,dump_class.sim_boxbounds,atoms)
+
+################################################################################
+#Trajectories###################################################################
+################################################################################
+
+def _structure_frame(arguments):
+    key,dump_class,csp,cna,num_neighbors = arguments
+
+    if csp:
+        dump_class = centrosymmetry(dump_class,num_neighbors)
+    if cna:
+        dump_class = adaptive_cna(dump_class)
+
+    return key,dump_class
+
+def structure_trajectory(dump_files:dict,csp:bool = True,cna:bool = True,num_neighbors:int = 12,max_workers:int = None)->dict:
+    """
+    adds the csp and/or structure columns to every frame of a dictionary
+    {id:dumpFile} in a process pool(max_workers = 1 runs in this process)
+
+    returns a new dictionary {id:dumpFile}
+    """
+    arguments = [(key,dump_class,csp,cna,num_neighbors) for key,dump_class in dump_files.items()]
+
+    if max_workers == 1 or len(arguments) < 2:
+        return dict(_structure_frame(argument) for argument in arguments)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers = max_workers) as executor:
+        return dict(executor.map(_structure_frame,arguments))
@@ -0,0 +1,192 @@
+"""
+This is a lightweight frame type for lammps dumps backed by plain numpy
+arrays, it uses __slots__ and only imports pandas when the atoms are asked for
+as a DataFrame so short jobs that only need arrays never pay for pandas
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#non-default imports
+import numpy as np
+
+#package imports
+from LammpsFileManipulation import instrumentation
+from LammpsFileManipulation import kernels
+from LammpsFileManipulation.dump_file_parsing import _read_dump_header,_read_line_block,_skip_line_block
+
+################################################################################
+#Numpy frames###################################################################
+################################################################################
+
+class dumpFrame:
+    """
+    This is one dump frame held as numpy arrays, one array per atom column
+
+    proper call:
+    frame = dumpFrame.read(file_path)
+    for frame in read_frames(file_path):
+        ...
+
+    valid property calls:
+        frame.timestep = timestep of the frame[int]
+        frame.numberofatoms = simulation number of atoms[int]
+        frame.lows/frame.highs = xlo ylo zlo/xhi yhi zhi[np.ndarray]
+        frame.tilts = xy xz yz of triclinic boxes or None[np.ndarray]
+        frame.boundingtypes = boundary types of x y z[tuple]
+        frame.columns = {column:values}[dict of np.ndarray]
+        frame.titles = column names in file order[list]
+        frame["x"] = one column[np.ndarray]
+        frame.nbytes = bytes held by the columns[int]
+        frame.sim_boxbounds = box in the dumpFile layout(imports pandas)[pd.DataFrame]
+        frame.atoms = columns as a DataFrame(imports pandas, built once)[pd.DataFrame]
+
+    method calls:
+        frame.to_dumpfile() = the same frame as a dumpFile class
+        dumpFrame.from_dumpfile(dump_class) = numpy frame of a dumpFile class
+    """
+
+    __slots__ = ("timestep","numberofatoms","lows","highs","tilts","boundingtypes","columns","_atoms")
+
+    def __init__(self,timestep:int,numberofatoms:int,lows,highs,boundingtypes,columns:dict,tilts = None):
+        self.timestep = int(timestep)
+        self.numberofatoms = int(numberofatoms)
+        self.lows = np.asarray(lows,dtype = np.float64)
+        self.highs = np.asarray(highs,dtype = np.float64)
+        self.tilts = None if tilts is None else np.asarray(tilts,dtype = np.float64)
+        self.boundingtypes = tuple(boundingtypes)
+        self.columns = columns
+        self._atoms = None
+
+    #constructing###############################################################
+    @classmethod
+    def from_block(cls,header:dict,block):
+        """
+        builds a frame from a parsed header and the bytes of its atom lines
+        """
+        titles = header["titles"]
+        numberofatoms = header["numberofatoms"]
+
+        with instrumentation.stage("tokenize"):
+            values,integral = kernels.parse_numbers(block,len(titles))
+
+        if len(values) != numberofatoms*len(titles):
+            raise Exception("FILE IMPORT ERROR: check file formatting ")
+
+        values = values.reshape(numberofatoms,len(titles))
+        columns = {}
+        for ind,title in enumerate(titles):
+            #each column gets its own contiguous array
+            columns[title] = values[:,ind].astype(np.int64) if integral[ind] else np.ascontiguousarray(values[:,ind])
+
+        instrumentation.count("rows_parsed",numberofatoms)
+        instrumentation.count("frames_processed")
+
+        return cls(header["timestep"],numberofatoms,header["lows"],header["highs"],header["boundingtypes"],columns,header.get("tilts"))
+
+    @classmethod
+    def read(cls,file_path:str):
+        """
+        reads a single timestep dump
+        """
+        with open(file_path,"rb") as file:
+            header = _read_dump_header(file)
+            if header is None:
+                raise Exception("FILE IMPORT ERROR: check file formatting ")
+            block = _read_line_block(file,header["numberofatoms"])
+
+            if _read_dump_header(file) is not None:
+                raise Exception("FILE IMPORT ERROR: You may not import a multiple timestep file using this method please use read_frames")
+
+        return cls.from_block(header,block)
+
+    @classmethod
+    def from_dumpfile(cls,dump_class):
+        boxbounds = dump_class.sim_boxbounds
+        tilts = boxbounds.loc["tilt",["x","y","z"]].tolist() if "tilt" in boxbounds.index else None
+        columns = {column:dump_class.atoms[column].to_numpy() for column in dump_class.atoms.columns}
+
+        return cls(dump_class.sim_timestep,dump_class.sim_numberofatoms,boxbounds.loc["low",["x","y","z"]].tolist(),boxbounds.loc["high",["x","y","z"]].tolist(),boxbounds.loc["type",["x","y","z"]].tolist(),columns,tilts)
+
+    #properties#################################################################
+    @property
+    def titles(self):
+        return list(self.columns)
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.columns.values())
+
+    def __getitem__(self,column:str)->np.ndarray:
+        return self.columns[column]
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __repr__(self):
+        return "{TimeStep:"+str(self.timestep)+"\nBoundings"+str(list(zip(self.boundingtypes,self.lows.tolist(),self.highs.tolist())))+"\nColumns of atomic data"+str(self.titles)+"}"
+
+    #pandas views################################################################
+    @property
+    def sim_boxbounds(self):
+        from LammpsFileManipulation.dump_file_manipulation import _make_boxbounds
+
+        return _make_boxbounds(self.lows.tolist(),self.highs.tolist(),list(self.boundingtypes),None if self.tilts is None else self.tilts.tolist())
+
+    @property
+    def atoms(self):
+        """
+        the columns as a DataFrame, it is built once and later changes to it are
+        not written back to frame.columns
+        """
+        if self._atoms is None:
+            import pandas as pd
+            self._atoms = pd.DataFrame(self.columns,columns = self.titles)
+
+        return self._atoms
+
+    def to_dumpfile(self):
+        from LammpsFileManipulation.dump_file_manipulation import dumpFile
+
+        return dumpFile(self.timestep,self.numberofatoms,self.sim_boxbounds,self.atoms)
+
+def read_frames(file_path:str,start:int = None,stop:int = None,step:int = None):
+    """
+    streams the frames of a single or multi timestep dump as dumpFrame classes,
+    start/stop/step select frame positions and the atom lines of the skipped
+    frames are never parsed
+
+    proper call:
+    for frame in read_frames(file_path,start = None,stop = None,step = None):
+        ...
+
+    start,stop,step = slice of the frame positions in the file **non negative
+    """
+    #checked here so bad values are raised on the call and not on the first frame
+    if (start is not None and start < 0) or (stop is not None and stop < 0):
+        raise Exception("start and stop must be non negative frame positions")
+    if step is not None and step < 1:
+        raise Exception("step must be a non negative(at least 1) frame stride")
+
+    return _stream_frames(file_path,range(start or 0,stop if stop is not None else 2**62,step or 1))
+
+def _stream_frames(file_path:str,frames:range):
+    with open(file_path,"rb") as file:
+        header = _read_dump_header(file)
+        position = 0
+
+        while header is not None and position < frames.stop:
+            if position in frames:
+                yield dumpFrame.from_block(header,_read_line_block(file,header["numberofatoms"]))
+            else:
+                _skip_line_block(file,header["numberofatoms"])
+
+            header = _read_dump_header(file)
+            position += 1
@@ -0,0 +1,159 @@
+"""
+This is an opt-in instrumentation layer for the hot paths of the package, the
+readers and writers report stage timers and counters here only while a profile
+is open or a hook is registered so it costs close to nothing when unused
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#default imports
+import time
+import threading
+import contextlib
+
+################################################################################
+#Instrumentation state##########################################################
+################################################################################
+
+active = False #checked by the instrumented code before doing any work
+_profiles = [] #open profileReport instances
+_hooks = [] #registered callbacks
+
+_null_stage = contextlib.nullcontext()
+_lock = threading.Lock() #reader threads record into the same profiles
+
+def _update_active():
+    global active
+    active = bool(_profiles or _hooks)
+
+class profileReport:
+    """
+    This holds the measurements collected while a profile is open
+
+    report.timers = {stage:[calls,seconds]}
+    report.counters = {name:total} such as bytes_read, rows_parsed,
+                      frames_processed and copies_made
+    report.peaks = {name:largest value} such as atoms_bytes
+    """
+
+    def __init__(self):
+        self.timers = {}
+        self.counters = {}
+        self.peaks = {}
+
+    def _record(self,kind:str,name:str,value:float):
+        if kind == "time":
+            timer = self.timers.setdefault(name,[0,0.0])
+            timer[0] += 1
+            timer[1] += value
+        elif kind == "count":
+            self.counters[name] = self.counters.get(name,0)+value
+        elif kind == "peak":
+            self.peaks[name] = max(self.peaks.get(name,value),value)
+
+    def summary(self)->str:
+        """
+        readable table of the timers sorted by time spent
+        """
+        lines = []
+        for name,(calls,seconds) in sorted(self.timers.items(),key = lambda item: -item[1][1]):
+            lines.append(name+": "+str(calls)+" calls "+format(seconds,".6f")+" s")
+        for name,value in sorted(self.counters.items()):
+            lines.append(name+": "+str(value))
+        for name,value in sorted(self.peaks.items()):
+            lines.append("peak "+name+": "+str(value))
+
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return "{Timers:"+str(self.timers)+"\nCounters:"+str(self.counters)+"\nPeaks:"+str(self.peaks)+"}"
+
+################################################################################
+#Public interface###############################################################
+################################################################################
+
+@contextlib.contextmanager
+def profile():
+    """
+    collects the stage timers and counters of everything run inside it
+
+    proper call:
+    with profile() as report:
+        dump_files = batch_import_files(file_paths)
+    print(report.summary())
+    """
+    report = profileReport()
+    _profiles.append(report)
+    _update_active()
+
+    try:
+        yield report
+    finally:
+        _profiles.remove(report)
+        _update_active()
+
+def register_hook(callback):
+    """
+    registers callback(kind,name,value) that is called for every measurement
+    with kind "time"(seconds), "count" or "peak" so the metrics can be
+    forwarded to external monitoring
+    """
+    _hooks.append(callback)
+    _update_active()
+
+def unregister_hook(callback):
+    _hooks.remove(callback)
+    _update_active()
+
+def emit(kind:str,name:str,value:float):
+    """
+    sends one measurement to the open profiles and the hooks, it is only
+    called while something is listening so the lock costs nothing otherwise
+    """
+    with _lock:
+        for report in _profiles:
+            report._record(kind,name,value)
+    for callback in _hooks:
+        callback(kind,name,value)
+
+def count(name:str,value:float = 1):
+    if active:
+        emit("count",name,value)
+
+def peak(name:str,value:float):
+    if active:
+        emit("peak",name,value)
+
+class _stageTimer:
+    __slots__ = ("name","start")
+
+    def __init__(self,name:str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self,*exc_info):
+        emit("time",self.name,time.perf_counter()-self.start)
+        return False
+
+def stage(name:str):
+    """
+    times the block under name, a shared do nothing context is returned when
+    nothing is listening
+
+    with stage("read_csv"):
+        ...
+    """
+    if active:
+        return _stageTimer(name)
+    return _null_stage
@@ -0,0 +1,285 @@
+"""
+This is the set of hot loop kernels used by the readers and the geometry code,
+every kernel has a pure NumPy version and a Numba compiled version that is used
+automatically when numba is installed(pip install LammpsFileManipulation[jit])
+
+both backends give the same results, the backend can be forced with the
+LAMMPSFILEMANIPULATION_BACKEND environment variable("numpy" or "numba") or
+kernels.set_backend(name)
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#default imports
+import os
+
+#non-default imports
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+################################################################################
+#Backend selection##############################################################
+################################################################################
+
+def available_backends()->list:
+    return ["numpy"]+(["numba"] if numba is not None else [])
+
+def set_backend(name:str):
+    """
+    selects the kernels used from now on("numpy" or "numba")
+    """
+    global backend
+    if name not in available_backends():
+        raise Exception("Backend "+str(name)+" is not available "+str(available_backends()))
+    backend = name
+
+backend = os.environ.get("LAMMPSFILEMANIPULATION_BACKEND","numba" if numba is not None else "numpy")
+if backend not in available_backends():
+    backend = "numpy"
+
+def _jit(function):
+    return numba.njit(cache = True,nogil = True)(function) if numba is not None else function
+
+################################################################################
+#Tokenizing#####################################################################
+################################################################################
+
+#exact powers of ten, a mantissa below 2**53 times(or divided by) one of these is
+#rounded once so it matches a correctly rounded string to float conversion
+_powers_of_ten = np.array([10.0**exponent for exponent in range(23)])
+
+_whitespace = np.zeros(256,dtype = bool)
+_whitespace[[9,10,11,12,13,32]] = True
+_not_integer = np.zeros(256,dtype = bool)
+_not_integer[[ord(character) for character in ".eEnNiI"]] = True
+
+def _parse_numbers_loop(data,ncolumns,powers):
+    """
+    single pass tokenizer, returns the values, which columns only held integers
+    and whether every token could be converted exactly(otherwise the caller
+    falls back to the numpy version)
+    """
+    n = len(data)
+    count = 0
+    inside = False
+    for i in range(n):
+        byte = data[i]
+        if byte == 32 or byte == 9 or byte == 10 or byte == 13 or byte == 11 or byte == 12:
+            inside = False
+        elif not inside:
+            count += 1
+            inside = True
+
+    values = np.empty(count,dtype = np.float64)
+    integral = np.ones(ncolumns,dtype = np.bool_)
+    if ncolumns == 0:
+        return values,integral,count == 0
+
+    token = 0
+    i = 0
+    while i < n:
+        byte = data[i]
+        if byte == 32 or byte == 9 or byte == 10 or byte == 13 or byte == 11 or byte == 12:
+            i += 1
+            continue
+
+        negative = False
+        if byte == 45 or byte == 43:#- +
+            negative = byte == 45
+            i += 1
+
+        mantissa = 0
+        exponent = 0
+        digits = 0
+        exact = True
+        while i < n and 48 <= data[i] <= 57:
+            if mantissa < 900719925474098:
+                mantissa = mantissa*10+(int(data[i])-48)
+            else:
+                exact = False
+            digits += 1
+            i += 1
+
+        if i < n and data[i] == 46:#.
+            integral[token % ncolumns] = False
+            i += 1
+            while i < n and 48 <= data[i] <= 57:
+                if mantissa < 900719925474098:
+                    mantissa = mantissa*10+(int(data[i])-48)
+                    exponent -= 1
+                elif data[i] != 48:
+                    exact = False
+                digits += 1
+                i += 1
+
+        if i < n and (data[i] == 101 or data[i] == 69):#e E
+            integral[token % ncolumns] = False
+            i += 1
+            exponent_negative = False
+            if i < n and (data[i] == 45 or data[i] == 43):
+                exponent_negative = data[i] == 45
+                i += 1
+            written = 0
+            exponent_digits = 0
+            while i < n and 48 <= data[i] <= 57:
+                if written < 10000:
+                    written = written*10+(int(data[i])-48)
+                exponent_digits += 1
+                i += 1
+            if exponent_digits == 0:
+                return values,integral,False
+            exponent += -written if exponent_negative else written
+
+        #anything but whitespace after the number(nan, inf, text) is left to numpy
+        if digits == 0 or (i < n and not (data[i] == 32 or data[i] == 9 or data[i] == 10 or data[i] == 13 or data[i] == 11 or data[i] == 12)):
+            return values,integral,False
+
+        if not exact or exponent < -22 or exponent > 22:
+            return values,integral,False
+
+        value = float(mantissa)
+        if exponent < 0:
+            value = value/powers[-exponent]
+        elif exponent > 0:
+            value = value*powers[exponent]
+        values[token] = -value if negative else value
+        token += 1
+
+    return values,integral,True
+
+_parse_numbers_numba = _jit(_parse_numbers_loop)
+
+def _integral_columns(data:np.ndarray,ncolumns:int)->np.ndarray:
+    """
+    which columns only hold integer tokens, from the byte positions of '.', 'e'
+    nan and inf mapped to their token
+    """
+    integral = np.ones(ncolumns,dtype = bool)
+    flagged = np.flatnonzero(_not_integer[data])
+    if len(flagged) == 0:
+        return integral
+
+    space = _whitespace[data]
+    starts = ~space
+    starts[1:] &= space[:-1]
+    token = np.cumsum(starts)[flagged]-1
+    integral[np.unique(token % ncolumns)] = False
+
+    return integral
+
+def parse_numbers(data,ncolumns:int):
+    """
+    converts whitespace separated numbers(bytes) into a float array and reports
+    which of the ncolumns columns only held integers
+
+    proper call:
+    values,integral = parse_numbers(data,ncolumns)
+    """
+    array = np.frombuffer(data,dtype = np.uint8)
+
+    if backend == "numba":
+        values,integral,exact = _parse_numbers_numba(array,ncolumns,_powers_of_ten)
+        if exact:
+            return values,integral
+
+    values = np.fromstring(bytes(data),dtype = np.float64,sep = " ")
+    return values,_integral_columns(array,ncolumns)
+
+################################################################################
+#Geometry#######################################################################
+################################################################################
+
+def _minimum_image_loop(delta,matrix,inverse,periodic):
+    result = np.empty_like(delta)
+    fractional = np.empty(3)
+    for row in range(delta.shape[0]):
+        for axis in range(3):
+            fractional[axis] = delta[row,0]*inverse[0,axis]+delta[row,1]*inverse[1,axis]+delta[row,2]*inverse[2,axis]
+            if periodic[axis]:
+                fractional[axis] -= np.rint(fractional[axis])
+        for axis in range(3):
+            result[row,axis] = fractional[0]*matrix[0,axis]+fractional[1]*matrix[1,axis]+fractional[2]*matrix[2,axis]
+
+    return result
+
+_minimum_image_numba = _jit(_minimum_image_loop)
+
+def minimum_image(delta:np.ndarray,matrix:np.ndarray,inverse:np.ndarray,periodic:np.ndarray)->np.ndarray:
+    """
+    minimum image of displacement vectors(n x 3) for the box whose rows are the
+    box vectors(matrix) along the periodic axes
+    """
+    if backend == "numba":
+        return _minimum_image_numba(np.ascontiguousarray(delta,dtype = np.float64),matrix,inverse,periodic)
+
+    fractional = delta @ inverse
+    fractional[:,periodic] -= np.rint(fractional[:,periodic])
+
+    return fractional @ matrix
+
+def _cell_sort_loop(flat,ncells):
+    counts = np.zeros(ncells,dtype = np.int64)
+    for i in range(len(flat)):
+        counts[flat[i]] += 1
+
+    starts = np.zeros(ncells,dtype = np.int64)
+    for cell in range(1,ncells):
+        starts[cell] = starts[cell-1]+counts[cell-1]
+
+    filled = starts.copy()
+    order = np.empty(len(flat),dtype = np.int64)
+    for i in range(len(flat)):
+        order[filled[flat[i]]] = i
+        filled[flat[i]] += 1
+
+    return order,starts,counts
+
+_cell_sort_numba = _jit(_cell_sort_loop)
+
+def cell_sort(flat:np.ndarray,ncells:int):
+    """
+    stable counting sort of atoms by flat cell index
+
+    proper call:
+    order,starts,counts = cell_sort(flat,ncells)
+
+    the atoms of cell c are order[starts[c]:starts[c]+counts[c]]
+    """
+    if backend == "numba":
+        return _cell_sort_numba(flat.astype(np.int64),int(ncells))
+
+    order = np.argsort(flat,kind = "stable")
+    counts = np.bincount(flat,minlength = ncells)
+    starts = np.concatenate(([0],np.cumsum(counts)[:-1]))
+
+    return order,starts,counts
+
+def _histogram_loop(flat,weights,nbins):
+    totals = np.zeros(nbins,dtype = np.float64)
+    for i in range(len(flat)):
+        totals[flat[i]] += weights[i]
+    return totals
+
+_histogram_numba = _jit(_histogram_loop)
+
+def histogram(flat:np.ndarray,nbins:int,weights:np.ndarray = None)->np.ndarray:
+    """
+    np.bincount(flat,weights,minlength = nbins) as float sums
+    """
+    if backend == "numba":
+        weights = np.ones(len(flat)) if weights is None else np.ascontiguousarray(weights,dtype = np.float64)
+        return _histogram_numba(flat.astype(np.int64),weights,int(nbins))
+
+    return np.bincount(flat,weights = weights,minlength = nbins).astype(np.float64)
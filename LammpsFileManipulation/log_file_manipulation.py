@@ -0,0 +1,303 @@
+"""
+This is a reader for lammps log files(log.lammps), the file is streamed in
+large buffers and every thermo block(one per run) is parsed straight into a
+typed DataFrame so multi GB logs are read with bounded memory, the thermo data
+can then be joined on timestep with dumpFile frames
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#default imports
+import io
+import re
+
+#non-default imports
+import pandas as pd
+import numpy as np
+
+#package imports
+from LammpsFileManipulation import instrumentation
+
+################################################################################
+#Parsing########################################################################
+################################################################################
+
+step_column = "Step"
+
+#a line of column names that includes Step(thermo_style one/custom headers)
+_header = re.compile(rb"^[ \t]*((?:[A-Za-z_][^\s=,]*[ \t]+)*Step(?:[ \t]+[A-Za-z_][^\s=,]*)*)[ \t]*\r?$",re.M)
+#lines that close a thermo block
+_block_ends = [b"Loop time of",b"ERROR"]
+
+#bytes that can not be part of a thermo value line(letters other than e, nan and inf)
+_text_bytes = np.zeros(256,dtype = bool)
+_text_bytes[[ord(letter) for letter in "bcdghjklmopqrstuvwxyzBCDGHJKLMOPQRSTUVWXYZ_:=()"]] = True
+
+def _find_block_end(text:bytes,position:int):
+    """
+    start and end of the first line after position that closes a thermo block,
+    found with bytes.find so the thermo values are not scanned line by line
+    """
+    found = None
+    for marker in _block_ends:
+        start = text.find(marker,position)
+        while start >= 0:
+            line_start = text.rfind(b"\n",0,start)+1
+            if not text[line_start:start].strip():
+                break
+            start = text.find(marker,start+1)
+
+        if start >= 0 and (found is None or line_start < found[0]):
+            end = text.find(b"\n",start)
+            found = (line_start,len(text) if end < 0 else end+1)
+
+    return found
+
+def _numeric_lines(data:bytes):
+    """
+    drops the lines of a thermo block that are not values(warnings, fix output)
+    using a byte table over the whole block, returns the kept bytes and the
+    dropped lines
+    """
+    array = np.frombuffer(data,dtype = np.uint8)
+    text = np.flatnonzero(_text_bytes[array])
+    if len(text) == 0:
+        return data,[]
+
+    newlines = np.flatnonzero(array == 10)
+    lines = np.unique(np.searchsorted(newlines,text))#line number of each text byte
+    starts = np.where(lines > 0,newlines[np.maximum(lines-1,0)]+1,0)
+    ends = np.where(lines < len(newlines),newlines[np.minimum(lines,len(newlines)-1)]+1,len(data))
+
+    kept = []
+    dropped = []
+    previous = 0
+    for start,end in zip(starts.tolist(),ends.tolist()):
+        kept.append(data[previous:start])
+        dropped.append(data[start:end].decode(errors = "replace").strip())
+        previous = end
+    kept.append(data[previous:])
+
+    return b"".join(kept),dropped
+
+def _partial_last_line(data:bytes,titles:list):
+    """
+    splits off the last line when it has fewer values than titles(a line cut
+    short when a run crashed or the log is still being written)
+    """
+    body = data.rstrip()
+    start = body.rfind(b"\n")+1
+    if start < len(body) and len(body[start:].split()) < len(titles):
+        return data[:start],body[start:].decode(errors = "replace").strip()
+
+    return data,None
+
+def _parse_values(data:bytes,titles:list,final:bool = False)->pd.DataFrame:
+    """
+    typed DataFrame of the numeric lines of a piece of a thermo block and the
+    WARNING lines found in it, final = True for the last piece of a run whose
+    last line is dropped(and reported) when it is only partly written, nan
+    values(a run that blew up) are kept
+    """
+    data,dropped = _numeric_lines(data)
+    warnings = [line for line in dropped if line.startswith("WARNING")]
+
+    if final:
+        data,partial = _partial_last_line(data,titles)
+        if partial is not None:
+            warnings.append("Partly written thermo line dropped: "+partial)
+
+    if not data.strip():
+        return None,warnings
+
+    with instrumentation.stage("read_csv"):
+        values = pd.read_csv(io.BytesIO(data),sep = r"\s+",header = None,names = titles,on_bad_lines = "skip")
+
+    return values,warnings
+
+def _finish_run(pieces:list,titles:list)->pd.DataFrame:
+    pieces = [piece for piece in pieces if piece is not None]
+    if not pieces:
+        return pd.DataFrame(columns = titles)
+
+    run = pd.concat(pieces,ignore_index = True)
+    run[step_column] = run[step_column].astype(np.int64)
+    instrumentation.count("thermo_rows",len(run))
+
+    return run
+
+def _read_runs(file_path:str,buffer_size:int):
+    """
+    streams a log file and returns the list of thermo DataFrames(one per run)
+    and the warning lines found in the thermo blocks
+    """
+    runs = []
+    warnings = []
+    titles = None
+    pieces = []
+    leftover = b""
+
+    with open(file_path,"rb") as file:
+        while True:
+            chunk = file.read(buffer_size)
+            instrumentation.count("bytes_read",len(chunk))
+
+            if chunk:
+                #only complete lines are searched, the rest waits for the next chunk
+                text = leftover+chunk
+                cut = text.rfind(b"\n")+1
+                if cut == 0:
+                    leftover = text
+                    continue
+                text,leftover = text[:cut],text[cut:]
+            else:
+                text,leftover = leftover,b""
+
+            position = 0
+            while True:
+                if titles is None:
+                    match = _header.search(text,position)
+                    if match is None:
+                        break
+                    titles = match.group(1).decode().split()
+                    pieces = []
+                    position = match.end()
+                    continue
+
+                end = _find_block_end(text,position)
+                stop = len(text) if end is None else end[0]
+                if end is None and chunk:
+                    #the last line waits for the next chunk so the final piece of a run always holds it
+                    stop = max(position,text.rfind(b"\n",position,len(text)-1)+1)
+                    leftover = text[stop:]+leftover
+
+                values,found = _parse_values(text[position:stop],titles,end is not None or not chunk)
+                pieces.append(values)
+                warnings += found
+
+                if end is None:
+                    break
+
+                runs.append(_finish_run(pieces,titles))
+                titles = None
+                position = end[1]
+
+            if not chunk:
+                break
+
+    if titles is not None:
+        #the log ended inside a run
+        runs.append(_finish_run(pieces,titles))
+
+    return runs,warnings
+
+################################################################################
+#Log file class#################################################################
+################################################################################
+
+class logFile:
+    """
+    This holds the thermo output of a lammps log file, every run(each run or
+    minimize command) keeps its own columns as thermo_style can change between
+    runs
+
+    proper call:
+    log = logFile.lammps_log(file_path,buffer_size = 2**24)
+
+    valid property calls:
+        log.runs = thermo data of each run[list of pd.DataFrame]
+        log.warnings = WARNING lines found inside the thermo blocks[list]
+        log.numberofruns = number of runs[int]
+        log.thermo = every run concatenated with a "run" column, columns missing
+                     in a run are NaN[pd.DataFrame]
+
+    method calls:
+        log.timestep_table(columns = None) = thermo indexed by timestep, the
+                     repeated step between consecutive runs keeps the later run
+        log.join_dumps(dump_files,columns = None,how = "exact") = thermo values
+                     at the timesteps of a dictionary of dumpFile classes
+    """
+
+    def __init__(self,runs:list,warnings:list = None,file_path:str = None):
+        self.runs = runs
+        self.warnings = warnings if warnings is not None else []
+        self.file_path = file_path
+
+    @classmethod
+    def lammps_log(cls,file_path:str,buffer_size:int = 2**24):
+        """
+        reads the thermo blocks of a log file buffer_size bytes at a time
+
+        a thermo block starts at the column header line holding "Step" and ends
+        at "Loop time of", an ERROR line or the end of the file, lines inside it
+        that are not numbers(warnings) are skipped
+        """
+        with instrumentation.stage("lammps_log"):
+            runs,warnings = _read_runs(file_path,buffer_size)
+
+        return cls(runs,warnings,file_path)
+
+    @property
+    def numberofruns(self):
+        return len(self.runs)
+
+    @property
+    def thermo(self):
+        if not self.runs:
+            return pd.DataFrame(columns = [step_column,"run"])
+
+        return pd.concat([run.assign(run = ind) for ind,run in enumerate(self.runs)],ignore_index = True)
+
+    def timestep_table(self,columns:list = None)->pd.DataFrame:
+        """
+        thermo indexed by timestep, the step repeated at the end of one run and
+        the start of the next is kept from the later run
+        """
+        thermo = self.thermo
+        if columns is not None:
+            thermo = thermo[[step_column]+[column for column in columns if column != step_column]]
+
+        thermo = thermo.drop_duplicates(step_column,keep = "last")
+
+        return thermo.set_index(step_column).sort_index()
+
+    def join_dumps(self,dump_files:dict,columns:list = None,how:str = "exact")->pd.DataFrame:
+        """
+        thermo values at the frames of a dictionary {id:dumpFile}(for example from
+        multiple_timestep_singular_file_dumps or batch_import_files)
+
+        how = "exact" only matching steps(NaN otherwise), "previous" the last
+              thermo output at or before the frame, "nearest" the closest output
+
+        returns a DataFrame indexed by the dictionary ids with a timestep column
+        and the thermo columns
+        """
+        if how not in ["exact","previous","nearest"]:
+            raise Exception('how is not recognized ["exact","previous","nearest"]')
+
+        table = self.timestep_table(columns)
+        frames = pd.DataFrame({"timestep":[int(dump_class.sim_timestep) for dump_class in dump_files.values()]},index = pd.Index(list(dump_files.keys()),name = "id"))
+
+        if how == "exact":
+            return frames.join(table,on = "timestep")
+
+        table = table.reset_index().rename(columns = {step_column:"timestep"})
+        order = np.argsort(frames["timestep"].to_numpy(),kind = "stable")
+        ordered = frames.iloc[order].reset_index()
+        joined = pd.merge_asof(ordered,table,on = "timestep",direction = "backward" if how == "previous" else "nearest")
+
+        return joined.set_index("id").loc[frames.index]
+
+def read_log(file_path:str,buffer_size:int = 2**24)->logFile:
+    """
+    shortcut for logFile.lammps_log
+    """
+    return logFile.lammps_log(file_path,buffer_size)
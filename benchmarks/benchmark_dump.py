@@ -0,0 +1,419 @@
+"""
+This is a reproducible benchmark suite for the dump file functions, it writes
+synthetic lammps dumps locally and times/measures the peak memory of the public
+entry points across system sizes
+
+running:
+    python benchmarks/benchmark_dump.py run --atoms 10000 100000 --output bench.json
+comparing two runs(exit code 1 when something regressed):
+    python benchmarks/benchmark_dump.py compare old.json new.json --threshold 0.1
+checking the kernel backends against each other(exit code 1 when they differ):
+    python benchmarks/benchmark_dump.py backends --atoms 100000
+checking the MPI helpers against a serial read(exit code 1 when they differ):
+    mpirun -n 4 python benchmarks/benchmark_dump.py mpi --atoms 100000 --frames 8
+checking the frame cache under random access with read ahead(exit code 1 on errors):
+    python benchmarks/benchmark_dump.py cache --atoms 2000 --frames 40
+
+###############################################################################
+###############################################################################
+author: Aaron Schwan
+email: schwanaaron@gmail.com
+github: https://github.com/AaronSchwan
+###############################################################################
+###############################################################################
+
+"""
+
+
+#default imports
+import sys
+import os
+import gc
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import tracemalloc
+
+#non-default imports
+import pandas as pd
+import numpy as np
+
+#package imports
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import LammpsFileManipulation.dump_file_manipulation as dfm
+from LammpsFileManipulation import kernels
+
+################################################################################
+#Synthetic dump files###########################################################
+################################################################################
+
+box_types = {"periodic":"pp pp pp","fixed":"ff ff ff","triclinic":"xy xz yz pp pp pp"}
+
+def write_synthetic_dump(file_path:str,numberofatoms:int,numberofcolumns:int = 5,timesteps:list = [0],box:str = "periodic",seed:int = 0):
+    """
+    writes a dump with numberofatoms random atoms in a 100 length box, the
+    columns are id type x y z followed by numberofcolumns-5 extra float columns
+
+    box = "periodic", "fixed" or "triclinic"
+    """
+    rng = np.random.default_rng(seed)
+    extra = max(numberofcolumns-5,0)
+    titles = ["id","type","x","y","z"]+["c_extra"+str(i) for i in range(extra)]
+    length = 100.0
+
+    with open(file_path,"w") as file:
+        for timestep in timesteps:
+            file.write("ITEM: TIMESTEP\n"+str(timestep)+"\n")
+            file.write("ITEM: NUMBER OF ATOMS\n"+str(numberofatoms)+"\n")
+            file.write("ITEM: BOX BOUNDS "+box_types[box]+"\n")
+            for i in range(3):
+                file.write("0.0 "+str(length)+(" 0.0" if box == "triclinic" else "")+"\n")
+            file.write("ITEM: ATOMS "+" ".join(titles)+"\n")
+
+            atoms = pd.DataFrame(rng.uniform(0.0,length,(numberofatoms,3)),columns = ["x","y","z"])
+            atoms.insert(0,"type",rng.integers(1,3,numberofatoms))
+            atoms.insert(0,"id",rng.permutation(numberofatoms)+1)
+            for title in titles[5:]:
+                atoms[title] = rng.normal(size = numberofatoms)
+
+            atoms.to_csv(file,sep = " ",header = False,index = False,float_format = "%.6f")
+
+################################################################################
+#Running benchmarks#############################################################
+################################################################################
+
+def measure(function,repeats:int = 3):
+    """
+    returns the best time of repeats calls and the peak traced memory of one call
+    """
+    best = float("inf")
+    for repeat in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        best = min(best,time.perf_counter()-start)
+
+    gc.collect()
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return best,peak
+
+def benchmark_cases(directory:str,numberofatoms:int,numberofcolumns:int,numberofframes:int,box:str):
+    """
+    builds the synthetic files for one size and returns {name:function}
+    """
+    single = os.path.join(directory,"single.dump")
+    multi = os.path.join(directory,"multi.dump")
+    batch = [os.path.join(directory,"batch."+str(i)+".dump") for i in range(numberofframes)]
+    written = os.path.join(directory,"written.dump")
+
+    write_synthetic_dump(single,numberofatoms,numberofcolumns,[0],box)
+    write_synthetic_dump(multi,numberofatoms,numberofcolumns,list(range(numberofframes)),box)
+    for timestep,file_path in enumerate(batch):
+        write_synthetic_dump(file_path,numberofatoms,numberofcolumns,[timestep],box,seed = timestep)
+
+    #the streaming reader also handles the triclinic box header
+    dump_class = dfm.multiple_timestep_singular_file_dumps(single)[0]
+    other = dfm.multiple_timestep_singular_file_dumps(single)[0]
+    half = 50.0
+
+    return {
+        "lammps_dump":lambda: dfm.dumpFile.lammps_dump(single),
+        "multiple_timestep_singular_file_dumps":lambda: dfm.multiple_timestep_singular_file_dumps(multi),
+        "batch_import_files":lambda: dfm.batch_import_files(batch),
+        "write_dump_file":lambda: dump_class.write_dump_file(written,"w"),
+        "cart_slice":lambda: dfm.cart_slice(dump_class,0.0,half,0.0,half,0.0,half),
+        "bin_count":lambda: dfm.bin_count(dump_class,"x",10),
+        "__eq__":lambda: dump_class == other,
+    }
+
+def run(atom_counts:list,numberofcolumns:int,numberofframes:int,box:str,repeats:int,output:str):
+    results = []
+
+    for numberofatoms in atom_counts:
+        directory = tempfile.mkdtemp(prefix = "lfm_bench_")
+        try:
+            cases = benchmark_cases(directory,numberofatoms,numberofcolumns,numberofframes,box)
+
+            for name,function in cases.items():
+                result = {"name":name,"atoms":numberofatoms,"columns":numberofcolumns,"frames":numberofframes,"box":box}
+                try:
+                    result["seconds"],result["peak_bytes"] = measure(function,repeats)
+                except Exception as error:
+                    result["error"] = repr(error)
+
+                results.append(result)
+                print(name,numberofatoms,result.get("seconds",result.get("error")))
+
+        finally:
+            shutil.rmtree(directory,ignore_errors = True)
+
+    meta = {"python":platform.python_version(),"numpy":np.__version__,"pandas":pd.__version__,"platform":platform.platform(),"created":time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+    with open(output,"w") as file:
+        json.dump({"meta":meta,"results":results},file,indent = 1)
+
+def compare(old_path:str,new_path:str,threshold:float)->int:
+    """
+    prints the ratio new/old for every matching benchmark and flags the ones
+    slower or using more memory than threshold(proportion) as regressions
+
+    returns the number of regressions
+    """
+    def keyed(file_path):
+        with open(file_path,"r") as file:
+            results = json.load(file)["results"]
+        return {(r["name"],r["atoms"],r["columns"],r["frames"],r["box"]):r for r in results}
+
+    old = keyed(old_path)
+    new = keyed(new_path)
+    regressions = 0
+
+    for key in sorted(set(old) & set(new),key = str):
+        if "seconds" not in old[key]:
+            continue
+
+        if "seconds" not in new[key]:
+            #a benchmark that used to run and now fails is a regression
+            print(key[0],key[1],new[key]["error"],"REGRESSION")
+            regressions += 1
+            continue
+
+        time_ratio = new[key]["seconds"]/max(old[key]["seconds"],1e-12)
+        memory_ratio = new[key]["peak_bytes"]/max(old[key]["peak_bytes"],1)
+        flag = ""
+        if time_ratio > 1+threshold or memory_ratio > 1+threshold:
+            flag = "REGRESSION"
+            regressions += 1
+
+        print(key[0],key[1],"time x"+format(time_ratio,".2f"),"memory x"+format(memory_ratio,".2f"),flag)
+
+    return regressions
+
+def kernel_cases(numberofatoms:int,seed:int = 0)->dict:
+    """
+    {name:(function,arguments)} of every kernel on random inputs of one size
+    """
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size = (numberofatoms,3))*10.0
+    text = pd.DataFrame({"id":np.arange(1,numberofatoms+1),"type":rng.integers(1,3,numberofatoms),"x":values[:,0],"y":values[:,1],"z":values[:,2]}).to_csv(sep = " ",header = False,index = False,float_format = "%.6f").encode()
+    matrix = np.array([[20.0,0.0,0.0],[3.0,20.0,0.0],[1.0,-2.0,15.0]])
+    flat = rng.integers(0,1000,numberofatoms)
+
+    return {
+        "parse_numbers":(kernels.parse_numbers,(text,5)),
+        "minimum_image":(kernels.minimum_image,(values*5.0,matrix,np.linalg.inv(matrix),np.array([True,True,False]))),
+        "cell_sort":(kernels.cell_sort,(flat,1000)),
+        "histogram":(kernels.histogram,(flat,1000,rng.random(numberofatoms))),
+    }
+
+def backends(atom_counts:list,repeats:int,tolerance:float)->int:
+    """
+    runs every kernel with every available backend, prints the best times and
+    the largest difference from the numpy backend
+
+    returns the number of kernels whose results differ by more than tolerance
+    """
+    mismatches = 0
+    selected = kernels.backend
+
+    try:
+        for numberofatoms in atom_counts:
+            for name,(function,arguments) in kernel_cases(numberofatoms).items():
+                reference = None
+                for backend in kernels.available_backends():
+                    kernels.set_backend(backend)
+                    function(*arguments)#compiling outside of the timing
+                    seconds,peak = measure(lambda: function(*arguments),repeats)
+                    result = function(*arguments)
+                    result = result if isinstance(result,tuple) else (result,)
+
+                    if reference is None:
+                        reference = result
+                        difference = 0.0
+                    else:
+                        difference = max(float(np.max(np.abs(np.asarray(new,dtype = float)-np.asarray(old,dtype = float)),initial = 0.0)) for new,old in zip(result,reference))
+
+                    flag = ""
+                    if difference > tolerance:
+                        flag = "MISMATCH"
+                        mismatches += 1
+
+                    print(name,numberofatoms,backend,format(seconds,".6f"),"max difference "+format(difference,".3g"),flag)
+    finally:
+        kernels.set_backend(selected)
+
+    return mismatches
+
+def mpi_check(numberofatoms:int,numberofframes:int)->int:
+    """
+    reads a synthetic trajectory with the MPI helpers(frames split over the
+    ranks, one frame split by byte ranges) and compares the reduced results
+    with a serial read on rank 0
+
+    returns the number of results that differ(on every rank)
+    """
+    from LammpsFileManipulation import dump_file_mpi as mpi
+    from LammpsFileManipulation.dump_file_binning import fieldBinner,field_bin
+
+    comm = mpi._communicator()
+    rank,size = mpi.rank_and_size(comm)
+
+    directory = mpi._bcast(tempfile.mkdtemp() if rank == 0 else None,comm)
+    multi = os.path.join(directory,"multi.dump")
+    if rank == 0:
+        write_synthetic_dump(multi,numberofatoms,6,list(range(numberofframes)))
+    if comm is not None:
+        comm.Barrier()
+
+    start = time.perf_counter()
+    binner = fieldBinner(bins = 20,axes = ["z"],columns = ["c_extra0"])
+
+    def analyze(dump_class):
+        binner.add(dump_class)
+        return float(dump_class.atoms["x"].mean())
+
+    means = mpi.mpi_map(analyze,mpi.mpi_frames(multi,comm),comm)
+    merged = mpi.mpi_field_bin(binner,comm)
+    part = mpi.mpi_read_frame(multi,comm,frame = numberofframes-1)
+    totals = mpi.mpi_reduce(np.array([len(part.atoms),part.atoms["id"].sum()],dtype = np.int64),"sum",comm)
+    seconds = time.perf_counter()-start
+
+    mismatches = 0
+    if rank == 0:
+        frames = list(dfm.multiple_timestep_singular_file_dumps(multi).values())
+        reference = field_bin(frames,bins = 20,axes = ["z"],columns = ["c_extra0"])
+        result = merged.result()
+
+        checks = {
+            "frame means":np.allclose(list(means.values()),[float(frame.atoms["x"].mean()) for frame in frames]),
+            "binned counts":np.allclose(result["counts"],reference["counts"]),
+            "binned means":np.allclose(result["means"]["c_extra0"],reference["means"]["c_extra0"],equal_nan = True),
+            "split frame":totals.tolist() == [len(frames[-1].atoms),int(frames[-1].atoms["id"].sum())],
+        }
+        for name,passed in checks.items():
+            print(name,size,"ranks","ok" if passed else "MISMATCH")
+        print("mpi total",format(seconds,".6f"))
+
+        mismatches = sum(not passed for passed in checks.values())
+        shutil.rmtree(directory)
+
+    return mpi._bcast(mismatches,comm)
+
+def cache_check(numberofatoms:int,numberofframes:int,accesses:int = 400,seed:int = 0)->int:
+    """
+    scans a synthetic trajectory through frameCache with read ahead, jumping to
+    a random frame on every third access, from the dump file and from an open
+    compressedTrajectory(one shared file handle) and compares every frame with
+    a direct read, then checks that frames larger than the budget are still
+    taken from the read ahead
+
+    returns the number of frames that raised or differ
+    """
+    from LammpsFileManipulation.dump_file_cache import frameCache
+    from LammpsFileManipulation.dump_file_codec import write_compressed_trajectory,compressedTrajectory
+
+    directory = tempfile.mkdtemp()
+    multi = os.path.join(directory,"multi.dump")
+    compressed = os.path.join(directory,"multi.lfmz")
+    write_synthetic_dump(multi,numberofatoms,6,list(range(numberofframes)),seed = seed)
+    write_compressed_trajectory(dfm.multiple_timestep_singular_file_dumps(multi),compressed)
+
+    rng = np.random.default_rng(seed)
+    order = []
+    position = 0
+    for access in range(accesses):
+        position = int(rng.integers(numberofframes)) if access % 3 == 2 else min(position+1,numberofframes-1)
+        order.append(position)
+
+    def by_id(dump_class):
+        atoms = dump_class.atoms
+        return atoms["x"].to_numpy()[np.argsort(atoms["id"].to_numpy())]
+
+    failures = 0
+    with compressedTrajectory(compressed) as reader,compressedTrajectory(compressed) as direct:
+        expected = [by_id(direct.frame(position)) for position in range(numberofframes)]
+        budget = 2*int(direct.frame(0).atoms.memory_usage(index = True,deep = True).sum())
+
+        for name,source in [("dump file",multi),("compressed reader",reader)]:
+            errors = 0
+            mismatches = 0
+            with frameCache(source,max_bytes = budget,prefetch = 3) as cache:
+                for position in order:
+                    try:
+                        x = by_id(cache.frame(position))
+                    except Exception:
+                        errors += 1
+                        continue
+                    if not np.allclose(x,expected[position],atol = 1e-3):
+                        mismatches += 1
+                print(name,"errors",errors,"mismatches",mismatches,cache.stats)
+            failures += errors+mismatches
+
+        with frameCache(reader,max_bytes = 0,prefetch = 2) as cache:
+            for dump_class in cache:
+                pass
+            unused = cache.stats["misses"] > 2
+            print("over budget read ahead","MISMATCH" if unused else "ok",cache.stats)
+            failures += int(unused)
+
+    shutil.rmtree(directory)
+
+    return failures
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "LammpsFileManipulation benchmarks")
+    commands = parser.add_subparsers(dest = "command",required = True)
+
+    run_parser = commands.add_parser("run")
+    run_parser.add_argument("--atoms",type = int,nargs = "+",default = [1000,10000,100000])
+    run_parser.add_argument("--columns",type = int,default = 6)
+    run_parser.add_argument("--frames",type = int,default = 5)
+    run_parser.add_argument("--box",choices = sorted(box_types),default = "periodic")
+    run_parser.add_argument("--repeats",type = int,default = 3)
+    run_parser.add_argument("--output",default = "bench_output.json")
+
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold",type = float,default = 0.1)
+
+    backends_parser = commands.add_parser("backends")
+    backends_parser.add_argument("--atoms",type = int,nargs = "+",default = [1000,100000])
+    backends_parser.add_argument("--repeats",type = int,default = 3)
+    backends_parser.add_argument("--tolerance",type = float,default = 1e-9)
+
+    mpi_parser = commands.add_parser("mpi")
+    mpi_parser.add_argument("--atoms",type = int,default = 100000)
+    mpi_parser.add_argument("--frames",type = int,default = 8)
+
+    cache_parser = commands.add_parser("cache")
+    cache_parser.add_argument("--atoms",type = int,default = 2000)
+    cache_parser.add_argument("--frames",type = int,default = 40)
+    cache_parser.add_argument("--accesses",type = int,default = 400)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "cache":
+        return 1 if cache_check(args.atoms,args.frames,args.accesses) else 0
+
+    if args.command == "mpi":
+        return 1 if mpi_check(args.atoms,args.frames) else 0
+
+    if args.command == "run":
+        run(args.atoms,args.columns,args.frames,args.box,args.repeats,args.output)
+        return 0
+
+    if args.command == "backends":
+        return 1 if backends(args.atoms,args.repeats,args.tolerance) else 0
+
+    return 1 if compare(args.old,args.new,args.threshold) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -25,6 +25,12 @@ setup(
   install_requires=[
           'pandas',
           'numpy'],
+  extras_require={
+          'arrow':['pyarrow'],
+          'hdf5':['h5py'],
+          'graph':['scipy'],
+          'jit':['numba'],
+          'mpi':['mpi4py']},
   classifiers=[
     'Development Status :: 3 - Alpha',
     'Intended Audience :: Developers',